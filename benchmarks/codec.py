@@ -0,0 +1,82 @@
+"""
+Compares the installed `porc.codec` backends, and the `json.dumps`
+and `requests` decoding porc used before them, on a typical item and
+a page of search results.
+
+    python -m benchmarks.codec
+"""
+import json
+import random
+import timeit
+from porc import codec
+
+
+def make_item(rng, i):
+    return {
+        'id': i,
+        'name': 'user %d' % i,
+        'email': 'user%d@example.com' % i,
+        'active': rng.random() > 0.5,
+        'score': rng.random() * 100,
+        'tags': ['tag%d' % rng.randint(0, 50) for _ in range(8)],
+        'address': {
+            'street': '%d Main St' % rng.randint(1, 9999),
+            'city': 'Springfield',
+            'zip': '%05d' % rng.randint(0, 99999),
+        },
+        'history': [
+            {'at': 1404973704558 + n, 'event': 'login', 'ok': True}
+            for n in range(10)
+        ],
+    }
+
+
+def make_search_page(rng, limit=100):
+    return {
+        'count': limit,
+        'total_count': 10000,
+        'results': [{
+            'path': {
+                'collection': 'users',
+                'key': '%016x' % rng.getrandbits(64),
+                'ref': '%016x' % rng.getrandbits(64),
+                'reftime': 1404973704558,
+            },
+            'value': make_item(rng, i),
+            'score': rng.random(),
+            'reftime': 1404973704558,
+        } for i in range(limit)],
+        'next': '/v0/users?query=*&limit=100&offset=100',
+    }
+
+
+def legacy_encode(obj):
+    # what Resource._make_request sent before porc.codec
+    return json.dumps(obj, default=None)
+
+
+def legacy_decode(content):
+    # what requests' Response.json did, for a utf-8 body
+    return json.loads(content.decode('utf-8'))
+
+
+def main(number=200):
+    rng = random.Random(0)
+    payloads = {'item': make_item(rng, 0), 'search': make_search_page(rng)}
+    print('%-8s %-8s %8s %12s %12s' % (
+        'payload', 'codec', 'bytes', 'encode us', 'decode us'))
+    for name, payload in sorted(payloads.items()):
+        encoded = codec.JSONCodec().encode(payload)
+        candidates = [('legacy', legacy_encode, legacy_decode)]
+        candidates += [(c.name, c.encode, c.decode) for c in codec.available()]
+        for codec_name, encode, decode in candidates:
+            encoding = min(timeit.repeat(
+                lambda: encode(payload), number=number, repeat=3))
+            decoding = min(timeit.repeat(
+                lambda: decode(encoded), number=number, repeat=3))
+            print('%-8s %-8s %8d %12.1f %12.1f' % (
+                name, codec_name, len(encode(payload)),
+                encoding / number * 1e6, decoding / number * 1e6))
+
+if __name__ == '__main__':
+    main()
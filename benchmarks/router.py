@@ -0,0 +1,52 @@
+"""
+Compares `porc.router.parse` with the regex loop `Response` used
+before it, on the URL and Location header of typical responses.
+
+    python -m benchmarks.router
+"""
+import re
+import timeit
+from porc import router
+
+# the patterns and loop porc used before `porc.router`
+URL_PATTERNS = [re.compile(pattern) for pattern in [
+    "/v0/(?P<collection>.+)/(?P<key>.+)/events/(?P<type>.+)/(?P<timestamp>\\d+)/(?P<ordinal>\\d+)",
+    "/v0/(?P<collection>.+)/(?P<key>.+)/events/(?P<type>.+)/(?P<timestamp>\\d+)",
+    "/v0/(?P<collection>.+)/(?P<key>.+)/events/(?P<type>.+)",
+    "/v0/(?P<collection>.+)/(?P<key>.+)/refs/(?P<ref>.+)",
+    "/v0/(?P<collection>.+)/(?P<key>.+)/refs",
+    "/v0/(?P<collection>.+)/(?P<key>.+)/relations/(?P<kind>.+)/(?P<to_collection>.+)/(?P<to_key>.+)",
+    "/v0/(?P<collection>.+)/(?P<key>.+)/relations/(?P<kinds>.+)",
+    "/v0/(?P<collection>.+)/(?P<key>.+)",
+    "/v0/(?P<collection>.+)"
+]]
+
+
+def regex_loop(url):
+    path = url[url.find('/v0'):]
+    for regex in URL_PATTERNS:
+        match = regex.match(path)
+        if match:
+            return match.groupdict()
+
+URLS = {
+    'collection': 'https://api.orchestrate.io/v0/users?limit=100&query=%2A',
+    'item': 'https://api.orchestrate.io/v0/users/0c5a7b6e-0c81-4c4e-a0e5',
+    'ref': '/v0/users/0c5a7b6e-0c81-4c4e-a0e5/refs/e3f664c2807f4787',
+    'event': '/v0/users/0c5a7b6e-0c81-4c4e-a0e5/events/log/1404973704558/4',
+    'relations': '/v0/users/0c5a7b6e-0c81-4c4e-a0e5/relations/friends/family',
+}
+
+
+def main(number=100000):
+    print('%-12s %12s %12s %8s' % ('path', 'regex us', 'router us', 'speedup'))
+    for name, url in sorted(URLS.items()):
+        regex = min(timeit.repeat(
+            lambda: regex_loop(url), number=number, repeat=3))
+        routed = min(timeit.repeat(
+            lambda: router.parse(url), number=number, repeat=3))
+        print('%-12s %12.2f %12.2f %7.1fx' % (
+            name, regex / number * 1e6, routed / number * 1e6, regex / routed))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,460 @@
+"""
+A local stand-in for the Orchestrate v0 API, holding everything in
+memory: items and their refs, listings and search with Link headers,
+events and relations. Requests can be slowed down with `latency` and
+`jitter`, and a share of them, `error_rate`, answered with a 429 or 503.
+
+    server = StandInServer(latency=0.005)
+    client = porc.Client('key', server.url)
+    ...
+    server.close()
+
+Or run it on its own, for other clients:
+
+    python -m benchmarks.server --port 8080 --latency 0.005
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+try:
+    # python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import parse_qs, urlparse
+    from urllib import quote, unquote, urlencode
+except ImportError:
+    # python 3
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import parse_qs, quote, unquote, urlencode, urlparse
+
+
+def now():
+    return int(time.time() * 1000)
+
+
+def new_ref():
+    return uuid.uuid4().hex[:16]
+
+
+def event_bound(value):
+    """
+    Parses a `startEvent`-style bound, `timestamp[/ordinal]`.
+    """
+    parts = value.split('/')
+    return (int(parts[0]), int(parts[1]) if len(parts) > 1 else None)
+
+
+class Store(object):
+
+    """
+    The server's data: the versions of every item, every item's
+    current ref, events, and relations.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.versions = dict()  # (collection, key, ref) -> (reftime, value, tombstone)
+        self.history = dict()   # (collection, key) -> [ref, ...], oldest first
+        self.events = dict()    # (collection, key, type) -> {(timestamp, ordinal): (ref, value)}
+        self.relations = dict()  # (collection, key, kind) -> set of (collection, key)
+        self.ordinal = 0
+
+    def current(self, collection, key):
+        refs = self.history.get((collection, key))
+        if not refs:
+            return None, None
+        ref = refs[-1]
+        reftime, value, tombstone = self.versions[(collection, key, ref)]
+        return (None, None) if tombstone else (ref, value)
+
+    def put(self, collection, key, value, tombstone=False):
+        ref = new_ref()
+        self.versions[(collection, key, ref)] = (now(), value, tombstone)
+        self.history.setdefault((collection, key), []).append(ref)
+        return ref
+
+    def items(self, collection):
+        for (c, key) in sorted(self.history):
+            if c == collection:
+                ref, value = self.current(c, key)
+                if ref is not None:
+                    yield key, ref, value
+
+
+class Handler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    # headers and body go out in separate writes; without this, delayed
+    # ACKs would add tens of milliseconds to every response with a body
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    # plumbing
+
+    def do_GET(self):
+        self.route('GET')
+
+    def do_HEAD(self):
+        self.route('HEAD')
+
+    def do_PUT(self):
+        self.route('PUT')
+
+    def do_POST(self):
+        self.route('POST')
+
+    def do_DELETE(self):
+        self.route('DELETE')
+
+    def route(self, method):
+        server = self.server
+        server.count(method)
+        length = int(self.headers.get('Content-Length') or 0)
+        self.body = self.rfile.read(length) if length else b''
+        if server.latency or server.jitter:
+            time.sleep(server.latency + random.random() * server.jitter)
+        if server.error_rate and random.random() < server.error_rate:
+            return self.reply(random.choice([429, 503]), {'message': 'injected'},
+                              headers={'Retry-After': '0'})
+        url = urlparse(self.path)
+        self.query = dict((k, v[-1]) for k, v in parse_qs(url.query).items())
+        segments = [unquote(s) for s in url.path.split('/')[2:] if s]
+        if not segments:
+            return self.reply(200 if method == 'HEAD' else 404)
+        self.collection = segments[0]
+        if len(segments) == 1:
+            return self.collection_request(method)
+        self.key = segments[1]
+        rest = segments[2:]
+        with server.store.lock:
+            if not rest:
+                return self.item_request(method)
+            if rest[0] == 'refs':
+                return self.refs_request(method, rest[1:])
+            if rest[0] == 'events' and len(rest) > 1:
+                return self.events_request(method, rest[1], rest[2:])
+            if rest[0] == 'relation' and len(rest) == 4:
+                return self.relation_request(method, rest[1], rest[2], rest[3])
+            if rest[0] == 'relations' and len(rest) > 1:
+                return self.relations_request(method, rest[1:])
+        self.reply(404)
+
+    def json_body(self):
+        return json.loads(self.body.decode('utf-8')) if self.body else None
+
+    def reply(self, status, body=None, etag=None, location=None, headers=None, links=None):
+        content = json.dumps(body).encode('utf-8') if body is not None else b''
+        self.send_response(status)
+        if etag:
+            self.send_header('ETag', '"%s"' % etag)
+        if location:
+            self.send_header('Location', location)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if links:
+            self.send_header('Link', ', '.join(
+                '<%s>; rel="%s"' % (url, rel) for rel, url in sorted(links.items())))
+        self.send_header('X-ORCHESTRATE-REQ-ID', uuid.uuid4().hex)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(content)
+
+    def path_of(self, *segments):
+        return '/v0/' + '/'.join(quote(str(s), '') for s in segments)
+
+    def page_links(self, total, offset, limit, path, query):
+        links = dict()
+        if offset + limit < total:
+            links['next'] = '%s?%s' % (path, urlencode(sorted(dict(
+                query, offset=offset + limit, limit=limit).items())))
+        if offset > 0:
+            links['prev'] = '%s?%s' % (path, urlencode(sorted(dict(
+                query, offset=max(0, offset - limit), limit=limit).items())))
+        return links
+
+    # collections: list, search, post, delete
+
+    def collection_request(self, method):
+        store = self.server.store
+        with store.lock:
+            if method == 'POST':
+                key = new_ref()
+                ref = store.put(self.collection, key, self.json_body())
+                return self.reply(201, etag=ref, location=self.path_of(
+                    self.collection, key, 'refs', ref))
+            if method == 'DELETE':
+                for (c, key) in list(store.history):
+                    if c == self.collection:
+                        del store.history[(c, key)]
+                return self.reply(204)
+            if method != 'GET':
+                return self.reply(405)
+            items = list(store.items(self.collection))
+        limit = int(self.query.get('limit', 10))
+        query = self.query.get('query')
+        if query is None:
+            after = self.query.get('afterKey')
+            if after is not None:
+                items = [item for item in items if item[0] > after]
+            page = items[:limit]
+            body = dict(count=len(page), results=[self.result(*item) for item in page])
+            links = dict()
+            if len(items) > limit:
+                links['next'] = '%s?%s' % (self.path_of(self.collection), urlencode(
+                    [('afterKey', page[-1][0]), ('limit', limit)]))
+                body['next'] = links['next']
+            return self.reply(200, body, links=links)
+        items = [item for item in items if all(
+            self.matches(clause, item) for clause in query.split(' AND '))]
+        params = dict(query=query)
+        sort = self.query.get('sort')
+        if sort is not None:
+            params['sort'] = sort
+            field, _, order = sort.partition(':')
+            # other sorts are ignored, leaving items in key order
+            if field == '@path.reftime':
+                items.sort(key=self.reftime, reverse=order == 'desc')
+        offset = int(self.query.get('offset', 0))
+        page = items[offset:offset + limit]
+        links = self.page_links(len(items), offset, limit, self.path_of(self.collection),
+                                params)
+        body = dict(count=len(page), total_count=len(items),
+                    results=[dict(self.result(*item), score=1.0) for item in page])
+        body.update(links)
+        self.reply(200, body, links=links)
+
+    def matches(self, query, item):
+        if query.strip() in ['*', '']:
+            return True
+        field, _, expected = query.strip().partition(':')
+        if field == '@path.kind':
+            return expected == 'item'
+        if field == '@path.reftime':
+            # a range, like [1400000000000 TO *] or {1400000000000 TO *}
+            low = int(expected[1:].split(' TO ')[0])
+            reftime = self.reftime(item)
+            return reftime >= low if expected[0] == '[' else reftime > low
+        value = item[2]
+        expected = expected.strip('()"')
+        return isinstance(value, dict) and str(value.get(field)) == expected
+
+    def reftime(self, item):
+        key, ref = item[:2]
+        return self.server.store.versions[(self.collection, key, ref)][0]
+
+    def result(self, key, ref, value):
+        reftime = self.reftime((key, ref))
+        return dict(path=dict(collection=self.collection, key=key, ref=ref,
+                              reftime=reftime),
+                    value=value, reftime=reftime)
+
+    # items and refs
+
+    def item_request(self, method):
+        store = self.server.store
+        ref, value = store.current(self.collection, self.key)
+        if method in ['GET', 'HEAD']:
+            if ref is None:
+                return self.reply(404, {'message': 'not found'})
+            if self.headers.get('If-None-Match') == '"%s"' % ref:
+                return self.reply(304, etag=ref)
+            return self.reply(200, value, etag=ref, headers={
+                'Content-Location': self.path_of(self.collection, self.key, 'refs', ref)})
+        if_match = self.headers.get('If-Match')
+        if if_match and if_match != '"%s"' % ref:
+            return self.reply(412, {'message': 'ref mismatch'})
+        if method == 'PUT':
+            if self.headers.get('If-None-Match') == '"*"' and ref is not None:
+                return self.reply(412, {'message': 'item exists'})
+            ref = store.put(self.collection, self.key, self.json_body())
+            return self.reply(201, etag=ref, location=self.path_of(
+                self.collection, self.key, 'refs', ref))
+        if method == 'DELETE':
+            if self.query.get('purge') == 'true':
+                store.history.pop((self.collection, self.key), None)
+            elif ref is not None:
+                store.put(self.collection, self.key, None, tombstone=True)
+            return self.reply(204)
+        self.reply(405)
+
+    def refs_request(self, method, rest):
+        store = self.server.store
+        if method != 'GET':
+            return self.reply(405)
+        if rest:
+            version = store.versions.get((self.collection, self.key, rest[0]))
+            if version is None or version[2]:
+                return self.reply(404, {'message': 'not found'})
+            return self.reply(200, version[1], etag=rest[0])
+        refs = list(reversed(store.history.get((self.collection, self.key), [])))
+        limit = int(self.query.get('limit', 10))
+        offset = int(self.query.get('offset', 0))
+        results = []
+        for ref in refs[offset:offset + limit]:
+            reftime, value, tombstone = store.versions[(self.collection, self.key, ref)]
+            result = dict(path=dict(collection=self.collection, key=self.key, ref=ref,
+                                    reftime=reftime, tombstone=tombstone),
+                          reftime=reftime)
+            if self.query.get('values') == 'true' and not tombstone:
+                result['value'] = value
+            results.append(result)
+        links = self.page_links(len(refs), offset, limit,
+                                self.path_of(self.collection, self.key, 'refs'),
+                                dict(values=self.query.get('values', 'false')))
+        self.reply(200, dict(dict(count=len(results), results=results), **links), links=links)
+
+    # events
+
+    def events_request(self, method, event_type, rest):
+        store = self.server.store
+        events = store.events.setdefault((self.collection, self.key, event_type), dict())
+        if method == 'POST' and len(rest) <= 1:
+            timestamp = int(rest[0]) if rest else now()
+            store.ordinal += 1
+            ref = new_ref()
+            events[(timestamp, store.ordinal)] = (ref, self.json_body())
+            return self.reply(201, etag=ref, location=self.path_of(
+                self.collection, self.key, 'events', event_type, timestamp, store.ordinal))
+        if len(rest) == 2:
+            event = (int(rest[0]), int(rest[1]))
+            current = events.get(event)
+            if method == 'GET':
+                if current is None:
+                    return self.reply(404, {'message': 'not found'})
+                return self.reply(200, self.event(event_type, event, *current), etag=current[0])
+            if_match = self.headers.get('If-Match')
+            if if_match and (current is None or if_match != '"%s"' % current[0]):
+                return self.reply(412, {'message': 'ref mismatch'})
+            if method == 'PUT':
+                ref = new_ref()
+                events[event] = (ref, self.json_body())
+                return self.reply(204, etag=ref)
+            if method == 'DELETE':
+                events.pop(event, None)
+                return self.reply(204)
+        if method != 'GET' or rest:
+            return self.reply(405)
+        selected = sorted(events, reverse=True)
+        for param, keep in [
+                ('startEvent', lambda e, b: e >= b),
+                ('afterEvent', lambda e, b: e > b),
+                ('beforeEvent', lambda e, b: e < b),
+                ('endEvent', lambda e, b: e <= b)]:
+            if param in self.query:
+                timestamp, ordinal = event_bound(self.query[param])
+                selected = [e for e in selected if keep(
+                    e if ordinal is not None else (e[0], 0), (timestamp, ordinal or 0))]
+        limit = int(self.query.get('limit', 10))
+        page = selected[:limit]
+        body = dict(count=len(page), results=[
+            self.event(event_type, event, *events[event]) for event in page])
+        links = dict()
+        if len(selected) > limit:
+            query = dict((k, v) for k, v in self.query.items()
+                         if k in ['startEvent', 'afterEvent'])
+            query.update(limit=limit, beforeEvent='%d/%d' % page[-1])
+            links['next'] = '%s?%s' % (self.path_of(
+                self.collection, self.key, 'events', event_type), urlencode(sorted(query.items())))
+            body['next'] = links['next']
+        self.reply(200, body, links=links)
+
+    def event(self, event_type, event, ref, value):
+        timestamp, ordinal = event
+        return dict(path=dict(collection=self.collection, key=self.key, ref=ref,
+                              type=event_type, timestamp=timestamp, ordinal=ordinal),
+                    value=value, timestamp=timestamp, ordinal=ordinal, reftime=now())
+
+    # relations
+
+    def relation_request(self, method, kind, to_collection, to_key):
+        relations = self.server.store.relations.setdefault(
+            (self.collection, self.key, kind), set())
+        if method == 'PUT':
+            relations.add((to_collection, to_key))
+        elif method == 'DELETE':
+            relations.discard((to_collection, to_key))
+        else:
+            return self.reply(405)
+        self.reply(204)
+
+    def relations_request(self, method, kinds):
+        store = self.server.store
+        if method != 'GET':
+            return self.reply(405)
+        frontier = set([(self.collection, self.key)])
+        for kind in kinds:
+            frontier = set(target for source in frontier
+                           for target in store.relations.get(source + (kind,), ()))
+        results = []
+        for collection, key in sorted(frontier):
+            ref, value = store.current(collection, key)
+            if ref is not None:
+                results.append(dict(path=dict(collection=collection, key=key, ref=ref),
+                                    value=value, reftime=now()))
+        limit = int(self.query.get('limit', 10))
+        offset = int(self.query.get('offset', 0))
+        page = results[offset:offset + limit]
+        links = self.page_links(len(results), offset, limit, self.path_of(
+            self.collection, self.key, 'relations', *kinds), dict())
+        self.reply(200, dict(dict(count=len(page), results=page), **links), links=links)
+
+
+class StandInServer(ThreadingMixIn, HTTPServer):
+
+    """
+    Serves the stand-in API from a background thread, on `port` or
+    any free port. `url` is the base URL to give `porc.Client`.
+    `requests` counts requests received by method.
+    """
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, port=0, latency=0.0, jitter=0.0, error_rate=0.0,
+                 host='127.0.0.1'):
+        HTTPServer.__init__(self, (host, port), Handler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.store = Store()
+        self.requests = dict()
+        self._count_lock = threading.Lock()
+        self.url = 'http://%s:%d/v0' % (host, self.server_port)
+        self._thread = threading.Thread(target=self.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def count(self, method):
+        with self._count_lock:
+            self.requests[method] = self.requests.get(method, 0) + 1
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    args = parser.parse_args()
+    server = StandInServer(args.port, args.latency, args.jitter, args.error_rate)
+    print('serving %s' % server.url)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.close()
+
+if __name__ == '__main__':
+    main()
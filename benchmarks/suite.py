@@ -0,0 +1,227 @@
+"""
+Runs porc against the local stand-in server (`benchmarks.server`)
+and reports throughput, p50/p99 request latency and peak memory for
+each way of using the client, at several concurrency levels and
+payload sizes, as JSON for comparing one release with another.
+
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --scenarios get,get_many --concurrency 1,16 \\
+        --sizes 1000 --requests 200 --latency 0.002 --error-rate 0.01
+
+The server shares the benchmark's interpreter, and so its GIL, unless
+it's started on its own and given with `--url`:
+
+    python -m benchmarks.server --port 8080 &
+    python -m benchmarks.suite --url http://127.0.0.1:8080/v0
+"""
+import argparse
+import json
+import platform
+import sys
+import threading
+import time
+import porc
+from porc import Metrics, Retry
+from .server import StandInServer
+try:
+    import tracemalloc
+except ImportError:
+    # python 2
+    tracemalloc = None
+
+COLLECTION = 'bench'
+
+
+def payload(size):
+    """
+    An item whose JSON is about `size` bytes.
+    """
+    return {'name': 'benchmark item', 'count': 1, 'tags': ['a', 'b'],
+            'text': 'x' * max(0, size - 60)}
+
+
+def keys(count):
+    return ['key%06d' % i for i in range(count)]
+
+
+def in_threads(concurrency, work, items):
+    """
+    Runs `work(item)` for every item across `concurrency` threads.
+    """
+    shards = [items[i::concurrency] for i in range(concurrency)]
+    threads = [threading.Thread(target=lambda shard=shard: [work(i) for i in shard])
+               for shard in shards]
+    [thread.start() for thread in threads]
+    [thread.join() for thread in threads]
+
+
+def sync_get(client, concurrency, count):
+    in_threads(concurrency, lambda key: client.get(COLLECTION, key), keys(count))
+
+
+def sync_put(client, concurrency, count, body):
+    in_threads(concurrency, lambda key: client.put(COLLECTION, key, body), keys(count))
+
+
+def async_get(client, concurrency, count):
+    with client.async_() as c:
+        pending = []
+        for key in keys(count):
+            pending.append(c.get(COLLECTION, key))
+            if len(pending) >= concurrency:
+                pending.pop(0).result()
+        [future.result() for future in pending]
+
+
+def get_many(client, concurrency, count):
+    for result in client.get_many([(COLLECTION, key) for key in keys(count)],
+                                  concurrency=concurrency, ordered=False):
+        pass
+
+
+def put_many(client, concurrency, count, body):
+    items = [(COLLECTION, key, body) for key in keys(count)]
+    for result in client.put_many(items, concurrency=concurrency, ordered=False):
+        pass
+
+
+def pages_all(client, concurrency, count):
+    client.list(COLLECTION, limit=100).all()
+
+
+def iter_items(client, concurrency, count):
+    for item in client.search(COLLECTION, '*', limit=100).iter_items(prefetch=concurrency):
+        pass
+
+
+def parallel_all(client, concurrency, count):
+    client.search(COLLECTION, '*', limit=100).parallel_all(workers=concurrency)
+
+
+# name: (run(client, concurrency, count[, body]), whether it writes)
+SCENARIOS = {
+    'get': (sync_get, False),
+    'put': (sync_put, True),
+    'async_get': (async_get, False),
+    'get_many': (get_many, False),
+    'put_many': (put_many, True),
+    'pages_all': (pages_all, False),
+    'iter_items': (iter_items, False),
+    'parallel_all': (parallel_all, False),
+}
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100.0 * len(values)))]
+
+
+def measure(url, scenario, concurrency, size, count):
+    """
+    Runs one scenario on a fresh client, returning its results.
+    """
+    run, writes = SCENARIOS[scenario]
+    body = payload(size)
+    samples = []
+    client = porc.Client('key', url, pool_size=max(10, concurrency),
+                         max_workers=concurrency, retry=Retry(base=0.01),
+                         metrics=Metrics(callback=samples.append, slow=None))
+    if not writes:
+        # seed the items to read, outside the measurement
+        put_many(client, concurrency, count, body)
+        del samples[:]
+    if tracemalloc is not None:
+        tracemalloc.start()
+    started = time.time()
+    try:
+        if writes:
+            run(client, concurrency, count, body)
+        else:
+            run(client, concurrency, count)
+        elapsed = time.time() - started
+    finally:
+        if tracemalloc is not None:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        client.close()
+    latencies = [sample.latency for sample in samples]
+    return dict(
+        scenario=scenario,
+        concurrency=concurrency,
+        payload_bytes=len(json.dumps(body)),
+        items=count,
+        requests=len(samples),
+        errors=len([s for s in samples if s.status is None or s.status >= 400]),
+        retries=sum(sample.retries for sample in samples),
+        seconds=elapsed,
+        items_per_second=count / elapsed if elapsed else None,
+        requests_per_second=len(samples) / elapsed if elapsed else None,
+        p50=percentile(latencies, 50),
+        p99=percentile(latencies, 99),
+        peak_memory_bytes=peak if tracemalloc is not None else None,
+        bytes_received=sum(sample.response_bytes for sample in samples),
+    )
+
+
+def run(scenarios, concurrencies, sizes, count, latency=0.0, jitter=0.0,
+        error_rate=0.0, log=None, url=None):
+    results = []
+    for scenario in scenarios:
+        for size in sizes:
+            for concurrency in concurrencies:
+                server = None
+                if url is None:
+                    server = StandInServer(latency=latency, jitter=jitter,
+                                           error_rate=error_rate)
+                try:
+                    result = measure(url or server.url, scenario, concurrency, size, count)
+                finally:
+                    if server is not None:
+                        server.close()
+                if log is not None:
+                    log.write('%-13s c=%-3d size=%-7d %9.1f items/s  p50=%.4fs  p99=%.4fs\n' % (
+                        scenario, concurrency, result['payload_bytes'],
+                        result['items_per_second'], result['p50'] or 0, result['p99'] or 0))
+                results.append(result)
+    return dict(
+        porc=porc.__version__,
+        python=platform.python_version(),
+        platform=platform.platform(),
+        started=time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        server=dict(url=url, latency=latency, jitter=jitter, error_rate=error_rate),
+        results=results
+    )
+
+
+def integers(value):
+    return [int(v) for v in value.split(',')]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--scenarios', default=','.join(sorted(SCENARIOS)))
+    parser.add_argument('--concurrency', type=integers, default=[1, 4, 16])
+    parser.add_argument('--sizes', type=integers, default=[200, 10000])
+    parser.add_argument('--requests', type=int, default=500,
+                        help='items per scenario')
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--url', help='a server already running, else one is started')
+    parser.add_argument('--output', help='file to write JSON to, else stdout')
+    args = parser.parse_args(argv)
+    report = run(args.scenarios.split(','), args.concurrency, args.sizes,
+                 args.requests, args.latency, args.jitter, args.error_rate,
+                 log=sys.stderr, url=args.url)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    else:
+        json.dump(report, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write('\n')
+    return report
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,15 @@
 from .version import VERSION
 __version__ = VERSION
 
+from .cache import ItemCache, VersionCache
 from .client import Client
+from .deadline import Deadline, DeadlineExceeded
+from .hedge import Hedge
+from .limiter import AdaptiveLimiter, Retry
+from .metrics import Metrics
+from .mirror import Mirror
 from .pages import Pages
 from .resource import Resource
 from .response import Response
+from .transport import Transport
 from . import util
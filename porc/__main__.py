@@ -0,0 +1,50 @@
+"""
+Exports a collection to, or imports one from, a gzipped NDJSON file.
+
+    python -m porc export a_collection backup.ndjson.gz
+    python -m porc import backup.ndjson.gz --collection a_collection
+
+The API key comes from `--api-key` or the `ORCHESTRATE_API_KEY`
+environment variable. An interrupted job, run again, resumes from
+its checkpoint.
+"""
+import argparse
+import os
+import sys
+from .client import Client
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m porc',
+                                     description=__doc__.split('\n\n')[0])
+    parser.add_argument('--api-key', default=os.environ.get('ORCHESTRATE_API_KEY'))
+    parser.add_argument('--url', help='the API to use, if not Orchestrate\'s')
+    parser.add_argument('--workers', type=int, default=8,
+                        help='puts to run at once when importing')
+    commands = parser.add_subparsers(dest='command')
+    export = commands.add_parser('export', help='write a collection to a file')
+    export.add_argument('collection')
+    export.add_argument('path')
+    export.add_argument('--limit', type=int, default=100, help='items per page')
+    restore = commands.add_parser('import', help='put a file\'s items into a collection')
+    restore.add_argument('path')
+    restore.add_argument('--collection', required=True)
+    args = parser.parse_args(argv)
+    if not args.command:
+        parser.error('choose export or import')
+    if not args.api_key:
+        parser.error('give --api-key or set ORCHESTRATE_API_KEY')
+    client = Client(args.api_key, args.url, pool_size=max(10, args.workers),
+                    max_workers=args.workers)
+    try:
+        if args.command == 'export':
+            count = client.export_collection(args.collection, args.path, args.limit)
+        else:
+            count = client.import_collection(args.path, args.collection)
+    finally:
+        client.close()
+    sys.stderr.write('%sed %d items\n' % (args.command, count))
+    return count
+
+if __name__ == '__main__':
+    main()
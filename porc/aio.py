@@ -0,0 +1,444 @@
+"""
+An asyncio-native Porc client. Requires Python 3.6+ and aiohttp 3.
+
+    from porc import aio
+
+    async def main():
+        async with aio.Client(API_KEY) as client:
+            item = await client.get('a_collection', 'a_key')
+            async for page in client.list('a_collection'):
+                page.raise_for_status()
+"""
+import asyncio
+import datetime
+import time
+from requests.models import PreparedRequest, Response as Requests_Response
+from requests.structures import CaseInsensitiveDict
+from . import bulk
+from .codec import best
+from .compression import Compression
+from .deadline import DeadlineExceeded
+from . import client
+from . import pages
+from . import transport
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+class Transport(object):
+
+    """
+    The aiohttp counterpart of `porc.Transport`: one lazily-created
+    `aiohttp.ClientSession` holding at most `pool_size` connections.
+    Requests beyond that wait for a free connection rather than
+    opening more. `max_workers` and `executor` are accepted so the
+    signature matches `porc.Transport`, but no threads are used.
+    """
+
+    def __init__(self, pool_size=100, max_workers=None, executor=None,
+                 keep_body=True, cache=None, versions=None, coalesce=False,
+                 codec=None, compress=None, limiter=None, retry=None,
+                 metrics=None, hedge=None, **opts):
+        if aiohttp is None:
+            raise ImportError('porc.aio requires aiohttp')
+        self.pool_size = pool_size
+        self.keep_body = keep_body
+        self.cache = cache
+        self.versions = versions
+        self.coalesce = coalesce
+        self.codec = codec or best()
+        self.compression = Compression(compress)
+        self.limiter = limiter
+        self.retry = retry
+        self.metrics = metrics
+        self.hedge = hedge
+        self._slots = None
+        self.opts = opts
+        self._session = None
+        self._stats = dict(requests=0, hits=0, misses=0, collapsed=0)
+        self._flights = dict()
+
+    @property
+    def session(self):
+        if self._session is None:
+            headers = dict(self.opts.get('headers') or {})
+            auth = self.opts.get('auth')
+            if auth:
+                headers['Authorization'] = aiohttp.BasicAuth(*auth).encode()
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size),
+                headers=headers,
+                trace_configs=[self._trace_config()])
+        return self._session
+
+    def _trace_config(self):
+        trace_config = aiohttp.TraceConfig()
+
+        def count(name):
+            async def counter(session, context, params):
+                self._stats[name] += 1
+            return counter
+        trace_config.on_request_start.append(count('requests'))
+        trace_config.on_connection_reuseconn.append(count('hits'))
+        trace_config.on_connection_create_end.append(count('misses'))
+        return trace_config
+
+    def stats(self):
+        """
+        Returns connection pool counters, like `porc.Transport.stats`.
+        """
+        return dict(self._stats)
+
+    async def request(self, method, uri, use_async=False, **opts):
+        """
+        Sends the request, returning a `requests` response built from
+        the aiohttp one after running any `response` hooks on it.
+        Like `porc.Transport`, waits for a slot from `limiter`, retries
+        as `retry` says, records the request in `metrics`, and hedges
+        slow reads as `hedge` says, if given.
+        """
+        name = self.hedge and self.hedge.applies(method, uri, opts.get('params'))
+        if name:
+            return await self._hedged(name, method, uri, **opts)
+        return await self._request(method, uri, **opts)
+
+    async def _hedged(self, name, method, uri, **opts):
+        attempts = [self._attempt(name, method, uri, opts)]
+        try:
+            await asyncio.wait(attempts, timeout=self.hedge.delay(name))
+            if not attempts[0].done() and self.hedge.try_hedge():
+                attempts.append(self._attempt(name, method, uri, opts))
+            pending = set(attempts)
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not attempts[0]:
+                            self.hedge.won()
+                        return task.result()
+            # every attempt failed
+            return attempts[0].result()
+        finally:
+            for task in attempts:
+                if not task.done():
+                    task.cancel()
+
+    def _attempt(self, name, method, uri, opts):
+        async def attempt():
+            started = time.time()
+            response = await self._request(method, uri, **opts)
+            self.hedge.observe(name, time.time() - started)
+            return response
+        return asyncio.ensure_future(attempt())
+
+    async def _request(self, method, uri, deadline=None, **opts):
+        attempt = 0
+        first = time.time()
+        while True:
+            timeout = None
+            if deadline is not None:
+                timeout = opts['timeout'] = deadline.timeout()
+            if self.limiter is not None:
+                try:
+                    await asyncio.wait_for(self._acquire(), timeout)
+                except asyncio.TimeoutError:
+                    self._record(method, uri, opts, first, attempt)
+                    raise DeadlineExceeded()
+                if deadline is not None:
+                    opts['timeout'] = max(0.001, deadline.remaining())
+            started = time.time()
+            try:
+                response = await self._send(method, uri, **opts)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                await self._release(started)
+                if deadline is not None and deadline.expired():
+                    self._record(method, uri, opts, first, attempt)
+                    raise DeadlineExceeded()
+                delay = self.retry and self.retry.delay(method, attempt)
+                if delay is None:
+                    self._record(method, uri, opts, first, attempt)
+                    raise
+            else:
+                await self._release(started, response.status_code)
+                delay = self.retry and self.retry.delay(method, attempt, response)
+                if delay is None:
+                    self._record(method, uri, opts, first, attempt, response)
+                    return response
+            if deadline is not None and delay >= deadline.remaining():
+                self._record(method, uri, opts, first, attempt)
+                raise DeadlineExceeded()
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _acquire(self):
+        if self._slots is None:
+            self._slots = asyncio.Condition()
+        async with self._slots:
+            await self._slots.wait_for(self.limiter.try_acquire)
+
+    async def _release(self, started, status=None):
+        if self.limiter is not None:
+            self.limiter.release(time.time() - started, status)
+            async with self._slots:
+                self._slots.notify_all()
+
+    _record = transport.Transport._record
+
+    async def _send(self, method, uri, headers=None, params=None, data=None,
+                    hooks=None, timeout=None):
+        if params:
+            params = dict((key, str(value)) for key, value in params.items())
+        extra = dict()
+        if timeout is not None:
+            extra['timeout'] = aiohttp.ClientTimeout(total=timeout)
+        async with self.session.request(method, uri, params=params, data=data,
+                                        headers=headers, **extra) as resp:
+            content = await resp.read()
+        response = self._build_response(resp, content)
+        response.request = self._build_request(method, response.url, headers)
+        for hook in _hook_list(hooks):
+            result = hook(response)
+            if result is not None:
+                response = result
+        return response
+
+    async def coalesced(self, key, view, method, uri, use_async=False, **opts):
+        """
+        Like `request`, but shares the response with every other
+        call for the same `key` made while it's in flight.
+        """
+        task = self._flights.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self.request(method, uri, **opts))
+            self._flights[key] = task
+            task.add_done_callback(lambda task: self._flights.pop(key, None))
+        else:
+            self._stats['collapsed'] += 1
+        # one caller giving up mustn't cancel the others' request
+        return view(await asyncio.shield(task))
+
+    def _build_response(self, resp, content):
+        response = Requests_Response()
+        response.status_code = resp.status
+        response.reason = resp.reason
+        response.headers = CaseInsensitiveDict(resp.headers)
+        response.url = str(resp.url)
+        response.encoding = resp.charset
+        response.elapsed = datetime.timedelta(0)
+        response._content = content
+        return response
+
+    def _build_request(self, method, url, headers):
+        request = PreparedRequest()
+        request.method = method
+        request.url = url
+        request.headers = CaseInsensitiveDict(headers or {})
+        return request
+
+    def completed(self, value, use_async=False):
+        """
+        Returns `value` as a coroutine, as `request` returns responses.
+        """
+        async def completed():
+            return value
+        return completed()
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+def _hook_list(hooks):
+    hook = (hooks or {}).get('response', [])
+    return hook if isinstance(hook, list) else [hook]
+
+
+class Pages(pages.Pages):
+
+    """
+    `porc.Pages` for `aio.Client`. `next`, `prev` and `all` are
+    coroutines, and the pages are iterated with `async for`.
+    Running out of pages raises `StopAsyncIteration`.
+    """
+
+    async def _handle_page(self, querydict={}, val='next', **headers):
+        try:
+            request = self._page_request(querydict, val, headers)
+        except StopIteration:
+            raise StopAsyncIteration
+        response = await request
+        self._handle_res(None, response)
+        return response
+
+    def __iter__(self):
+        raise TypeError("use 'async for' to iterate over aio.Pages")
+
+    def iter_items(self, *args, **kwargs):
+        raise TypeError('iter_items needs porc.Pages; use async for')
+
+    def parallel_all(self, *args, **kwargs):
+        raise TypeError('parallel_all needs porc.Pages; use all')
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self.next()
+
+    async def all(self):
+        results = []
+        try:
+            async for response in self:
+                response.raise_for_status()
+                results.extend(response['results'])
+        except DeadlineExceeded as e:
+            e.results = results
+            raise
+        return results
+
+
+class Batch(bulk.Batch):
+
+    """
+    `porc.bulk.Batch` for `aio.Client`: `submit` returns coroutines,
+    which run as tasks on the event loop. Iterate with `async for`,
+    or await `results()`.
+    """
+
+    def __iter__(self):
+        raise TypeError("use 'async for' to iterate over aio.Batch")
+
+    async def __aiter__(self):
+        items = enumerate(self.items)
+        pending = dict()
+        done = dict()
+        next_index = 0
+        exhausted = False
+        self.summary = bulk.Summary()
+        while True:
+            # top up the window
+            while not exhausted and len(pending) + len(done) < self.concurrency:
+                try:
+                    index, item = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+                try:
+                    task = asyncio.ensure_future(self.submit(*item))
+                    pending[task] = (index, item)
+                except Exception as e:
+                    done[index] = bulk.Result(index, item, None, e)
+            if not self.ordered:
+                for result in list(done.values()):
+                    yield self._finish(result)
+                done.clear()
+            elif next_index in done:
+                while next_index in done:
+                    yield self._finish(done.pop(next_index))
+                    next_index += 1
+                continue
+            if not pending:
+                if exhausted and not done:
+                    break
+                continue
+            finished, _ = await asyncio.wait(
+                list(pending), return_when=asyncio.FIRST_COMPLETED)
+            for task in finished:
+                index, item = pending.pop(task)
+                done[index] = self._result(index, item, task)
+        self.summary.finished = time.time()
+
+    async def results(self):
+        return [result async for result in self]
+
+
+def event_submitter(client):
+    """
+    `porc.bulk.event_submitter` for `aio.Client`: events on the same
+    item and type are posted one after another, in the order submitted.
+    """
+    last = dict()
+
+    def submit(collection, key, event_type, data, timestamp=None):
+        if not key:
+            raise ValueError('post_events_many items need a collection and a key')
+        stream = (collection, key, event_type)
+        previous = last.get(stream)
+        done = last[stream] = asyncio.get_event_loop().create_future()
+
+        async def post():
+            try:
+                if previous is not None:
+                    await previous
+                return await client.post_event(
+                    collection, key, event_type, data, timestamp)
+            finally:
+                done.set_result(None)
+                if last.get(stream) is done:
+                    del last[stream]
+        return post()
+    return submit
+
+
+class Client(client.Client):
+
+    """
+    Mirrors `porc.Client`, except that every method returning a
+    `Response` returns a coroutine instead, and listings return
+    `aio.Pages`. `pool_size` caps the number of open connections.
+    """
+
+    transport_class = Transport
+
+    def __init__(self, api_key, custom_url=None, pool_size=100, **kwargs):
+        super(Client, self).__init__(
+            api_key, custom_url, pool_size=pool_size, **kwargs)
+
+    def _pages(self, path, params, cursor=None):
+        return Pages(self.opts, self.uri, path, params, self.transport, cursor,
+                     self.deadline)
+
+    def async_(self):
+        raise TypeError('aio.Client is already asynchronous')
+
+    def read_events(self, *args, **kwargs):
+        raise TypeError('read_events needs a threaded porc.Client')
+
+    def traverse(self, *args, **kwargs):
+        raise TypeError('traverse needs a threaded porc.Client')
+
+    def write_buffer(self, *args, **kwargs):
+        raise TypeError('write_buffer needs a threaded porc.Client')
+
+    def update_many(self, *args, **kwargs):
+        raise TypeError('update_many needs a threaded porc.Client')
+
+    def mirror(self, *args, **kwargs):
+        raise TypeError('mirror needs a threaded porc.Client')
+
+    def export_collection(self, *args, **kwargs):
+        raise TypeError('export_collection needs a threaded porc.Client')
+
+    def import_collection(self, *args, **kwargs):
+        raise TypeError('import_collection needs a threaded porc.Client')
+
+    def post_events_many(self, events, concurrency=None, ordered=True):
+        submit = event_submitter(self)
+        return Batch(submit, bulk.event_items(events),
+                     concurrency or self.transport.pool_size, ordered)
+
+    def _batch(self, method, items, concurrency, ordered):
+        submit = bulk.item_submitter(self, method)
+        return Batch(submit, items, concurrency or self.transport.pool_size, ordered)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, type, value, stacktrace):
+        await self.close()
+
+setattr(Client, 'async', Client.__dict__['async_'])
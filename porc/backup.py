@@ -0,0 +1,145 @@
+"""
+Streams a collection's items to and from gzipped NDJSON files, one
+`{"key": ..., "ref": ..., "value": ...}` object per line, checkpointing
+as it goes so that an interrupted job picks up where it stopped.
+`python -m porc` runs these from the command line.
+"""
+import gzip
+import json
+import os
+
+
+def checkpoint_path(path):
+    return path + '.checkpoint'
+
+
+def read_checkpoint(path, kind=None):
+    """
+    Returns the checkpoint saved for the file at `path`, or `None`.
+    Given a `kind`, `'export'` or `'import'`, raises `ValueError` if
+    the checkpoint was saved by the other, since resuming from it
+    would skip or truncate the wrong items.
+    """
+    try:
+        with open(checkpoint_path(path)) as f:
+            checkpoint = json.load(f)
+    except (IOError, OSError):
+        return None
+    # only exports save a file offset
+    saved = checkpoint.get('kind', 'export' if 'offset' in checkpoint else 'import')
+    if kind is not None and saved != kind:
+        raise ValueError(
+            '%s has an unfinished %s; finish it, or remove %s' % (
+                path, saved, checkpoint_path(path)))
+    return checkpoint
+
+
+def write_checkpoint(path, checkpoint):
+    """
+    Saves `checkpoint` for the file at `path`, replacing the last one
+    in a single step, so a crash leaves one or the other.
+    """
+    target = checkpoint_path(path)
+    with open(target + '.tmp', 'w') as f:
+        json.dump(checkpoint, f)
+        f.flush()
+        os.fsync(f.fileno())
+    getattr(os, 'replace', os.rename)(target + '.tmp', target)
+
+
+def remove_checkpoint(path):
+    if os.path.exists(checkpoint_path(path)):
+        os.remove(checkpoint_path(path))
+
+
+def export_collection(client, collection, path, limit=100, checkpoint_every=1000):
+    """
+    Writes every item in `collection` to `path`, listing `limit` items
+    a page and fetching each page while the one before it is written.
+    Every `checkpoint_every` items the gzip stream is ended and a
+    checkpoint saved; an export finding one resumes after it, keeping
+    what was written before. Returns the number of items exported.
+    """
+    codec = client.transport.codec
+    checkpoint = read_checkpoint(path, 'export') or dict(after_key=None, items=0, offset=0)
+    count = checkpoint['items']
+    raw = open(path, 'r+b' if checkpoint['offset'] else 'wb')
+    try:
+        # drop anything written after the checkpoint
+        raw.seek(checkpoint['offset'])
+        raw.truncate()
+        member = None
+        pending = _list_page(client, collection, limit, checkpoint['after_key'])
+        since = 0
+        while pending is not None:
+            page = pending.result()
+            page.raise_for_status()
+            results = page['results']
+            pending = None
+            if results and 'next' in page.links:
+                pending = _list_page(client, collection, limit, results[-1]['path']['key'])
+            if member is None:
+                member = gzip.GzipFile(fileobj=raw, mode='wb')
+            for result in results:
+                record = dict(key=result['path']['key'], ref=result['path']['ref'],
+                              value=result['value'])
+                member.write(codec.encode(record) + b'\n')
+            count += len(results)
+            since += len(results)
+            if results and (since >= checkpoint_every or pending is None):
+                # end the gzip stream, so the file is whole up to here
+                member.close()
+                member = None
+                raw.flush()
+                os.fsync(raw.fileno())
+                write_checkpoint(path, dict(
+                    kind='export', after_key=results[-1]['path']['key'],
+                    items=count, offset=raw.tell()))
+                since = 0
+        if member is not None:
+            member.close()
+    finally:
+        raw.close()
+    remove_checkpoint(path)
+    return count
+
+
+def _list_page(client, collection, limit, after_key):
+    params = dict(limit=limit)
+    if after_key is not None:
+        params['afterKey'] = after_key
+    return client.async_()._make_request('GET', collection, params)
+
+
+def import_collection(client, path, collection, concurrency=None, checkpoint_every=1000):
+    """
+    Puts every item in the file at `path` into `collection`,
+    `concurrency` at a time, reading the file as the puts complete.
+    Every `checkpoint_every` items a checkpoint is saved; an import
+    finding one skips the items it covers. The first failed put
+    raises its error, once a checkpoint up to it is saved. Returns
+    the number of items imported.
+    """
+    codec = client.transport.codec
+    checkpoint = read_checkpoint(path, 'import') or dict(items=0)
+    done = checkpoint['items']
+
+    def items(lines):
+        lines = (line for line in lines if line.strip())
+        for index, line in enumerate(lines):
+            if index >= done:
+                record = codec.decode(line)
+                yield collection, record['key'], record['value']
+
+    with gzip.open(path, 'rb') as lines:
+        batch = client.put_many(items(lines), concurrency)
+        count = done
+        for result in batch:
+            if not result.ok:
+                write_checkpoint(path, dict(kind='import', items=count))
+                raise result.error
+            count += 1
+            if (count - done) % checkpoint_every == 0:
+                write_checkpoint(path, dict(kind='import', items=count))
+    remove_checkpoint(path)
+    return count
@@ -0,0 +1,193 @@
+from collections import OrderedDict
+from concurrent.futures import Future
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class Write(object):
+
+    """
+    A buffered call to `method` with `args`, and the futures of the
+    writes folded into it.
+    """
+
+    __slots__ = ('method', 'args', 'futures')
+
+    def __init__(self, method, args, future):
+        self.method = method
+        self.args = args
+        self.futures = [future]
+
+
+class WriteBuffer(object):
+
+    """
+    Holds a client's puts and event posts, and sends them from a
+    background thread once `max_pending` are waiting or every
+    `interval` seconds, `concurrency` items at a time.
+
+    Puts to an item still waiting to be sent are folded into one,
+    which sends the last body; every put folded in gets its response.
+    Writes to the same item are sent one at a time, in the order they
+    were made, so events posted to it keep their order. Puts with a
+    `ref` are never folded.
+
+    Each write returns a future for its response. Unsuccessful
+    responses set the future's exception, and are passed to
+    `callback(method, args, error)`, if given. `flush` waits for every
+    write so far to be sent; `close` flushes and stops the thread.
+    """
+
+    def __init__(self, client, max_pending=1000, interval=0.5, concurrency=None,
+                 callback=None):
+        max_workers = client.transport.max_workers
+        concurrency = concurrency or max_workers
+        if concurrency > max_workers:
+            raise ValueError(
+                'concurrency %d exceeds the client\'s max_workers (%d)' % (
+                    concurrency, max_workers))
+        self.client = client
+        self.max_pending = max_pending
+        self.interval = interval
+        self.callback = callback
+        self.closed = False
+        self._pending = OrderedDict()  # (collection, key) -> [Write, ...]
+        self._count = 0
+        self._in_flight = set()
+        self._flushing = False
+        self._stats = dict(writes=0, coalesced=0, sent=0, failed=0)
+        self._ready = threading.Condition(threading.Lock())
+        self._slots = threading.Semaphore(concurrency)
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def put(self, collection, key, body, ref=None):
+        """
+        Buffers a `Client.put`, returning a future for its response.
+        """
+        return self._add(collection, key, 'put', (collection, key, body, ref),
+                         fold=ref is None)
+
+    def post_event(self, collection, key, event_type, data, timestamp=None):
+        """
+        Buffers a `Client.post_event`, returning a future for its response.
+        """
+        return self._add(collection, key, 'post_event',
+                         (collection, key, event_type, data, timestamp))
+
+    def _add(self, collection, key, method, args, fold=False):
+        future = Future()
+        with self._ready:
+            if self.closed:
+                raise ValueError('write buffer is closed')
+            self._stats['writes'] += 1
+            writes = self._pending.setdefault((collection, key), [])
+            last = writes[-1] if writes else None
+            if fold and last is not None and last.method == method and last.args[3] is None:
+                last.args = args
+                last.futures.append(future)
+                self._stats['coalesced'] += 1
+            else:
+                writes.append(Write(method, args, future))
+                self._count += 1
+                if self._count >= self.max_pending:
+                    self._ready.notify_all()
+        return future
+
+    def _run(self):
+        while True:
+            with self._ready:
+                if not (self._flushing or self.closed or self._count >= self.max_pending):
+                    self._ready.wait(self.interval)
+                ready = self._take()
+                if not ready and self.closed and not self._pending and not self._in_flight:
+                    return
+                if not ready and (self._flushing or self.closed):
+                    # wait for writes in flight to free their items
+                    self._ready.wait(self.interval)
+            for item, writes in ready:
+                self._slots.acquire()
+                self.client.transport.executor.submit(self._send, item, writes)
+
+    def _take(self):
+        """
+        Takes the writes of every item without any in flight.
+        """
+        ready = [(item, writes) for item, writes in self._pending.items()
+                 if item not in self._in_flight]
+        for item, writes in ready:
+            del self._pending[item]
+            self._in_flight.add(item)
+            self._count -= len(writes)
+        return ready
+
+    def _send(self, item, writes):
+        try:
+            for write in writes:
+                try:
+                    response = getattr(self.client, write.method)(*write.args)
+                    response.raise_for_status()
+                except Exception as e:
+                    self._failed(write, e)
+                else:
+                    for future in write.futures:
+                        future.set_result(response)
+                with self._ready:
+                    self._stats['sent'] += 1
+        finally:
+            with self._ready:
+                self._in_flight.discard(item)
+                if self._flushing and not self._pending and not self._in_flight:
+                    self._flushing = False
+                self._ready.notify_all()
+            self._slots.release()
+
+    def _failed(self, write, error):
+        with self._ready:
+            self._stats['failed'] += 1
+        for future in write.futures:
+            future.set_exception(error)
+        if self.callback is not None:
+            try:
+                self.callback(write.method, write.args, error)
+            except Exception:
+                logger.exception('write buffer callback failed')
+
+    def flush(self):
+        """
+        Sends every buffered write now, waiting until all are done.
+        """
+        with self._ready:
+            if not self._pending and not self._in_flight:
+                return
+            self._flushing = True
+            self._ready.notify_all()
+            while self._pending or self._in_flight:
+                self._ready.wait()
+
+    def close(self):
+        """
+        Flushes the buffer and stops its thread. Writes after
+        closing raise `ValueError`.
+        """
+        with self._ready:
+            self.closed = True
+            self._ready.notify_all()
+        self._thread.join()
+
+    def stats(self):
+        """
+        Returns how many writes were made, how many were folded into
+        another, and how many requests were sent and failed.
+        """
+        with self._ready:
+            return dict(self._stats, pending=self._count)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, stacktrace):
+        self.close()
@@ -0,0 +1,263 @@
+from collections import namedtuple
+from concurrent.futures import Future, wait, FIRST_COMPLETED
+from itertools import islice
+import random
+import threading
+import time
+from . import util
+
+EVENT_COLUMNS = ('collection', 'key', 'type', 'data', 'timestamp')
+
+# seconds; conflicted updates wait up to this, doubled per attempt
+CONFLICT_BACKOFF = 0.01
+
+
+def item_submitter(client, method):
+    """
+    Wraps `client.<method>` to take a bulk item's fields, rejecting
+    items without a key. Passed on, those would address the whole
+    collection -- for `delete`, deleting it.
+    """
+    call = getattr(client, method)
+
+    def submit(collection, key=None, *args):
+        if not key:
+            raise ValueError('%s_many items need a collection and a key' % method)
+        return call(collection, key, *args)
+    return submit
+
+
+def item_updater(client, fn, max_attempts=5):
+    """
+    Returns a submit function that, on `client`'s executor, gets an
+    item, passes it to `fn`, and puts the body `fn` returns (or, if it
+    returns `None`, the item as `fn` left it) with `If-Match` on the
+    ref it read. If the item changed in between, and the put fails
+    with `412 Precondition Failed`, it's read and updated again, up to
+    `max_attempts` times in all, after a short random wait.
+    """
+    if max_attempts < 1:
+        raise ValueError('max_attempts must be at least 1')
+
+    def update(collection, key):
+        for attempt in range(max_attempts):
+            if attempt:
+                time.sleep(random.uniform(0, CONFLICT_BACKOFF * 2 ** attempt))
+            item = client.get(collection, key)
+            if not item.ok:
+                return item
+            body = fn(item)
+            response = client.put(
+                collection, key, item.json if body is None else body, item.ref)
+            if response.status_code != 412:
+                break
+        return response
+
+    def submit(collection, key=None):
+        if not key:
+            raise ValueError('update_many items need a collection and a key')
+        return client.transport.executor.submit(update, collection, key)
+    return submit
+
+
+def event_items(events, chunk_size=1000):
+    """
+    Yields `(collection, key, type, data, timestamp)` for each event,
+    given as tuples of `post_event`'s arguments or as a mapping of
+    columns by those names. Timestamps are converted from datetimes
+    `chunk_size` events at a time.
+    """
+    if hasattr(events, 'keys'):
+        timestamps = events.get('timestamp')
+        if timestamps is not None:
+            timestamps = util.datetimes_to_timestamps(timestamps)
+        columns = [events[name] for name in EVENT_COLUMNS[:4]]
+        columns.append(timestamps if timestamps is not None else
+                       [None] * len(columns[0]))
+        for row in zip(*columns):
+            yield row
+        return
+    events = iter(events)
+    while True:
+        chunk = [tuple(event) + (None,) * (5 - len(event))
+                 for event in islice(events, chunk_size)]
+        if not chunk:
+            return
+        timestamps = util.datetimes_to_timestamps([event[4] for event in chunk])
+        for event, timestamp in zip(chunk, timestamps):
+            yield event[:4] + (timestamp,)
+
+
+def event_submitter(client):
+    """
+    Wraps `client.post_event`, which must return futures, so that
+    events on the same item and type are posted one after another,
+    in the order submitted, while events on others go concurrently.
+    """
+    last = dict()
+    lock = threading.Lock()
+
+    def submit(collection, key, event_type, data, timestamp=None):
+        if not key:
+            raise ValueError('post_events_many items need a collection and a key')
+        stream = (collection, key, event_type)
+        result = Future()
+
+        def finish(future):
+            with lock:
+                if last.get(stream) is result:
+                    del last[stream]
+            try:
+                result.set_result(future.result())
+            except Exception as e:
+                result.set_exception(e)
+
+        def send(previous=None):
+            try:
+                future = client.post_event(collection, key, event_type, data, timestamp)
+            except Exception as e:
+                future = Future()
+                future.set_exception(e)
+            future.add_done_callback(finish)
+
+        with lock:
+            previous = last.get(stream)
+            last[stream] = result
+        if previous is None:
+            send()
+        else:
+            # posted only once the event before it has its ordinal
+            previous.add_done_callback(send)
+        return result
+    return submit
+
+
+class Result(namedtuple('Result', ['index', 'item', 'response', 'error'])):
+
+    """
+    The outcome of one item in a batch: its position in the input,
+    the item itself, and either the `Response` or the error raised
+    while getting it. Unsuccessful status codes count as errors.
+    """
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+class Summary(object):
+
+    """
+    Running totals for a batch, updated as results are yielded.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.finished = None
+        self.total = 0
+        self.succeeded = 0
+        self.failed = 0
+
+    def add(self, result):
+        self.total += 1
+        if result.ok:
+            self.succeeded += 1
+        else:
+            self.failed += 1
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.time()) - self.started
+
+    @property
+    def throughput(self):
+        """
+        Items completed per second.
+        """
+        elapsed = self.elapsed
+        return self.total / elapsed if elapsed else 0.0
+
+    def __repr__(self):
+        return '<Summary total=%d succeeded=%d failed=%d elapsed=%.3fs>' % (
+            self.total, self.succeeded, self.failed, self.elapsed)
+
+
+class Batch(object):
+
+    """
+    Runs `submit(*item)` for every item, keeping at most `concurrency`
+    requests in flight, and yields a `Result` per item. `submit` must
+    return a future. Results come back in input order when `ordered`
+    is true, or as they complete otherwise. In ordered mode, results
+    waiting on an earlier item count against `concurrency`, so memory
+    stays bounded however slow that item is.
+
+    Nothing is sent until the batch is iterated. `summary` holds the
+    totals so far, and is final once iteration ends.
+    """
+
+    def __init__(self, submit, items, concurrency=10, ordered=True):
+        if concurrency < 1:
+            raise ValueError('concurrency must be at least 1')
+        self.submit = submit
+        self.items = items
+        self.concurrency = concurrency
+        self.ordered = ordered
+        self.summary = Summary()
+
+    def __iter__(self):
+        items = enumerate(self.items)
+        pending = dict()
+        done = dict()
+        next_index = 0
+        exhausted = False
+        self.summary = Summary()
+        while True:
+            # top up the window
+            while not exhausted and len(pending) + len(done) < self.concurrency:
+                try:
+                    index, item = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+                try:
+                    pending[self.submit(*item)] = (index, item)
+                except Exception as e:
+                    done[index] = Result(index, item, None, e)
+            if not self.ordered:
+                for result in list(done.values()):
+                    yield self._finish(result)
+                done.clear()
+            elif next_index in done:
+                while next_index in done:
+                    yield self._finish(done.pop(next_index))
+                    next_index += 1
+                continue
+            if not pending:
+                if exhausted and not done:
+                    break
+                continue
+            finished, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+            for future in finished:
+                index, item = pending.pop(future)
+                done[index] = self._result(index, item, future)
+        self.summary.finished = time.time()
+
+    def _result(self, index, item, future):
+        response = None
+        try:
+            response = future.result()
+            response.raise_for_status()
+        except Exception as e:
+            return Result(index, item, response, e)
+        return Result(index, item, response, None)
+
+    def _finish(self, result):
+        self.summary.add(result)
+        return result
+
+    def results(self):
+        """
+        Runs the whole batch, returning every `Result` in a list.
+        """
+        return list(self)
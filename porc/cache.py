@@ -0,0 +1,345 @@
+from collections import OrderedDict
+import copy
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from requests.models import Response as Requests_Response
+from requests.structures import CaseInsensitiveDict
+from . import router
+
+RECORD_HEADER = struct.Struct('>II')
+
+
+def item_key(url):
+    """
+    Returns `(collection, key)` if `url` addresses an item itself,
+    rather than a collection or an item's refs, events or relations.
+    """
+    location = router.parse(url)
+    if location is None or location.key is None:
+        return None
+    path = url[url.find('/v0/') + 4:].split('?', 1)[0].strip('/')
+    if path.count('/') != 1:
+        return None
+    return (location.collection, location.key)
+
+
+class ItemCache(object):
+
+    """
+    A read-through cache of items by `(collection, key)`, for
+    `Client(..., cache=ItemCache())`.
+
+    For `ttl` seconds after an item is fetched, `Client.get` returns
+    it without a request. After that, the client revalidates it with
+    `If-None-Match`; a `304 Not Modified` renews the cached copy
+    rather than transferring it again. The least recently used items
+    are evicted beyond `max_items`, or `max_bytes` of response bodies.
+    The client's own writes to an item invalidate it.
+    """
+
+    def __init__(self, max_items=1000, ttl=60, max_bytes=None):
+        self.max_items = max_items
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = dict(
+            hits=0, misses=0, revalidations=0, evictions=0, invalidations=0)
+
+    def lookup(self, collection, key):
+        """
+        Returns `(response, etag)` for a cached item, where `response`
+        is a copy of the cached `requests` response if it's still
+        fresh, or else `None`, meaning the item needs revalidating.
+        Returns `None` if the item isn't cached.
+        """
+        with self._lock:
+            entry = self._entries.get((collection, key))
+            if entry is None:
+                return None
+            stored, response, size = entry
+            self._entries[(collection, key)] = self._entries.pop((collection, key))
+            etag = response.headers.get('etag')
+            if time.time() - stored < self.ttl:
+                self._stats['hits'] += 1
+                return copy.copy(response), etag
+            return None, etag
+
+    def handle(self, response):
+        """
+        Updates the cache from a `requests` response to one of the
+        client's requests, returning the response to use in its place.
+        """
+        request = response.request
+        if request is None:
+            return response
+        key = item_key(request.url)
+        if request.method == 'GET' and key:
+            if response.status_code == 304:
+                return self._revalidated(key, response)
+            with self._lock:
+                self._stats['misses'] += 1
+            if response.status_code == 200 and response.headers.get('etag'):
+                self._store(key, response)
+            else:
+                self.invalidate(*key)
+        elif request.method in ['PUT', 'POST', 'PATCH', 'DELETE']:
+            location = router.parse(request.url)
+            if key:
+                self.invalidate(*key)
+            elif location and location.key is None and request.method == 'DELETE':
+                self.invalidate_collection(location.collection)
+        return response
+
+    def _revalidated(self, key, response):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return response
+            self._stats['revalidations'] += 1
+            self._entries[key] = (time.time(),) + entry[1:]
+            return copy.copy(entry[1])
+
+    def _store(self, key, response):
+        size = len(response.content or b'')
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        # a copy, since the response handed back may release its body
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (time.time(), copy.copy(response), size)
+            self._bytes += size
+            while self._entries and (
+                    len(self._entries) > self.max_items or
+                    (self.max_bytes is not None and self._bytes > self.max_bytes)):
+                self._discard(next(iter(self._entries)))
+                self._stats['evictions'] += 1
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+        return entry
+
+    def invalidate(self, collection, key):
+        with self._lock:
+            if self._discard((collection, key)):
+                self._stats['invalidations'] += 1
+
+    def invalidate_collection(self, collection):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == collection]:
+                self._discard(key)
+                self._stats['invalidations'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """
+        Returns counters: `hits` served without a request, `misses`
+        fetched in full, and `revalidations` answered with a 304, plus
+        `evictions`, `invalidations`, and the current `items` and
+        `bytes` held.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update(items=len(self._entries), bytes=self._bytes)
+        return stats
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class VersionCache(object):
+
+    """
+    A cache of item versions by `(collection, key, ref)`, for
+    `Client(..., versions=VersionCache())`. A version never changes,
+    so once fetched with `Client.get(collection, key, ref)`, or listed
+    with its value by `Client.refs`, it's never requested again.
+
+    Up to `max_bytes` of bodies are kept in memory, least recently
+    used first out. Given a `path`, every version is also appended to
+    that file, which is memory-mapped to serve versions evicted from
+    memory, and reloaded by later caches given the same path. Use one
+    file per Orchestrate application.
+    """
+
+    def __init__(self, max_bytes=64 * 2 ** 20, path=None):
+        self.max_bytes = max_bytes
+        self.store = MappedStore(path) if path else None
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = dict(hits=0, disk_hits=0, misses=0, evictions=0)
+
+    def lookup(self, url, collection, key, ref):
+        """
+        Returns a `requests` response for the version at `url`,
+        or `None` if it isn't cached.
+        """
+        version = (collection, key, ref)
+        with self._lock:
+            body = self._entries.get(version)
+            if body is not None:
+                self._entries[version] = self._entries.pop(version)
+                self._stats['hits'] += 1
+        if body is None and self.store is not None:
+            body = self.store.get(version)
+            if body is not None:
+                self._remember(version, body)
+                with self._lock:
+                    self._stats['disk_hits'] += 1
+        if body is None:
+            with self._lock:
+                self._stats['misses'] += 1
+            return None
+        return self._response(url, ref, body)
+
+    def _response(self, url, ref, body):
+        response = Requests_Response()
+        response.status_code = 200
+        response.reason = 'OK'
+        response.url = url
+        response.encoding = 'utf-8'
+        response.headers = CaseInsensitiveDict({
+            'Content-Type': 'application/json',
+            'ETag': '"%s"' % ref
+        })
+        response._content = body
+        return response
+
+    def handle(self, response):
+        """
+        Stores the versions in a `requests` response to one of the
+        client's requests: a version got by ref, or those listed with
+        their values by `refs`.
+        """
+        request = response.request
+        if request is None or request.method != 'GET' or response.status_code != 200:
+            return response
+        location = router.parse(request.url)
+        if location is None or location.key is None:
+            return response
+        if location.ref is not None:
+            self.add(location.collection, location.key, location.ref, response.content)
+        elif request.url.split('?', 1)[0].rstrip('/').endswith('/refs'):
+            for result in response.json().get('results', []):
+                path = result.get('path', {})
+                if 'value' in result and path.get('ref') and not path.get('tombstone'):
+                    body = json.dumps(result['value']).encode('utf-8')
+                    self.add(location.collection, location.key, path['ref'], body)
+        return response
+
+    def add(self, collection, key, ref, body):
+        version = (collection, key, ref)
+        if self.store is not None:
+            self.store.put(version, body)
+        self._remember(version, body)
+
+    def _remember(self, version, body):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if version in self._entries:
+                return
+            self._entries[version] = body
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self._stats['evictions'] += 1
+
+    def stats(self):
+        """
+        Returns counters: `hits` from memory, `disk_hits` from the
+        backing file, `misses` and `evictions`, plus the `items` and
+        `bytes` held in memory.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update(items=len(self._entries), bytes=self._bytes)
+        return stats
+
+    def close(self):
+        if self.store is not None:
+            self.store.close()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class MappedStore(object):
+
+    """
+    An append-only file of versions, read through a memory map.
+    Each record is a header of two lengths, the version as JSON,
+    then the body. The index of where each version's body lies is
+    rebuilt from the records when the file is opened.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.index = dict()
+        self._file = open(path, 'a+b')
+        self._map = None
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        self._file.seek(0, os.SEEK_END)
+        end = self._file.tell()
+        offset = 0
+        self._file.seek(0)
+        while offset + RECORD_HEADER.size <= end:
+            version_length, body_length = RECORD_HEADER.unpack(
+                self._file.read(RECORD_HEADER.size))
+            start = offset + RECORD_HEADER.size + version_length
+            if start + body_length > end:
+                break
+            version = tuple(json.loads(self._file.read(version_length).decode('utf-8')))
+            self.index[version] = (start, body_length)
+            self._file.seek(body_length, os.SEEK_CUR)
+            offset = start + body_length
+        # drop a record cut short, so the next one starts cleanly
+        self._file.truncate(offset)
+
+    def get(self, version):
+        with self._lock:
+            location = self.index.get(version)
+            if location is None:
+                return None
+            start, length = location
+            if self._map is None or len(self._map) < start + length:
+                if self._map is not None:
+                    self._map.close()
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            return self._map[start:start + length]
+
+    def put(self, version, body):
+        encoded = json.dumps(list(version)).encode('utf-8')
+        with self._lock:
+            if version in self.index:
+                return
+            self._file.seek(0, os.SEEK_END)
+            start = self._file.tell() + RECORD_HEADER.size + len(encoded)
+            self._file.write(RECORD_HEADER.pack(len(encoded), len(body)))
+            self._file.write(encoded)
+            self._file.write(body)
+            self._file.flush()
+            self.index[version] = (start, len(body))
+
+    def close(self):
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            self._file.close()
@@ -1,34 +1,70 @@
 from datetime import datetime
 from .resource import Resource
+from .transport import Transport
 from .version import VERSION
 from .pages import Pages
+from .buffer import WriteBuffer
+from .mirror import Mirror
+from .bulk import Batch, event_items, event_submitter, item_submitter, item_updater
+from .events import EventReader
+from .deadline import Deadline
+from .graph import Traversal
+from . import backup
 from . import util
 
 
 class Client(Resource):
 
-    def __init__(self, api_key, custom_url=None, use_async=False, **kwargs):
+    transport_class = Transport
+
+    def __init__(self, api_key, custom_url=None, use_async=False,
+                 pool_size=10, max_workers=2, executor=None, keep_body=True,
+                 cache=None, versions=None, coalesce=False, codec=None,
+                 compress=None, limiter=None, retry=None, metrics=None,
+                 hedge=None, transport=None, deadline=None, **kwargs):
         self.api_key = api_key
         self.url = custom_url or 'https://api.orchestrate.io/v0'
         if 'headers' not in kwargs:
             kwargs['headers'] = {
                 'Content-Type': 'application/json',
                 'Accept': 'application/json',
+                'Accept-Encoding': 'gzip, deflate',
                 'User-Agent': 'python-requests/1.2.0 porc/%s' % VERSION
             }
         kwargs['auth'] = (self.api_key, '')
-        super(Client, self).__init__(self.url, use_async, **kwargs)
+        if transport is None:
+            transport = self.transport_class(
+                pool_size, max_workers, executor, keep_body, cache=cache,
+                versions=versions, coalesce=coalesce, codec=codec,
+                compress=compress, limiter=limiter, retry=retry,
+                metrics=metrics, hedge=hedge, **kwargs)
+        super(Client, self).__init__(self.url, use_async, transport, deadline, **kwargs)
 
     def ping(self):
         return self._make_request('HEAD')
 
     def get(self, collection, key, ref=None):
+        versions, cache = self.transport.versions, self.transport.cache
         if ref:
             path = [collection, key, 'refs', ref]
+            if versions is not None:
+                response = versions.lookup(
+                    self._merge_paths(path), collection, key, ref)
+                if response is not None:
+                    return self._cached(response)
         else:
             path = [collection, key]
+            cached = cache.lookup(collection, key) if cache is not None else None
+            if cached is not None:
+                response, etag = cached
+                if response is not None:
+                    return self._cached(response)
+                return self._make_request('GET', path, headers={'If-None-Match': etag})
         return self._make_request('GET', path)
 
+    def _cached(self, response):
+        return self.transport.completed(self._wrap(response), self.use_async)
+
     def post(self, collection, body, handler=None):
         return self._make_request('POST', collection, body, handler=handler)
 
@@ -55,17 +91,25 @@ class Client(Resource):
     def refs(self, collection, key, **params):
         return self._make_request('GET', [collection, key, 'refs'], params)
 
-    def list(self, collection, **params):
-        return Pages(self.opts, self.uri, collection, params)
+    def list(self, collection, cursor=None, **params):
+        return self._pages(collection, params, cursor)
 
-    def search(self, collection, query, **params):
+    def search(self, collection, query, cursor=None, **params):
         params['query'] = query
-        return Pages(self.opts, self.uri, collection, params)
+        return self._pages(collection, params, cursor)
 
     def get_relations(self, collection, key, *relations):
         path = [collection, key, 'relations'] + list(relations)
         return self._make_request('GET', path)
 
+    def traverse(self, starts, kinds, depth=1, concurrency=None, limit=100):
+        """
+        Walks relations of the given kinds out from many items, up to
+        `depth` hops. Returns a `Traversal`, yielding each item reached
+        once, as a `Node`.
+        """
+        return Traversal(self, starts, kinds, depth, concurrency, limit)
+
     def put_relation(self, collection, key, relation, to_collection, to_key):
         path = [collection, key, 'relation', relation, to_collection, to_key]
         return self._make_request('PUT', path)
@@ -107,15 +151,149 @@ class Client(Resource):
             headers['If-Match'] = ref.center(len(ref) + 2, '"')
         return self._make_request('DELETE', path, params, headers=headers)
 
-    def list_events(self, collection, key, event_type, **params):
+    def list_events(self, collection, key, event_type, cursor=None, **params):
         path = [collection, key, 'events', event_type]
         for param in ['startEvent', 'afterEvent', 'beforeEvent', 'endEvent']:
             if param in params and isinstance(params[param], datetime):
                 params[param] = util.datetime_to_timestamp(params[param])
-        return Pages(self.opts, self.uri, path, params)
+        return self._pages(path, params, cursor)
+
+    def read_events(self, collection, key, event_type, start, end, windows=8,
+                    concurrency=None, prefetch=1, limit=100, resume=None):
+        """
+        Reads events in [`start`, `end`) by listing windows of time
+        concurrently. Returns an `EventReader`, yielding them newest
+        first.
+        """
+        return EventReader(self, collection, key, event_type, start, end,
+                           windows, concurrency, prefetch, limit, resume)
+
+    def export_collection(self, collection, path, limit=100, checkpoint_every=1000):
+        """
+        Streams every item in `collection` to a gzipped NDJSON file,
+        resuming from its checkpoint if there is one. Returns the
+        number of items exported.
+        """
+        return backup.export_collection(self, collection, path, limit, checkpoint_every)
+
+    def import_collection(self, path, collection, concurrency=None, checkpoint_every=1000):
+        """
+        Puts every item in a file written by `export_collection` into
+        `collection`, resuming from its checkpoint if there is one.
+        Returns the number of items imported.
+        """
+        return backup.import_collection(self, path, collection, concurrency, checkpoint_every)
+
+    def get_many(self, items, concurrency=None, ordered=True):
+        """
+        Gets many items at once. Each item is a tuple of
+        `(collection, key[, ref])`. Returns a `Batch`.
+        """
+        return self._batch('get', items, concurrency, ordered)
+
+    def put_many(self, items, concurrency=None, ordered=True):
+        """
+        Puts many items at once. Each item is a tuple of
+        `(collection, key, body[, ref])`. Returns a `Batch`.
+        """
+        return self._batch('put', items, concurrency, ordered)
+
+    def delete_many(self, items, concurrency=None, ordered=True):
+        """
+        Deletes many items at once. Each item is a tuple of
+        `(collection, key[, ref])`. Returns a `Batch`.
+        """
+        return self._batch('delete', items, concurrency, ordered)
+
+    def update_many(self, collection, keys, fn, concurrency=None, ordered=True,
+                    max_attempts=5):
+        """
+        Updates many items at once. Each key's item is read and passed
+        to `fn`, which returns its new body, or `None` to write the item
+        as it left it. Writes are conditional on the ref read, and keys
+        whose item changed in the meantime are read and updated again,
+        up to `max_attempts` times. Returns a `Batch`, whose items are
+        `(collection, key)`.
+        """
+        client = self
+        if self.use_async:
+            # the updates block on their reads and writes, on the executor
+            client = Client(self.api_key, self.url, transport=self.transport,
+                            deadline=self.deadline, **self.opts)
+        submit = item_updater(client, fn, max_attempts)
+        items = ((collection, key) for key in keys)
+        return Batch(submit, items, self._concurrency(concurrency), ordered)
+
+    def post_events_many(self, events, concurrency=None, ordered=True):
+        """
+        Posts many events at once. Each event is a tuple of
+        `(collection, key, event_type, data[, timestamp])`, or `events`
+        is a mapping of `collection`, `key`, `type`, `data` and
+        optionally `timestamp` columns. Events on the same item and
+        type are posted in order. Returns a `Batch`.
+        """
+        submit = event_submitter(self.async_())
+        return Batch(submit, event_items(events), self._concurrency(concurrency), ordered)
+
+    def _batch(self, method, items, concurrency, ordered):
+        submit = item_submitter(self.async_(), method)
+        return Batch(submit, items, self._concurrency(concurrency), ordered)
+
+    def _concurrency(self, concurrency):
+        max_workers = self.transport.max_workers
+        concurrency = concurrency or max_workers
+        if concurrency > max_workers:
+            raise ValueError(
+                'concurrency %d exceeds the client\'s max_workers (%d)' % (
+                    concurrency, max_workers))
+        return concurrency
+
+    def _pages(self, path, params, cursor=None):
+        return Pages(self.opts, self.uri, path, params, self.transport, cursor,
+                     self.deadline)
+
+    def close(self):
+        """
+        Closes the pooled connections and worker threads
+        shared by this client, its `Pages`, and its `Async` clients.
+        """
+        return self.transport.close()
+
+    def mirror(self, collection, store=None, indexes=(), limit=100):
+        """
+        Returns a `Mirror`, a local copy of `collection` which `sync`
+        loads and then keeps up to date.
+        """
+        return Mirror(self, collection, store, indexes, limit)
+
+    def write_buffer(self, max_pending=1000, interval=0.5, concurrency=None,
+                     callback=None):
+        """
+        Returns a `WriteBuffer`, which folds puts to the same item
+        together and sends writes in the background.
+        """
+        return WriteBuffer(self, max_pending, interval, concurrency, callback)
+
+    def async_(self):
+        return Async(self.api_key, self.url, transport=self.transport,
+                     deadline=self.deadline, **self.opts)
+
+    def within(self, deadline):
+        """
+        Returns a client sharing this one's transport, whose requests,
+        listings and batches must all finish within `deadline`, a
+        `Deadline` or a number of seconds from now.
+        """
+        if not isinstance(deadline, Deadline):
+            deadline = Deadline(deadline)
+        client = type(self)(self.api_key, self.url, transport=self.transport,
+                            deadline=deadline, **self.opts)
+        client.use_async = self.use_async
+        return client
+
 
-    def async(self):
-        return Async(self.api_key, self.url, **self.opts)
+# `async` is a keyword from Python 3.7 on, where only `async_` is usable
+setattr(Client, 'async', Client.__dict__['async_'])
 
 
 class Async(Client):
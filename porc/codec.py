@@ -0,0 +1,97 @@
+"""
+JSON codecs for request and response bodies. `best()` picks the
+fastest one installed: orjson, then ujson, then the standard library.
+"""
+import json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+class JSONCodec(object):
+
+    """
+    Encodes objects to JSON bytes, and decodes JSON bytes, with the
+    standard library. `handler` acts as `json.dumps`'s `default`.
+    """
+
+    name = 'json'
+
+    def encode(self, obj, handler=None):
+        return json.dumps(obj, default=handler).encode('utf-8')
+
+    def decode(self, content):
+        if not isinstance(content, str):
+            content = content.decode('utf-8')
+        return json.loads(content)
+
+    def __repr__(self):
+        return '<%s>' % type(self).__name__
+
+
+class OrjsonCodec(JSONCodec):
+
+    """
+    Encodes and decodes with orjson, which works in bytes throughout.
+    Datetimes and dataclasses go to the `handler`, as with the standard
+    library, rather than being encoded by orjson, and without one they
+    raise `TypeError`. Subclasses of dicts, lists, strings and numbers
+    are encoded as their base types, as the standard library does.
+    Anything orjson refuses, like integers beyond 64 bits, falls back
+    to the standard library.
+    """
+
+    name = 'orjson'
+
+    def encode(self, obj, handler=None):
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        try:
+            return orjson.dumps(obj, default=handler, option=option)
+        except orjson.JSONEncodeError:
+            return JSONCodec.encode(self, obj, handler)
+
+    def decode(self, content):
+        try:
+            return orjson.loads(content)
+        except orjson.JSONDecodeError:
+            return JSONCodec.decode(self, content)
+
+
+class UjsonCodec(JSONCodec):
+
+    """
+    Encodes and decodes with ujson. It encodes to a str first,
+    and falls back to the standard library given a `handler`.
+    """
+
+    name = 'ujson'
+
+    def encode(self, obj, handler=None):
+        if handler is not None:
+            return JSONCodec.encode(self, obj, handler)
+        return ujson.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+    def decode(self, content):
+        return ujson.loads(content)
+
+
+def available():
+    """
+    Returns a codec for every backend installed, fastest first.
+    """
+    codecs = []
+    if orjson is not None:
+        codecs.append(OrjsonCodec())
+    if ujson is not None:
+        codecs.append(UjsonCodec())
+    codecs.append(JSONCodec())
+    return codecs
+
+
+def best():
+    return available()[0]
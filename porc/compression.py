@@ -0,0 +1,76 @@
+import gzip
+import io
+import threading
+import time
+
+# CPU time of the calling thread, where the platform can tell
+cpu_time = getattr(time, 'thread_time', None) or getattr(time, 'process_time', time.time)
+
+ENCODINGS = frozenset(['gzip', 'deflate'])
+
+
+class Compression(object):
+
+    """
+    Gzips request bodies of at least `threshold` bytes, or none if
+    `threshold` is `None`, and counts what compression saved, both on
+    those bodies and on the compressed responses `requests` decodes.
+    """
+
+    def __init__(self, threshold=None, level=6):
+        self.threshold = threshold
+        self.level = level
+        self._lock = threading.Lock()
+        self._stats = dict(
+            requests_compressed=0, request_bytes=0, request_bytes_sent=0,
+            compress_seconds=0.0, responses_compressed=0, response_bytes=0,
+            response_bytes_received=0)
+
+    def compress(self, data, headers):
+        """
+        Returns the body and headers to send in place of `data` and
+        `headers`, gzipped and marked as such if `data` is big enough.
+        """
+        if self.threshold is None or data is None or len(data) < self.threshold:
+            return data, headers
+        started = cpu_time()
+        buffer = io.BytesIO()
+        with gzip.GzipFile(fileobj=buffer, mode='wb', compresslevel=self.level, mtime=0) as f:
+            f.write(data)
+        compressed = buffer.getvalue()
+        elapsed = cpu_time() - started
+        headers = dict(headers, **{'Content-Encoding': 'gzip'})
+        with self._lock:
+            self._stats['requests_compressed'] += 1
+            self._stats['request_bytes'] += len(data)
+            self._stats['request_bytes_sent'] += len(compressed)
+            self._stats['compress_seconds'] += elapsed
+        return compressed, headers
+
+    def observe(self, response):
+        """
+        Counts the bytes a compressed `requests` response took on the
+        wire, and once decoded. urllib3 decodes it as it's read.
+        """
+        encoding = response.headers.get('content-encoding', '').lower()
+        tell = getattr(response.raw, 'tell', None)
+        if encoding not in ENCODINGS or tell is None:
+            return
+        decoded = len(response.content or b'')
+        with self._lock:
+            self._stats['responses_compressed'] += 1
+            self._stats['response_bytes'] += decoded
+            self._stats['response_bytes_received'] += tell()
+
+    def stats(self):
+        """
+        Returns counters of compressed requests and responses, their
+        bytes before and after compression, the CPU time spent
+        compressing requests, and the total `bytes_saved`.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        stats['bytes_saved'] = (
+            stats['request_bytes'] - stats['request_bytes_sent'] +
+            stats['response_bytes'] - stats['response_bytes_received'])
+        return stats
@@ -0,0 +1,83 @@
+import threading
+import time
+from requests.exceptions import Timeout
+
+
+class DeadlineExceeded(Timeout):
+
+    """
+    Raised when a `Deadline` passes before an operation finishes.
+    `results` holds whatever the operation had gathered by then, as
+    the items `Pages.all` would have returned.
+    """
+
+    def __init__(self, message='deadline exceeded', results=None, **kwargs):
+        super(DeadlineExceeded, self).__init__(message, **kwargs)
+        self.results = results if results is not None else []
+
+
+class Deadline(object):
+
+    """
+    A time budget, `seconds` from now, shared by every request made
+    through a client bound to it (see `Client.within`). Each request's
+    timeout is what's left of the budget, requests made after it's
+    spent raise `DeadlineExceeded`, and futures still pending when it
+    passes are cancelled.
+    """
+
+    def __init__(self, seconds, clock=time.time):
+        self.clock = clock
+        self.expires = clock() + seconds
+        self._futures = set()
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def remaining(self):
+        return max(0.0, self.expires - self.clock())
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def timeout(self):
+        """
+        Returns the seconds left, for a request's timeout, or raises
+        `DeadlineExceeded` if there are none.
+        """
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded()
+        return remaining
+
+    def track(self, future):
+        """
+        Cancels `future` when the deadline passes, unless it's done.
+        """
+        if self.expired():
+            future.cancel()
+            return future
+        with self._lock:
+            self._futures.add(future)
+            if self._timer is None:
+                self._timer = threading.Timer(self.remaining(), self.cancel)
+                self._timer.daemon = True
+                self._timer.start()
+        future.add_done_callback(self._forget)
+        return future
+
+    def _forget(self, future):
+        with self._lock:
+            self._futures.discard(future)
+
+    def cancel(self):
+        """
+        Cancels every pending future tracked. Futures already running
+        can't be cancelled, but their requests time out by then.
+        """
+        with self._lock:
+            futures = list(self._futures)
+            self._futures.clear()
+            if self._timer is not None:
+                self._timer.cancel()
+        for future in futures:
+            future.cancel()
@@ -0,0 +1,147 @@
+from datetime import datetime
+import threading
+try:
+    # python 2
+    from Queue import Queue
+except ImportError:
+    # python 3
+    from queue import Queue
+from .resource import Resource
+from . import util
+
+
+def _timestamp(value):
+    if isinstance(value, datetime):
+        return util.datetime_to_timestamp(value)
+    return int(value)
+
+
+class EventReader(object):
+
+    """
+    Reads the events of one type on one item between `start`
+    (inclusive) and `end` (exclusive), as datetimes or milliseconds
+    since the epoch, newest first, as Orchestrate lists them.
+
+    The range is split into `windows` equal spans of time, which are
+    listed concurrently, each on a thread of its own: up to
+    `concurrency` at once, each fetching up to `prefetch` pages ahead
+    of the one being read, so at most `concurrency * (prefetch + 1)`
+    pages are held in memory. Events
+    still come out in order, since the windows don't overlap.
+
+    `last` is the `(timestamp, ordinal)` of the last event yielded.
+    Pass it as `resume` to a new reader to carry on after it.
+    """
+
+    def __init__(self, client, collection, key, event_type, start, end,
+                 windows=8, concurrency=None, prefetch=1, limit=100,
+                 resume=None):
+        max_workers = client.transport.max_workers
+        concurrency = concurrency or max_workers
+        if concurrency > max_workers:
+            raise ValueError(
+                'concurrency %d exceeds the client\'s max_workers (%d)' % (
+                    concurrency, max_workers))
+        if windows < 1 or prefetch < 1:
+            raise ValueError('windows and prefetch must be at least 1')
+        self.client = client
+        self.resource = Resource(client.uri, transport=client.transport,
+                                 deadline=client.deadline, **client.opts)
+        self.path = [collection, key, 'events', event_type]
+        self.start = _timestamp(start)
+        self.end = _timestamp(end)
+        self.windows = windows
+        self.concurrency = concurrency
+        self.prefetch = prefetch
+        self.limit = limit
+        self.last = resume
+
+    def bounds(self):
+        """
+        Returns the query parameters bounding each window, newest first.
+        """
+        end = self.end
+        newest = None
+        if self.last is not None:
+            # carry on from just before the last event read
+            end = min(end, self.last[0] + 1)
+            newest = '%d/%d' % tuple(self.last)
+        span = max(1, -(-(end - self.start) // self.windows))
+        bounds = []
+        for high in range(end, self.start, -span):
+            low = max(self.start, high - span)
+            bounds.append(dict(startEvent=low, beforeEvent=high))
+        if bounds and newest is not None:
+            bounds[0]['beforeEvent'] = newest
+        return bounds
+
+    def __iter__(self):
+        windows = self.bounds()
+        started = []
+        try:
+            for index in range(len(windows)):
+                # keep `concurrency` windows listing, this one first
+                while len(started) < min(len(windows), index + self.concurrency):
+                    started.append(self._start(windows[len(started)]))
+                for event in self._drain(started[index]):
+                    self.last = (event['timestamp'], event['ordinal'])
+                    yield event
+                started[index] = None
+        finally:
+            for window in started:
+                if window is not None:
+                    self._stop(window)
+
+    def _start(self, params):
+        queue = Queue()
+        slots = threading.Semaphore(self.prefetch)
+        stop = threading.Event()
+        # a thread of its own, since it waits on the consumer: on the
+        # client's executor, it would hold a worker its requests need
+        fetcher = threading.Thread(
+            target=self._fetch, args=(dict(params, limit=self.limit), queue, slots, stop))
+        fetcher.daemon = True
+        fetcher.start()
+        return queue, slots, stop
+
+    def _fetch(self, params, queue, slots, stop):
+        """
+        Lists one window into `queue` a page at a time, whenever a
+        slot is free, ending with `None` or the exception that stopped
+        it. Each page starts before the last event of the one before,
+        so pages follow on however the `next` link is formed.
+        """
+        try:
+            while True:
+                slots.acquire()
+                if stop.is_set():
+                    return
+                response = self.resource._make_request('GET', self.path, dict(params))
+                response.raise_for_status()
+                queue.put(response)
+                results = response['results']
+                if not results or 'next' not in response.links:
+                    break
+                params['beforeEvent'] = '%d/%d' % (
+                    results[-1]['timestamp'], results[-1]['ordinal'])
+            queue.put(None)
+        except Exception as e:
+            queue.put(e)
+
+    def _drain(self, window):
+        queue, slots, stop = window
+        while True:
+            page = queue.get()
+            slots.release()
+            if page is None:
+                return
+            elif isinstance(page, Exception):
+                raise page
+            for event in page['results']:
+                yield event
+
+    def _stop(self, window):
+        queue, slots, stop = window
+        stop.set()
+        slots.release()
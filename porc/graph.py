@@ -0,0 +1,125 @@
+from collections import namedtuple
+from concurrent.futures import wait, FIRST_COMPLETED
+import threading
+
+
+class Node(namedtuple('Node', ['collection', 'key', 'depth', 'item', 'parent'])):
+
+    """
+    An item reached by a `Traversal`, `depth` hops from a start node.
+    `item` is its entry in the relations listing, with its `path` and
+    `value`, and `parent` the `(collection, key)` it was first reached
+    from. Start nodes have depth 0, and no item or parent.
+    """
+
+    __slots__ = ()
+
+
+class Traversal(object):
+
+    """
+    Walks the relations graph outward from each of `starts`, a list
+    of `(collection, key)` pairs, following every relation in `kinds`
+    at each hop, for up to `depth` hops. Iterating yields a `Node` for
+    each item the first time it's reached, hop by hop, so each node
+    has the fewest hops it can be reached in.
+
+    The items of each hop are listed concurrently on the client's
+    executor, `concurrency` at a time. Each `(collection, key)` is
+    listed once per kind; the neighbours found are kept in `adjacency`
+    for as long as the traversal lives, so walking it again, or
+    expanding a node two walks share, sends no requests.
+    """
+
+    def __init__(self, client, starts, kinds, depth=1, concurrency=None, limit=100):
+        max_workers = client.transport.max_workers
+        concurrency = concurrency or max_workers
+        if concurrency > max_workers:
+            raise ValueError(
+                'concurrency %d exceeds the client\'s max_workers (%d)' % (
+                    concurrency, max_workers))
+        if isinstance(kinds, str):
+            kinds = [kinds]
+        self.client = client
+        self.starts = [tuple(start) for start in starts]
+        self.kinds = list(kinds)
+        self.depth = depth
+        self.concurrency = concurrency
+        self.limit = limit
+        self.adjacency = dict()
+        self._stats = dict(listed=0, cached=0)
+        self._lock = threading.Lock()
+
+    def __iter__(self):
+        seen = set()
+        frontier = []
+        for start in self.starts:
+            if start not in seen:
+                seen.add(start)
+                frontier.append(start)
+                yield Node(start[0], start[1], 0, None, None)
+        for depth in range(1, self.depth + 1):
+            if not frontier:
+                break
+            reached = []
+            for node, neighbours in self._expand(frontier):
+                for item in neighbours:
+                    path = item['path']
+                    target = (path['collection'], path['key'])
+                    if target not in seen:
+                        seen.add(target)
+                        reached.append(target)
+                        yield Node(target[0], target[1], depth, item, node)
+            frontier = reached
+
+    def _expand(self, frontier):
+        """
+        Yields `(node, neighbours)` for each node in `frontier` and each
+        kind, as their listings complete.
+        """
+        work = iter([(node, kind) for node in frontier for kind in self.kinds])
+        executor = self.client.transport.executor
+        pending = dict()
+        try:
+            while True:
+                for node, kind in work:
+                    cached = self._cached(node, kind)
+                    if cached is not None:
+                        yield node, cached
+                        continue
+                    pending[executor.submit(self._list, node, kind)] = node
+                    if len(pending) >= self.concurrency:
+                        break
+                if not pending:
+                    return
+                finished, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                for future in finished:
+                    yield pending.pop(future), future.result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def _cached(self, node, kind):
+        with self._lock:
+            neighbours = self.adjacency.get(node + (kind,))
+            if neighbours is not None:
+                self._stats['cached'] += 1
+            return neighbours
+
+    def _list(self, node, kind):
+        collection, key = node
+        pages = self.client._pages([collection, key, 'relations', kind],
+                                   dict(limit=self.limit))
+        neighbours = pages.all()
+        with self._lock:
+            self.adjacency[node + (kind,)] = neighbours
+            self._stats['listed'] += 1
+        return neighbours
+
+    def stats(self):
+        """
+        Returns how many listings were fetched, and how many
+        were answered from `adjacency` instead.
+        """
+        with self._lock:
+            return dict(self._stats)
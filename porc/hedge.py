@@ -0,0 +1,87 @@
+import threading
+from .metrics import Histogram, operation
+
+READS = ('get', 'relations')
+
+
+class Hedge(object):
+
+    """
+    Decides when to hedge a read: send a second copy of a GET that
+    hasn't answered within the `quantile`th percentile of the latency
+    seen for its kind of call, and take whichever answers first.
+    Until `warmup` of those have completed, it waits `initial` seconds;
+    the delay always stays between `min_delay` and `max_delay`.
+
+    Only calls named in `operations` (see `porc.metrics.operation`)
+    are hedged, and hedges are capped at `max_ratio` of the requests
+    they could have doubled, so a slow service isn't sent twice the
+    load.
+    """
+
+    def __init__(self, quantile=95, initial=0.05, min_delay=0.005,
+                 max_delay=1.0, warmup=20, max_ratio=0.05, operations=READS):
+        self.quantile = quantile
+        self.initial = initial
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.warmup = warmup
+        self.max_ratio = max_ratio
+        self.operations = frozenset(operations)
+        self._latency = dict()
+        self._stats = dict(requests=0, hedged=0, won=0)
+        self._lock = threading.Lock()
+
+    def applies(self, method, url, params=None):
+        """
+        Returns the kind of call a request makes, if it's one to hedge,
+        or else `None`.
+        """
+        if method != 'GET':
+            return None
+        name = operation(method, url, params)
+        return name if name in self.operations else None
+
+    def delay(self, name):
+        """
+        Counts a request that could be hedged, and returns how long
+        to wait for its response before hedging it.
+        """
+        with self._lock:
+            self._stats['requests'] += 1
+            histogram = self._latency.get(name)
+            if histogram is None or histogram.count < self.warmup:
+                delay = self.initial
+            else:
+                delay = histogram.percentile(self.quantile)
+        return min(self.max_delay, max(self.min_delay, delay))
+
+    def observe(self, name, latency):
+        with self._lock:
+            histogram = self._latency.get(name)
+            if histogram is None:
+                histogram = self._latency[name] = Histogram()
+            histogram.add(latency)
+
+    def try_hedge(self):
+        """
+        Counts a hedge and returns true, unless it would take
+        hedges over `max_ratio` of requests.
+        """
+        with self._lock:
+            if self._stats['hedged'] + 1 > self.max_ratio * self._stats['requests']:
+                return False
+            self._stats['hedged'] += 1
+            return True
+
+    def won(self):
+        with self._lock:
+            self._stats['won'] += 1
+
+    def stats(self):
+        """
+        Returns how many requests could have been hedged, how many
+        were, and how many hedges answered first.
+        """
+        with self._lock:
+            return dict(self._stats)
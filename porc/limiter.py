@@ -0,0 +1,166 @@
+from email.utils import mktime_tz, parsedate_tz
+import random
+import threading
+import time
+
+# responses saying the service is overloaded
+OVERLOADED = frozenset([429, 503])
+IDEMPOTENT = frozenset(['GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS'])
+
+
+class AdaptiveLimiter(object):
+
+    """
+    Caps the requests in flight at `limit`, which it adjusts as they
+    complete: growing it by about one request per round trip while
+    latency stays within `tolerance` times the lowest seen, and
+    multiplying it by `backoff` on a 429 or 503, a failed request,
+    or latency beyond that. It backs off at most once per round trip,
+    so a burst of throttled responses counts as one signal.
+    """
+
+    def __init__(self, initial=4, min_limit=1, max_limit=100, backoff=0.5,
+                 tolerance=2.0, smoothing=0.2):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.in_flight = 0
+        self.baseline = None
+        self.latency = None
+        self._backed_off = 0.0
+        self._stats = dict(completed=0, throttled=0, backoffs=0)
+        self._ready = threading.Condition(threading.Lock())
+
+    def try_acquire(self):
+        """
+        Takes a slot if one is free, returning whether it did.
+        """
+        with self._ready:
+            if self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return True
+            return False
+
+    def acquire(self, timeout=None):
+        """
+        Waits for a free slot, and takes it. Given a `timeout`, waits
+        at most that many seconds, returning false if no slot came free.
+        """
+        end = None if timeout is None else time.time() + timeout
+        with self._ready:
+            while self.in_flight >= int(self.limit):
+                remaining = None if end is None else end - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._ready.wait(remaining)
+            self.in_flight += 1
+        return True
+
+    def release(self, latency, status=None):
+        """
+        Frees a slot, adjusting the limit for a request that took
+        `latency` seconds and got `status`, or failed if it's `None`.
+        """
+        with self._ready:
+            self.in_flight -= 1
+            self._stats['completed'] += 1
+            if status in OVERLOADED:
+                self._stats['throttled'] += 1
+                self._back_off(latency)
+            elif status is None:
+                self._back_off(latency)
+            else:
+                self._observe(latency)
+                if self.latency > self.tolerance * self.baseline:
+                    self._back_off(latency)
+                else:
+                    self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self._ready.notify_all()
+
+    def _observe(self, latency):
+        if self.latency is None:
+            self.baseline = self.latency = latency
+            return
+        self.latency += self.smoothing * (latency - self.latency)
+        # let the baseline drift up slowly, should the service slow for good
+        self.baseline = min(latency, self.baseline + 0.01 * (self.latency - self.baseline))
+
+    def _back_off(self, latency):
+        now = time.time()
+        round_trip = latency if self.latency is None else self.latency
+        if now - self._backed_off < round_trip:
+            return
+        self._backed_off = now
+        self.limit = max(self.min_limit, self.limit * self.backoff)
+        self._stats['backoffs'] += 1
+
+    def stats(self):
+        with self._ready:
+            stats = dict(self._stats)
+            stats.update(limit=int(self.limit), in_flight=self.in_flight,
+                         latency=self.latency, baseline=self.baseline)
+        return stats
+
+
+class Retry(object):
+
+    """
+    Decides whether, and after how long, to retry a request. Only
+    idempotent methods are retried, at most `max_retries` times, and
+    only after an error or a response with a status in `statuses`.
+    The delay is the response's `Retry-After`, if it has one, or else
+    a random time up to `base * 2 ** attempt` seconds, capped at `cap`.
+    A response asking for a wait longer than `max_retry_after` seconds
+    isn't retried, rather than holding up its caller that long.
+    """
+
+    def __init__(self, max_retries=3, base=0.1, cap=10.0,
+                 statuses=(429, 502, 503, 504), max_retry_after=60.0):
+        self.max_retries = max_retries
+        self.base = base
+        self.cap = cap
+        self.statuses = frozenset(statuses)
+        self.max_retry_after = max_retry_after
+        self.retries = 0
+        self._lock = threading.Lock()
+
+    def delay(self, method, attempt, response=None):
+        """
+        Returns how long to wait before retrying after `attempt`
+        tries got `response`, or an error if it's `None`. Returns
+        `None` if the request shouldn't be retried.
+        """
+        if method.upper() not in IDEMPOTENT or attempt >= self.max_retries:
+            return None
+        if response is not None and response.status_code not in self.statuses:
+            return None
+        delay = None
+        if response is not None:
+            delay = retry_after_seconds(response)
+            if delay is not None and delay > self.max_retry_after:
+                return None
+        if delay is None:
+            delay = random.uniform(0, min(self.cap, self.base * 2 ** attempt))
+        with self._lock:
+            self.retries += 1
+        return delay
+
+
+def retry_after_seconds(response):
+    """
+    Returns the seconds a response's `Retry-After` header asks the
+    client to wait, or `None` if it has none.
+    """
+    value = response.headers.get('retry-after')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        parsed = parsedate_tz(value)
+        if parsed is None:
+            return None
+        return max(0.0, mktime_tz(parsed) - time.time())
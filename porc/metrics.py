@@ -0,0 +1,209 @@
+from bisect import bisect_left
+from collections import deque, namedtuple
+import logging
+import threading
+import time
+from . import router
+
+logger = logging.getLogger(__name__)
+
+# latency bucket bounds in seconds: 1ms to about 17 minutes, by sqrt(2)
+BOUNDS = [0.001 * 2 ** (i / 2.0) for i in range(41)]
+
+
+class Sample(namedtuple('Sample', [
+        'operation', 'method', 'collection', 'status', 'latency',
+        'request_bytes', 'response_bytes', 'retries', 'request_id', 'url'])):
+
+    """
+    One request as the client saw it: `latency` runs from the first
+    attempt to the last response, over `retries` retries. `status` is
+    `None` if the request failed without a response. `request_id` is
+    Orchestrate's `X-ORCHESTRATE-REQ-ID` for it.
+    """
+
+    __slots__ = ()
+
+
+def operation(method, url, params=None):
+    """
+    Names the kind of call a request makes from its method, path and
+    query parameters:
+    `get`, `put`, `post`, `delete`, `list`, `search`, `refs`,
+    `events`, `relations` or `ping`.
+    """
+    segments = router.split(url)
+    if segments is None:
+        return 'ping' if method == 'HEAD' else method.lower()
+    # what follows the key: refs, events, relation or relations
+    section = segments[2] if len(segments) > 2 else None
+    if section == 'events':
+        return 'events'
+    if section in ('relation', 'relations'):
+        return 'relations'
+    if section == 'refs':
+        return 'refs'
+    if len(segments) < 2 or not segments[1]:
+        if method == 'GET':
+            return 'search' if 'query' in (params or {}) or 'query=' in url else 'list'
+    return method.lower()
+
+
+class Histogram(object):
+
+    """
+    Counts values into fixed, exponentially spaced buckets, so that
+    recording one is a bisect and percentiles are estimates within
+    a factor of sqrt(2).
+    """
+
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        self.counts[bisect_left(BOUNDS, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q):
+        """
+        Returns the upper bound of the bucket holding the `q`th
+        percentile, or the largest value if that's lower.
+        """
+        if not self.count:
+            return None
+        rank = q / 100.0 * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                bound = BOUNDS[index] if index < len(BOUNDS) else self.max
+                return min(bound, self.max)
+        return self.max
+
+    def export(self):
+        return dict(
+            count=self.count,
+            mean=self.total / self.count if self.count else None,
+            p50=self.percentile(50),
+            p90=self.percentile(90),
+            p99=self.percentile(99),
+            max=self.max,
+            buckets=[(bound, count) for bound, count in
+                     zip(BOUNDS + [float('inf')], self.counts) if count]
+        )
+
+
+class Endpoint(object):
+
+    """
+    Totals for one operation on one collection.
+    """
+
+    __slots__ = ('latency', 'statuses', 'errors', 'retries',
+                 'request_bytes', 'response_bytes')
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.statuses = dict()
+        self.errors = 0
+        self.retries = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+
+    def add(self, sample):
+        self.latency.add(sample.latency)
+        self.statuses[sample.status] = self.statuses.get(sample.status, 0) + 1
+        if sample.status is None or sample.status >= 400:
+            self.errors += 1
+        self.retries += sample.retries
+        self.request_bytes += sample.request_bytes
+        self.response_bytes += sample.response_bytes
+
+    def export(self, elapsed):
+        return dict(
+            latency=self.latency.export(),
+            throughput=self.latency.count / elapsed if elapsed else None,
+            statuses=dict(self.statuses),
+            errors=self.errors,
+            retries=self.retries,
+            request_bytes=self.request_bytes,
+            response_bytes=self.response_bytes
+        )
+
+
+class Metrics(object):
+
+    """
+    Records a `Sample` of every request a client sends, totalled by
+    operation and collection. `callback`, if given, is called with
+    each sample. Requests taking `slow` seconds or more are logged
+    to the `porc.metrics` logger, and the last `keep_slow` of them
+    kept in `slow_requests`.
+    """
+
+    def __init__(self, callback=None, slow=1.0, keep_slow=100, clock=time.time):
+        self.callback = callback
+        self.slow = slow
+        self.clock = clock
+        self.slow_requests = deque(maxlen=keep_slow)
+        self.started = self.clock()
+        self._endpoints = dict()
+        self._lock = threading.Lock()
+
+    def record(self, method, url, response, latency, retries=0,
+               request_bytes=0, params=None):
+        """
+        Records a request, given its response or `None`.
+        """
+        status = response_bytes = request_id = None
+        if response is not None:
+            status = response.status_code
+            response_bytes = len(response.content or b'')
+            request_id = response.headers.get('x-orchestrate-req-id')
+        location = router.parse(url)
+        sample = Sample(
+            operation(method, url, params), method,
+            location.collection if location else None, status, latency,
+            request_bytes, response_bytes or 0, retries, request_id, url)
+        with self._lock:
+            key = (sample.operation, sample.collection)
+            endpoint = self._endpoints.get(key)
+            if endpoint is None:
+                endpoint = self._endpoints[key] = Endpoint()
+            endpoint.add(sample)
+            if self.slow is not None and latency >= self.slow:
+                self.slow_requests.append(sample)
+        if self.slow is not None and latency >= self.slow:
+            logger.warning('slow request: %s %s took %.3fs (status %s, %d retries, req-id %s)',
+                           method, url, latency, status, retries, request_id)
+        if self.callback is not None:
+            self.callback(sample)
+        return sample
+
+    def export(self):
+        """
+        Returns a list of dicts, one per operation and collection,
+        with its latency histogram and percentiles in seconds,
+        requests per second since the last reset, status counts,
+        errors, retries and bytes sent and received.
+        """
+        with self._lock:
+            elapsed = self.clock() - self.started
+            return [dict(endpoint.export(elapsed), operation=name,
+                         collection=collection)
+                    for (name, collection), endpoint in sorted(
+                        self._endpoints.items(), key=lambda item: str(item[0]))]
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+            self.slow_requests.clear()
+            self.started = self.clock()
@@ -0,0 +1,349 @@
+"""
+A local copy of a collection, loaded once and then kept up to date
+by fetching only the items changed since the last sync. Reads are
+served from the copy, without a request.
+"""
+import json
+import sqlite3
+import threading
+
+# only items, not events or relations, sorted by when they changed
+ITEMS = '@path.kind:item'
+OLDEST_FIRST = '@path.reftime:asc'
+NEWEST_FIRST = '@path.reftime:desc'
+
+
+def reftime(result):
+    """
+    Returns when a listed or searched item was last changed,
+    in milliseconds since the epoch.
+    """
+    value = result.get('reftime')
+    if value is None:
+        value = result.get('path', {}).get('reftime')
+    return int(value or 0)
+
+
+def field_values(value, field):
+    """
+    Returns the values at `field` of an item, a name or a dotted path
+    into nested objects, to index it by: the elements of a list, the
+    value itself, or none if it's missing or an object.
+    """
+    for name in field.split('.'):
+        if not isinstance(value, dict) or name not in value:
+            return []
+        value = value[name]
+    if isinstance(value, list):
+        return [element for element in value if not isinstance(element, (dict, list))]
+    if isinstance(value, dict):
+        return []
+    return [value]
+
+
+class MemoryStore(object):
+
+    """
+    Keeps a mirror's items in memory, for the life of the process.
+    """
+
+    def __init__(self):
+        self._items = dict()
+        self._meta = dict()
+
+    def get(self, key):
+        """
+        Returns `(ref, reftime, value)` for an item, or `None`.
+        """
+        return self._items.get(key)
+
+    def put(self, key, ref, reftime, value):
+        self._items[key] = (ref, reftime, value)
+
+    def delete(self, key):
+        self._items.pop(key, None)
+
+    def keys(self):
+        return list(self._items)
+
+    def items(self):
+        """
+        Yields `(key, ref, reftime, value)` for every item.
+        """
+        for key, (ref, reftime, value) in list(self._items.items()):
+            yield key, ref, reftime, value
+
+    def get_meta(self, name):
+        return self._meta.get(name)
+
+    def set_meta(self, name, value):
+        self._meta[name] = value
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+    def __len__(self):
+        return len(self._items)
+
+
+class SQLiteStore(object):
+
+    """
+    Keeps a mirror's items in an SQLite database at `path`, so a
+    mirror opened on it later only syncs what changed since. Up to
+    `mmap_size` bytes of the file are read through a memory map,
+    rather than copied through SQLite's page cache. Each sync is
+    committed in one transaction, along with how far it got.
+    """
+
+    def __init__(self, path, mmap_size=256 * 2 ** 20):
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.execute('PRAGMA mmap_size = %d' % int(mmap_size))
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS items ('
+                'key TEXT PRIMARY KEY, ref TEXT, reftime INTEGER, value TEXT)')
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)')
+            self._db.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._db.execute(
+                'SELECT ref, reftime, value FROM items WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        return row[0], row[1], json.loads(row[2])
+
+    def put(self, key, ref, reftime, value):
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO items (key, ref, reftime, value) VALUES (?, ?, ?, ?)',
+                (key, ref, reftime, json.dumps(value)))
+
+    def delete(self, key):
+        with self._lock:
+            self._db.execute('DELETE FROM items WHERE key = ?', (key,))
+
+    def keys(self):
+        with self._lock:
+            return [row[0] for row in self._db.execute('SELECT key FROM items')]
+
+    def items(self):
+        with self._lock:
+            rows = self._db.execute('SELECT key, ref, reftime, value FROM items').fetchall()
+        for key, ref, reftime, value in rows:
+            yield key, ref, reftime, json.loads(value)
+
+    def get_meta(self, name):
+        with self._lock:
+            row = self._db.execute(
+                'SELECT value FROM meta WHERE name = ?', (name,)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def set_meta(self, name, value):
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)',
+                (name, json.dumps(value)))
+
+    def commit(self):
+        with self._lock:
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM items').fetchone()[0]
+
+
+class Mirror(object):
+
+    """
+    A local copy of `collection`, kept in `store` (by default, a
+    `MemoryStore`), and indexed by each field in `indexes`.
+
+    The first `sync` lists the whole collection, `limit` items per
+    page. Later syncs search for items changed since the last one,
+    oldest first, and skip any whose ref the mirror already has.
+    Deleted items can't be found that way, so they're only dropped
+    by a full sync, `sync(full=True)`.
+
+    Values are shared with the mirror, so don't modify them.
+    """
+
+    def __init__(self, client, collection, store=None, indexes=(), limit=100):
+        self.client = client
+        self.collection = collection
+        self.store = store if store is not None else MemoryStore()
+        self.limit = limit
+        self.indexes = dict((field, dict()) for field in indexes)
+        self._lock = threading.RLock()
+        self._stats = dict(syncs=0, updated=0, deleted=0)
+        for key, ref, _, value in self.store.items():
+            self._index(key, value)
+
+    def sync(self, full=False):
+        """
+        Brings the mirror up to date, returning how many items were
+        added, changed or dropped.
+        """
+        with self._lock:
+            watermark = self.store.get_meta('watermark')
+            if full or watermark is None:
+                changed = self._load()
+            else:
+                changed = self._catch_up(watermark)
+            self.store.commit()
+            self._stats['syncs'] += 1
+        return changed
+
+    def _load(self):
+        # anything changed while we list comes after this
+        page = self._search(ITEMS, NEWEST_FIRST, 1)
+        latest = reftime(page[0]) if page else 0
+        changed = 0
+        seen = set()
+        listing = self.client.list(self.collection, limit=self.limit)
+        for result in listing.iter_items():
+            seen.add(result['path']['key'])
+            changed += self._apply(result)
+        for key in self.store.keys():
+            if key not in seen:
+                changed += self._remove(key)
+        self.store.set_meta('watermark', latest)
+        return changed
+
+    def _catch_up(self, watermark):
+        """
+        Pages through the items changed since `watermark`, starting
+        each page from the newest change on the one before. Items
+        changed at that same millisecond are seen again, and skipped.
+        """
+        changed = 0
+        offset = 0
+        while True:
+            query = '%s AND @path.reftime:[%d TO *]' % (ITEMS, watermark)
+            results = self._search(query, OLDEST_FIRST, self.limit, offset)
+            for result in results:
+                changed += self._apply(result)
+            latest = max([watermark] + [reftime(result) for result in results])
+            # a page changed all at once: step past it
+            offset = offset + self.limit if latest == watermark else 0
+            watermark = latest
+            if len(results) < self.limit:
+                break
+        self.store.set_meta('watermark', watermark)
+        return changed
+
+    def _search(self, query, sort, limit, offset=0):
+        page = self.client.search(
+            self.collection, query, sort=sort, limit=limit, offset=offset).next()
+        page.raise_for_status()
+        return page['results']
+
+    def _apply(self, result):
+        key = result['path']['key']
+        ref = result['path']['ref']
+        current = self.store.get(key)
+        if current is not None:
+            if current[0] == ref:
+                return 0
+            self._unindex(key, current[2])
+        self.store.put(key, ref, reftime(result), result['value'])
+        self._index(key, result['value'])
+        self._stats['updated'] += 1
+        return 1
+
+    def _remove(self, key):
+        current = self.store.get(key)
+        if current is None:
+            return 0
+        self._unindex(key, current[2])
+        self.store.delete(key)
+        self._stats['deleted'] += 1
+        return 1
+
+    def _index(self, key, value):
+        for field, index in self.indexes.items():
+            for term in field_values(value, field):
+                index.setdefault(term, set()).add(key)
+
+    def _unindex(self, key, value):
+        for field, index in self.indexes.items():
+            for term in field_values(value, field):
+                keys = index.get(term)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del index[term]
+
+    def get(self, key, default=None):
+        """
+        Returns an item's value, or `default` if the mirror hasn't got it.
+        """
+        with self._lock:
+            current = self.store.get(key)
+        return default if current is None else current[2]
+
+    def ref(self, key):
+        """
+        Returns the ref of the mirror's copy of an item, or `None`.
+        """
+        with self._lock:
+            current = self.store.get(key)
+        return None if current is None else current[0]
+
+    def find(self, field, value):
+        """
+        Returns `(key, value)` for each item whose indexed `field` is,
+        or is a list containing, `value`, in order of key.
+        """
+        with self._lock:
+            if field not in self.indexes:
+                raise ValueError('%s is not indexed' % field)
+            keys = sorted(self.indexes[field].get(value, ()))
+            return [(key, self.store.get(key)[2]) for key in keys]
+
+    def items(self):
+        """
+        Returns `(key, value)` for every item, in no particular order.
+        """
+        with self._lock:
+            return [(key, value) for key, _, _, value in self.store.items()]
+
+    def stats(self):
+        """
+        Returns how many syncs were run, items updated and dropped
+        by them, and the items held.
+        """
+        with self._lock:
+            return dict(self._stats, items=len(self.store))
+
+    def close(self):
+        self.store.close()
+
+    def __contains__(self, key):
+        return self.ref(key) is not None
+
+    def __iter__(self):
+        with self._lock:
+            return iter(self.store.keys())
+
+    def __len__(self):
+        with self._lock:
+            return len(self.store)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, stacktrace):
+        self.close()
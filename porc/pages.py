@@ -1,24 +1,39 @@
+from .deadline import DeadlineExceeded
 from .resource import Resource
-from collections import Iterator
+from . import router
+from .bulk import Batch
+try:
+    # python 3.3+
+    from collections.abc import Iterator
+except ImportError:
+    # python 2
+    from collections import Iterator
 import copy
+import json
+import threading
 try:
     # python 2
-    from urllib import quote
+    from Queue import Queue
+    from urllib import urlencode
 except ImportError:
     # python 3
-    from urllib.parse import quote
+    from queue import Queue
+    from urllib.parse import urlencode
 
 
 class Pages(Iterator):
 
-    def __init__(self, opts, url, path, params):
-        if isinstance(path, list):
-            pages_url = '/'.join([url] + [quote(elem) for elem in path])
-        else:
-            pages_url = '/'.join([url, quote(path)])
-        self.resource = Resource(pages_url, **opts)
+    def __init__(self, opts, url, path, params, transport=None, cursor=None,
+                 deadline=None):
+        if not isinstance(path, list):
+            path = [path]
+        pages_url = '/'.join([url, router.build(path)])
+        self.resource = Resource(pages_url, transport=transport, deadline=deadline, **opts)
         self.params = params
-        self._root_resource = Resource(url[:url.find('/v0')], **opts)
+        self._root_resource = Resource(
+            url[:url.find('/v0')], transport=self.resource.transport,
+            deadline=deadline, **opts)
+        self._start = cursor
         self.response = None
 
     def _handle_page(self, querydict={}, val='next', **headers):
@@ -26,24 +41,50 @@ class Pages(Iterator):
         Executes the request getting the next (or previous) page,
         incrementing (or decrementing) the current page.
         """
-        params = copy.copy(self.params)
-        params.update(querydict)
+        response = self._page_request(querydict, val, headers)
+        self._handle_res(None, response)
+        return response
+
+    def _page_request(self, querydict, val, headers):
+        """
+        Makes the request for the next (or previous) page,
+        raising `StopIteration` if there isn't one.
+        """
         # update uri based on next page
         if self.response:
             self.response.raise_for_status()
             _next = self.response.links.get(val, {}).get('url')
             if _next:
-                response = self._root_resource._make_request(
-                    'GET', _next, params, headers=headers)
-                self._handle_res(None, response)
-                return response
+                # the link carries the listing's parameters already
+                return self._root_resource._make_request(
+                    'GET', _next.lstrip('/'), dict(querydict), headers=headers)
             else:
                 raise StopIteration
+        elif self._start is not None:
+            return self._root_resource._make_request(
+                'GET', self._start.lstrip('/'), dict(querydict), headers=headers)
         else:
-            response = self.resource._make_request(
+            params = copy.copy(self.params)
+            params.update(querydict)
+            return self.resource._make_request(
                 'GET', '', params, headers=headers)
-            self._handle_res(None, response)
-            return response
+
+    def cursor(self):
+        """
+        Returns where the next page starts, as a path and query string
+        like Orchestrate's `next` links, or `None` after the last page.
+        Pass it as `cursor` to a listing, in this process or another,
+        to carry on from there.
+        """
+        if self.response is not None:
+            return self.response.links.get('next', {}).get('url')
+        if self._start is not None:
+            return self._start
+        root = self._root_resource.uri
+        params = sorted((key, str(value).lower() if isinstance(value, bool) else value)
+                        for key, value in self.params.items())
+        path = self.resource.uri[len(root):]
+        return '%s?%s' % (path, urlencode(params)) if params else path
 
     def _handle_res(self, session, response):
         """
@@ -54,7 +95,8 @@ class Pages(Iterator):
 
     def reset(self):
         """
-        Clear the page's current place.
+        Clear the page's current place, going back to the first page,
+        or the cursor the pages were created with.
 
             page_1 = page.next().result()
             page_2 = page.next().result()
@@ -86,7 +128,158 @@ class Pages(Iterator):
 
     def all(self):
         results = []
-        for response in self:
-          response.raise_for_status()
-          results.extend(response['results'])
+        try:
+            for response in self:
+              response.raise_for_status()
+              results.extend(response['results'])
+        except DeadlineExceeded as e:
+            # hand back what was listed in time
+            e.results = results
+            raise
         return results
+
+    def parallel_all(self, workers=None, max_passes=3):
+        """
+        Like `all`, but for searches, fetches pages concurrently.
+
+        The first page's `total_count` is split into offset ranges of
+        `limit` items, which are fetched by up to `workers` requests at
+        once (by default, the client's `max_workers`) and merged in
+        order. Listings without `total_count` are read page by page.
+
+        If any page reports a different `total_count`, the result set
+        changed mid-scan and items may have shifted between pages, so
+        the scan is repeated, up to `max_passes` times in all. Items
+        are merged by collection and key across passes, so none is
+        duplicated; items only seen in an earlier pass come last.
+        """
+        transport = self.resource.transport
+        workers = workers or transport.max_workers
+        if workers > transport.max_workers:
+            raise ValueError(
+                'workers %d exceeds the client\'s max_workers (%d)' % (
+                    workers, transport.max_workers))
+        first = self.resource._make_request('GET', '', copy.copy(self.params))
+        first.raise_for_status()
+        if first['total_count'] is None:
+            self._handle_res(None, first)
+            return first['results'] + self.all()
+        resource = Resource(
+            self.resource.uri, True, transport, self.resource.deadline,
+            **self.resource.opts)
+        start = int(self.params.get('offset', 0))
+        limit = int(self.params.get('limit', 10))
+        total = first['total_count']
+        merged = []
+        for _ in range(max_passes):
+            offset = start if first is None else start + limit
+            pages = self._fetch_offsets(
+                resource, range(offset, total, limit), workers)
+            if first is not None:
+                pages.insert(0, first)
+                first = None
+            results = _unique(
+                item for page in pages for item in page['results'])
+            keys = set(_item_key(item) for item in results)
+            merged = results + [
+                item for item in merged if _item_key(item) not in keys]
+            totals = set(page['total_count'] for page in pages)
+            if totals == set([total]):
+                break
+            total = pages[-1]['total_count']
+        return merged
+
+    def _fetch_offsets(self, resource, offsets, workers):
+        """
+        Fetches the page at each offset, `workers` at a time,
+        returning them in order.
+        """
+        def submit(offset):
+            params = copy.copy(self.params)
+            params['offset'] = offset
+            return resource._make_request('GET', '', params)
+        pages = []
+        batch = Batch(submit, [(offset,) for offset in offsets], workers)
+        for result in batch:
+            if not result.ok:
+                raise result.error
+            pages.append(result.response)
+        return pages
+
+    def iter_items(self, prefetch=1):
+        """
+        Yields each item in the listing, one at a time. While you
+        consume a page, up to `prefetch` more are fetched ahead of it
+        on a thread of the listing's own, so at most `prefetch + 1`
+        pages are held in memory.
+        """
+        if prefetch < 1:
+            raise ValueError('prefetch must be at least 1')
+        pages = Queue()
+        slots = threading.Semaphore(prefetch)
+        stop = threading.Event()
+        # a thread of its own, since it waits on the consumer: on the
+        # client's executor, it would hold a worker its requests need
+        fetcher = threading.Thread(target=self._prefetch, args=(pages, slots, stop))
+        fetcher.daemon = True
+        fetcher.start()
+        try:
+            while True:
+                page = pages.get()
+                # free the page's slot so the next one can be fetched
+                slots.release()
+                if page is None:
+                    break
+                elif isinstance(page, Exception):
+                    raise page
+                for item in page['results']:
+                    yield item
+                page = None
+        finally:
+            # wake the fetcher so it notices we've stopped
+            stop.set()
+            slots.release()
+
+    def _prefetch(self, pages, slots, stop):
+        """
+        Fetches pages into `pages` whenever a slot is free,
+        ending with `None`, or the exception that stopped it.
+        """
+        try:
+            while True:
+                slots.acquire()
+                if stop.is_set():
+                    return
+                response = self.next()
+                response.raise_for_status()
+                pages.put(response)
+        except StopIteration:
+            pages.put(None)
+        except Exception as e:
+            pages.put(e)
+
+
+def _unique(items):
+    """
+    Drops repeats of an item, as when it shifts between two pages.
+    """
+    results = []
+    seen = set()
+    for item in items:
+        key = _item_key(item)
+        if key not in seen:
+            seen.add(key)
+            results.append(item)
+    return results
+
+
+def _item_key(item):
+    """
+    Identifies an item by collection and key, whatever its ref, and
+    anything else a search returns, like events and relationships, of
+    which one item can have many, by its whole path.
+    """
+    path = item.get('path', {})
+    if path.get('kind', 'item') == 'item':
+        return (path.get('collection'), path.get('key'))
+    return json.dumps(path, sort_keys=True)
@@ -1,36 +1,33 @@
 from . import util
-import json
-import requests
+from . import router
+from .deadline import DeadlineExceeded
 from .response import Response
+from .transport import Transport
+from requests.exceptions import Timeout
 import copy
-from requests_futures.sessions import FuturesSession
-try:
-    # python 2
-    from urllib import quote
-except ImportError:
-    # python 3
-    from urllib.parse import quote
 
 
 class Resource(object):
 
-    def __init__(self, uri, use_async=False, **kwargs):
+    def __init__(self, uri, use_async=False, transport=None, deadline=None, **kwargs):
         self.uri = uri
         self.opts = kwargs
-        self.session = requests.Session()
-        self.async_session = FuturesSession()
+        self.transport = transport or Transport(**kwargs)
         self.use_async = use_async
-        kwargs['hooks'] = {
-            "response": self._handle_response
-        }
-        for obj in [self.session, self.async_session]:
-            for key, value in kwargs.items():
-                setattr(obj, key, value)
+        self.deadline = deadline
+
+    @property
+    def session(self):
+        return self.transport.session
+
+    @property
+    def async_session(self):
+        return self.transport.async_session
 
     def _merge_paths(self, path):
         if path:
             if isinstance(path, list):
-                path = '/'.join([quote(str(elem), '') for elem in path])
+                path = router.build(path)
             return '/'.join([self.uri, path])
         else:
             return self.uri
@@ -41,8 +38,12 @@ class Resource(object):
         along with options set on the object.
         """
         uri = self._merge_paths(path)
-        opts = dict(headers=headers)
-        session = self.async_session if self.use_async else self.session
+        opts = dict(headers=headers, hooks=dict(response=self._handle_response))
+        if self.deadline is not None:
+            # whatever's left of the budget, or DeadlineExceeded
+            opts['timeout'] = self.deadline.timeout()
+            # so retries and waits for the limiter keep to it too
+            opts['deadline'] = self.deadline
         # normalize body according to method and type
         if body != None:
             if method.lower() in ['head', 'get', 'delete']:
@@ -55,9 +56,41 @@ class Resource(object):
                             body[key] = 'false'
                 opts['params'] = body
             else:
-                opts['data'] = json.dumps(body, default=handler)
+                opts['data'], opts['headers'] = self.transport.compression.compress(
+                    self.transport.codec.encode(body, handler), headers)
 
-        return session.request(method, uri, **opts)
+        try:
+            if self.transport.coalesce and method in ['GET', 'HEAD']:
+                key = (method, uri, _frozen(opts.get('params')), _frozen(headers))
+                response = self.transport.coalesced(
+                    key, self._view, method, uri, self.use_async, **opts)
+            else:
+                response = self.transport.request(method, uri, self.use_async, **opts)
+        except Timeout:
+            if self.deadline is not None and self.deadline.expired():
+                raise DeadlineExceeded()
+            raise
+        if self.deadline is not None and self.use_async:
+            self.deadline.track(response)
+        return response
+
+    def _view(self, response):
+        """
+        Returns a `Response` of its own for a caller sharing `response`.
+        """
+        return self._wrap(copy.copy(response.response))
 
     def _handle_response(self, response, *args, **kwargs):
-        return Response(response)
+        self.transport.compression.observe(response)
+        if self.transport.cache is not None:
+            response = self.transport.cache.handle(response)
+        if self.transport.versions is not None:
+            response = self.transport.versions.handle(response)
+        return self._wrap(response)
+
+    def _wrap(self, response):
+        return Response(response, self.transport.keep_body, self.transport.codec)
+
+
+def _frozen(mapping):
+    return tuple(sorted((key, str(value)) for key, value in (mapping or {}).items()))
@@ -1,61 +1,89 @@
 from requests import Response as Requests_Response
-from collections import MutableMapping
+try:
+    # python 3.3+
+    from collections.abc import MutableMapping
+except ImportError:
+    # python 2
+    from collections import MutableMapping
 import re
+from . import router
 
-URL_PATTERNS = [
-    "/v0/(?P<collection>.+)/(?P<key>.+)/events/(?P<type>.+)/(?P<timestamp>\d+)/(?P<ordinal>\d+)",
-    "/v0/(?P<collection>.+)/(?P<key>.+)/events/(?P<type>.+)/(?P<timestamp>\d+)",
-    "/v0/(?P<collection>.+)/(?P<key>.+)/events/(?P<type>.+)",
-    "/v0/(?P<collection>.+)/(?P<key>.+)/refs/(?P<ref>.+)",
-    "/v0/(?P<collection>.+)/(?P<key>.+)/refs",
-    "/v0/(?P<collection>.+)/(?P<key>.+)/relations/(?P<kind>.+)/(?P<to_collection>.+)/(?P<to_key>.+)",
-    "/v0/(?P<collection>.+)/(?P<key>.+)/relations/(?P<kinds>.+)",
-    "/v0/(?P<collection>.+)/(?P<key>.+)",
-    "/v0/(?P<collection>.+)"
-]
+ETAG_REGEX = re.compile('"(?P<ref>.+)"')
+
+PATH_FIELDS = frozenset(router.Location._fields)
 
 
 class Response(MutableMapping):
 
-    def __init__(self, resp):
+    """
+    Wraps a `requests` response. The body is only decoded, and the
+    URL and headers only parsed into `collection`, `key`, `ref` and
+    the like, when first accessed. Unless `keep_body` is true, the
+    raw body is released once decoded. The body is decoded with
+    `codec`, if given, or else by `requests`.
+    """
+
+    __slots__ = ('response', 'keep_body', 'codec', '_json', '_path')
+
+    def __init__(self, resp, keep_body=True, codec=None):
         self.response = resp
-        if self.response.text:
-            self.json = self.response.json()
-        else:
-            self.json = dict()
-        self._set_path()
-
-    def _set_path(self):
-        # match the url
-        path = self.response.url[self.response.url.find('/v0'):]
-        for regex in URL_PATTERNS:
-            location_match = re.match(regex, path)
-            if location_match:
-                for key, value in location_match.groupdict().items():
-                    setattr(self, key, value)
-                break
-        # match headers
-        for regex in URL_PATTERNS:
-            # check location
-            location_match = re.match(
-                regex, self.response.headers.get('location', ''))
-            # if not in location, try content-location
-            if not location_match:
-                location_match = re.match(
-                    regex, self.response.headers.get('content-location', ''))
-            # if a match was found in either place, attach it to self
-            if location_match:
-                for key, value in location_match.groupdict().items():
-                    setattr(self, key, value)
-                break
+        self.keep_body = keep_body
+        self.codec = codec
+        self._json = None
+        self._path = None
+
+    @property
+    def json(self):
+        if self._json is None:
+            content = self.response.content
+            if not content:
+                self._json = dict()
+            elif self.codec is not None:
+                self._json = self.codec.decode(content)
+            else:
+                self._json = self.response.json()
+            if not self.keep_body:
+                self.response._content = None
+        return self._json
+
+    @json.setter
+    def json(self, value):
+        self._json = value
+
+    @property
+    def path(self):
+        """
+        The `router.Location` parsed from the URL, Location or
+        Content-Location header, and ETag.
+        """
+        if self._path is None:
+            self._path = self._parse_path()
+        return self._path
+
+    def _parse_path(self):
+        headers = self.response.headers
+        path = router.parse(self.response.url) or router.EMPTY
+        # headers say where a created item ended up
+        location = (router.parse(headers.get('location', '')) or
+                    router.parse(headers.get('content-location', '')))
+        if location:
+            path = path._replace(**dict(
+                (name, value) for name, value in location._asdict().items()
+                if value is not None))
         # finally, try the etag
-        etag_match = re.match(
-            '"(?P<ref>.+)"', self.response.headers.get('etag', ''))
+        etag_match = ETAG_REGEX.match(headers.get('etag', ''))
         if etag_match:
-            for key, value in etag_match.groupdict().items():
-                setattr(self, key, value)
+            path = path._replace(ref=etag_match.group('ref'))
+        return path
 
     def __getattr__(self, name):
+        if name in Response.__slots__:
+            # not set yet, as while unpickling
+            raise AttributeError(name)
+        if name in PATH_FIELDS:
+            value = getattr(self.path, name)
+            if value is not None:
+                return value
         return getattr(self.response, name)
 
     def __getitem__(self, key):
@@ -0,0 +1,99 @@
+from collections import namedtuple
+try:
+    # python 2
+    from urllib import quote, unquote
+except ImportError:
+    # python 3
+    from urllib.parse import quote, unquote
+
+
+class Location(namedtuple('Location', [
+        'collection', 'key', 'ref', 'type', 'timestamp', 'ordinal',
+        'kind', 'kinds', 'to_collection', 'to_key'])):
+
+    """
+    Where an Orchestrate path points: a collection, an item, one of
+    its refs, events or relations. Fields the path doesn't mention
+    are `None`; `kinds` is a tuple of relation kinds.
+    """
+
+    __slots__ = ()
+
+    def segments(self):
+        """
+        Returns the path's unescaped segments, the inverse of `parse`.
+        """
+        segments = [self.collection]
+        if self.key is None:
+            return segments
+        segments.append(self.key)
+        if self.ref is not None:
+            segments += ['refs', self.ref]
+        elif self.type is not None:
+            segments += ['events', self.type]
+            segments += [str(value) for value in [self.timestamp, self.ordinal]
+                         if value is not None]
+        elif self.kinds is not None:
+            segments += ['relations'] + list(self.kinds)
+        elif self.kind is not None:
+            segments += ['relation', self.kind, self.to_collection, self.to_key]
+        return segments
+
+    def path(self):
+        return build(self.segments())
+
+EMPTY = Location(*[None] * len(Location._fields))
+
+
+def build(segments):
+    """
+    Joins path segments, escaping each so that slashes and other
+    reserved characters in keys survive the round trip.
+    """
+    return '/'.join([quote(str(segment), '') for segment in segments])
+
+
+def split(url):
+    """
+    Returns the unescaped segments of an Orchestrate URL's path after
+    `/v0/`, or `None` if it isn't an Orchestrate v0 path.
+    """
+    start = url.find('/v0/')
+    if start == -1:
+        return None
+    path = url[start + 4:]
+    for separator in '?#':
+        if separator in path:
+            path = path[:path.index(separator)]
+    segments = path.split('/')
+    if '%' in path:
+        segments = [unquote(segment) for segment in segments]
+    if not segments[0]:
+        return None
+    return segments
+
+
+def parse(url):
+    """
+    Parses an Orchestrate URL, path, Location or Content-Location
+    into a `Location` in a single pass over its segments. Returns
+    `None` if it isn't an Orchestrate v0 path.
+    """
+    segments = split(url)
+    if segments is None:
+        return None
+    # collection, key, ref, type, timestamp, ordinal,
+    # kind, kinds, to_collection, to_key
+    fields = segments[:2] + [None] * (10 - len(segments[:2]))
+    if len(segments) > 3:
+        section, rest = segments[2], segments[3:]
+        if section == 'refs':
+            fields[2] = rest[0]
+        elif section == 'events':
+            fields[3:3 + len(rest[:3])] = rest[:3]
+        elif section == 'relations':
+            fields[7] = tuple(rest)
+        elif section == 'relation':
+            fields[6] = rest[0]
+            fields[8:8 + len(rest[1:3])] = rest[1:3]
+    return Location(*fields)
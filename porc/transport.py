@@ -0,0 +1,329 @@
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from requests_futures.sessions import FuturesSession
+from .codec import best
+from .compression import Compression
+from .deadline import DeadlineExceeded
+
+
+class Transport(object):
+
+    """
+    The connection pool and thread pool behind a `Client`.
+
+    Every `Resource` made from a client -- its `Pages`, its `Async`
+    clients -- shares the client's transport, so they reuse the same
+    keep-alive connections and worker threads. Nothing is created
+    until the first request needs it.
+
+    It also holds settings for every request and response: bodies are
+    encoded and decoded with `codec`, by default the fastest installed
+    (see `porc.codec`); unless `keep_body` is true, a `Response`
+    releases its raw body once decoded; request bodies of at least
+    `compress` bytes are gzipped; and every
+    response passes through `cache` and `versions`, if given, an
+    `ItemCache` and a `VersionCache`.
+
+    With `coalesce`, identical GET and HEAD requests made while one
+    is already in flight wait for its response instead of being sent.
+    Given a `limiter`, an `AdaptiveLimiter`, requests wait for a slot
+    under its limit; given a `retry`, a `Retry`, failed idempotent
+    requests are retried; and given `metrics`, a `Metrics`, each
+    request is recorded there once it's done. Given a `hedge`, a
+    `Hedge`, slow reads are sent again, and the first answer taken;
+    the copies run on threads of their own, up to `pool_size` at once.
+    """
+
+    def __init__(self, pool_size=10, max_workers=2, executor=None,
+                 keep_body=True, cache=None, versions=None, coalesce=False,
+                 codec=None, compress=None, limiter=None, retry=None,
+                 metrics=None, hedge=None, **opts):
+        self.pool_size = pool_size
+        self.keep_body = keep_body
+        self.cache = cache
+        self.versions = versions
+        self.coalesce = coalesce
+        self.codec = codec or best()
+        self.compression = Compression(compress)
+        self.limiter = limiter
+        self.retry = retry
+        self.metrics = metrics
+        self.hedge = hedge
+        # a given executor decides how many requests run at once
+        self.max_workers = getattr(executor, '_max_workers', max_workers)
+        self.opts = opts
+        self._executor = executor
+        self._owns_executor = executor is None
+        self._hedge_executor = None
+        self._adapter = None
+        self._session = None
+        self._async_session = None
+        self._retired = dict(requests=0, connections=0)
+        self._flights = dict()
+        self._collapsed = 0
+        self._lock = threading.RLock()
+        self._stats_lock = threading.Lock()
+
+    @property
+    def adapter(self):
+        if self._adapter is None:
+            with self._lock:
+                if self._adapter is None:
+                    adapter = HTTPAdapter(pool_connections=self.pool_size,
+                                          pool_maxsize=self.pool_size)
+                    # keep the counters of pools the manager evicts
+                    adapter.poolmanager.pools.dispose_func = self._retire_pool
+                    self._adapter = adapter
+        return self._adapter
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(self.max_workers)
+        return self._executor
+
+    @property
+    def hedge_executor(self):
+        if self._hedge_executor is None:
+            with self._lock:
+                if self._hedge_executor is None:
+                    self._hedge_executor = ThreadPoolExecutor(self.pool_size)
+        return self._hedge_executor
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = self._configure(requests.Session())
+        return self._session
+
+    @property
+    def async_session(self):
+        if self._async_session is None:
+            with self._lock:
+                if self._async_session is None:
+                    self._async_session = self._configure(
+                        FuturesSession(executor=self.executor))
+        return self._async_session
+
+    def _configure(self, session):
+        for prefix in ['http://', 'https://']:
+            session.mount(prefix, self.adapter)
+        for key, value in self.opts.items():
+            setattr(session, key, value)
+        return session
+
+    def _retire_pool(self, pool):
+        with self._stats_lock:
+            self._retired['requests'] += pool.num_requests
+            self._retired['connections'] += pool.num_connections
+        pool.close()
+
+    def request(self, method, uri, use_async=False, **opts):
+        """
+        Sends the request through the shared pool, returning a
+        response, or a future when `use_async` is set.
+        """
+        name = self.hedge and self.hedge.applies(method, uri, opts.get('params'))
+        if name:
+            if use_async:
+                return self.executor.submit(self._hedged, name, method, uri, **opts)
+            return self._hedged(name, method, uri, **opts)
+        if self.limiter is None and self.retry is None and self.metrics is None:
+            opts.pop('deadline', None)
+            session = self.async_session if use_async else self.session
+            return session.request(method, uri, **opts)
+        if use_async:
+            return self.executor.submit(self._send, method, uri, **opts)
+        return self._send(method, uri, **opts)
+
+    def _send(self, method, uri, deadline=None, **opts):
+        """
+        Sends the request, waiting for a slot from `limiter` and
+        retrying as `retry` says, if given. Given a `deadline`, neither
+        waits past it, and each attempt's timeout is what's left of it.
+        """
+        attempt = 0
+        first = time.time()
+        while True:
+            timeout = None
+            if deadline is not None:
+                timeout = opts['timeout'] = deadline.timeout()
+            if self.limiter is not None:
+                if not self.limiter.acquire(timeout):
+                    self._record(method, uri, opts, first, attempt)
+                    raise DeadlineExceeded()
+                if deadline is not None:
+                    # less whatever was spent waiting for the slot
+                    opts['timeout'] = max(0.001, deadline.remaining())
+            started = time.time()
+            try:
+                response = self.session.request(method, uri, **opts)
+            except requests.RequestException:
+                self._release(started)
+                delay = self.retry and self.retry.delay(method, attempt)
+                if delay is None:
+                    self._record(method, uri, opts, first, attempt)
+                    raise
+            else:
+                self._release(started, response.status_code)
+                delay = self.retry and self.retry.delay(method, attempt, response)
+                if delay is None:
+                    self._record(method, uri, opts, first, attempt, response)
+                    return response
+            if deadline is not None and delay >= deadline.remaining():
+                # the retry would start too late to finish in time
+                self._record(method, uri, opts, first, attempt)
+                raise DeadlineExceeded()
+            time.sleep(delay)
+            attempt += 1
+
+    def _hedged(self, name, method, uri, **opts):
+        """
+        Sends the request, and again if it's slow to answer, returning
+        the first response. The other is cancelled if it hasn't started,
+        and otherwise left to finish.
+        """
+        attempts = [self._attempt(name, method, uri, opts)]
+        wait(attempts, timeout=self.hedge.delay(name))
+        if not attempts[0].done() and self.hedge.try_hedge():
+            attempts.append(self._attempt(name, method, uri, opts))
+        pending = set(attempts)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    if future is not attempts[0]:
+                        self.hedge.won()
+                    return future.result()
+        # every attempt failed
+        return attempts[0].result()
+
+    def _attempt(self, name, method, uri, opts):
+        started = time.time()
+        future = self.hedge_executor.submit(self._send, method, uri, **opts)
+
+        def observe(future):
+            if not future.cancelled() and future.exception() is None:
+                self.hedge.observe(name, time.time() - started)
+        future.add_done_callback(observe)
+        return future
+
+    def _release(self, started, status=None):
+        if self.limiter is not None:
+            self.limiter.release(time.time() - started, status)
+
+    def _record(self, method, uri, opts, started, retries, response=None):
+        if self.metrics is not None:
+            self.metrics.record(
+                method, uri, response, time.time() - started, retries,
+                len(opts.get('data') or b''), opts.get('params'))
+
+    def coalesced(self, key, view, method, uri, use_async=False, **opts):
+        """
+        Like `request`, but shares the response with every other call
+        for the same `key` made while it's in flight. Each caller gets
+        `view(response)`, its own copy.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = Future()
+            else:
+                self._collapsed += 1
+        if leader:
+            if use_async:
+                self.request(method, uri, True, **opts).add_done_callback(
+                    lambda future: self._land(key, flight, future))
+            else:
+                try:
+                    response = self.request(method, uri, **opts)
+                except Exception as e:
+                    self._land(key, flight, error=e)
+                    raise
+                self._land(key, flight, response=response)
+        if not use_async:
+            return view(flight.result())
+        result = Future()
+
+        def finish(flight):
+            try:
+                result.set_result(view(flight.result()))
+            except Exception as e:
+                result.set_exception(e)
+        flight.add_done_callback(finish)
+        return result
+
+    def _land(self, key, flight, future=None, response=None, error=None):
+        with self._lock:
+            del self._flights[key]
+        if future is not None:
+            error = future.exception()
+            if error is None:
+                response = future.result()
+        if error is None:
+            flight.set_result(response)
+        else:
+            flight.set_exception(error)
+
+    def completed(self, value, use_async=False):
+        """
+        Returns `value` as `request` would return a response:
+        as is, or as a finished future when `use_async` is set.
+        """
+        if not use_async:
+            return value
+        future = Future()
+        future.set_result(value)
+        return future
+
+    def stats(self):
+        """
+        Returns connection pool counters. A hit is a request served
+        over an already-open connection; a miss had to open a new one.
+        `collapsed` counts requests answered by another's response.
+        """
+        with self._stats_lock:
+            num_requests = self._retired['requests']
+            num_connections = self._retired['connections']
+        if self._adapter is not None:
+            pools = self._adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is not None:
+                    num_requests += pool.num_requests
+                    num_connections += pool.num_connections
+        return dict(
+            requests=num_requests,
+            hits=max(num_requests - num_connections, 0),
+            misses=num_connections,
+            collapsed=self._collapsed
+        )
+
+    def close(self):
+        """
+        Closes pooled connections and, if the transport created it,
+        shuts down the executor.
+        """
+        for session in [self._session, self._async_session]:
+            if session is not None:
+                session.close()
+        if self._adapter is not None:
+            self._adapter.close()
+        if self._owns_executor and self._executor is not None:
+            self._executor.shutdown(wait=False)
+        if self._hedge_executor is not None:
+            self._hedge_executor.shutdown(wait=False)
+            self._hedge_executor = None
+        self._session = self._async_session = self._adapter = None
+        if self._owns_executor:
+            self._executor = None
@@ -1,16 +1,52 @@
 from datetime import datetime
 from lucenequerybuilder import Q
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
+EPOCH = datetime.utcfromtimestamp(0)
 
-def datetime_to_timestamp(datetime_obj=datetime.now()):
+
+def datetime_to_timestamp(datetime_obj=None):
     """
     If given a `datetime_obj`, converts it to milliseconds since epoch.
     Else, returns the milliseconds between now and the epoch.
     """
-    epoch = datetime.utcfromtimestamp(0)
-    delta = datetime_obj - epoch
-    # Python 3-compatible TimeDelta.total_seconds()
-    seconds = (delta.microseconds +
-               (delta.seconds + delta.days * 24 * 3600) * 10 ** 6) / 10.0 ** 6
-    milliseconds = seconds * 1000
-    return int(milliseconds)
+    if datetime_obj is None:
+        datetime_obj = datetime.now()
+    delta = datetime_obj - EPOCH
+    # whole milliseconds, without going through float seconds
+    return (delta.days * 86400 + delta.seconds) * 1000 + delta.microseconds // 1000
+
+
+def datetimes_to_timestamps(values):
+    """
+    Converts a sequence of datetimes, milliseconds since epoch or
+    `None`s into a list of milliseconds since epoch, keeping `None`s.
+    With NumPy installed, the datetimes are converted in one step,
+    and a `datetime64` array is converted as a whole.
+    """
+    if numpy is not None and isinstance(values, numpy.ndarray):
+        if values.dtype.kind != 'M':
+            return values.astype('int64').tolist()
+        missing = numpy.isnat(values)
+        timestamps = values.astype('datetime64[ms]').astype('int64').tolist()
+        if missing.any():
+            for index in numpy.flatnonzero(missing).tolist():
+                timestamps[index] = None
+        return timestamps
+    timestamps = [value if value is None else value
+                  if isinstance(value, datetime) else int(value)
+                  for value in values]
+    indices = [i for i, value in enumerate(timestamps) if isinstance(value, datetime)]
+    if not indices:
+        return timestamps
+    if numpy is not None:
+        converted = numpy.array([timestamps[i] for i in indices],
+                                dtype='datetime64[ms]').astype('int64').tolist()
+    else:
+        converted = [datetime_to_timestamp(timestamps[i]) for i in indices]
+    for index, timestamp in zip(indices, converted):
+        timestamps[index] = timestamp
+    return timestamps
@@ -22,9 +22,13 @@ setup(name='porc',
       license='ASLv2',
       install_requires=[
           'requests-futures==0.9.4',
-          'vcrpy==1.1.0',
+          'vcrpy==1.10.0',
           'lucene-querybuilder==0.2'
       ],
+      extras_require={
+          'aio': ['aiohttp>=3.0'],
+          'fast': ['orjson', 'numpy']
+      },
       test_suite="tests",
       classifiers=[
           'Intended Audience :: Developers',
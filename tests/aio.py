@@ -0,0 +1,173 @@
+import threading
+import vcr
+import unittest
+import porc
+from .credentials import API_KEY
+from benchmarks.server import StandInServer
+from .client import LocalServer
+from .limiter import ThrottlingHandler
+try:
+    import asyncio
+    from porc import aio
+except ImportError:
+    aio = None
+try:
+    # without these, cassettes would not intercept aiohttp requests
+    from vcr.stubs import aiohttp_stubs
+except ImportError:
+    aiohttp_stubs = None
+
+
+@unittest.skipIf(aio is None or aio.aiohttp is None, 'requires asyncio and aiohttp')
+class AioClientTest(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.client = aio.Client(API_KEY)
+        self.collections = ['COLLECTION_1', 'COLLECTION_2']
+        self.keys = ['KEY_1', 'KEY_2']
+
+    def tearDown(self):
+        self.loop.run_until_complete(self.client.close())
+        self.loop.close()
+
+    def run_async(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    @unittest.skipIf(aiohttp_stubs is None, 'requires vcrpy with aiohttp support')
+    @vcr.use_cassette('fixtures/client/get.yaml')
+    def test_get(self):
+        # test 404
+        resp = self.run_async(self.client.get(self.collections[0], self.keys[0]))
+        assert resp.status_code == 404
+        # create item
+        resp = self.run_async(self.client.put(
+            self.collections[0], self.keys[0], {"derp": True}))
+        ref = resp.ref
+        resp.raise_for_status()
+        # test 200 with ref
+        resp = self.run_async(
+            self.client.get(self.collections[0], self.keys[0], ref))
+        resp.raise_for_status()
+        # cleanup
+        self.run_async(self.client.delete(
+            self.collections[0], self.keys[0])).raise_for_status()
+
+    def test_pages(self):
+        pages = self.client.list(self.collections[0])
+        assert isinstance(pages, aio.Pages)
+        self.assertRaises(TypeError, iter, pages)
+        self.assertRaises(TypeError, pages.iter_items)
+        self.assertRaises(TypeError, pages.parallel_all)
+
+    def test_stats(self):
+        server = LocalServer()
+        client = aio.Client(self.client.api_key, server.url, pool_size=1)
+        try:
+            for key in self.keys:
+                self.run_async(client.get(self.collections[0], key))
+            stats = client.transport.stats()
+        finally:
+            self.run_async(client.close())
+            server.close()
+        assert stats == dict(requests=2, hits=1, misses=1, collapsed=0)
+
+    def test_no_async(self):
+        self.assertRaises(TypeError, self.client.async_)
+
+    def test_batch(self):
+        server = LocalServer()
+        client = aio.Client(self.client.api_key, server.url)
+        items = [(self.collections[0], key) for key in self.keys]
+        items.append((self.collections[0], ''))
+        try:
+            batch = client.delete_many(items[2:])
+            results = self.run_async(batch.results())
+            assert isinstance(results[0].error, ValueError)
+            batch = client.get_many(items[:2], concurrency=2)
+            results = self.run_async(batch.results())
+        finally:
+            self.run_async(client.close())
+            server.close()
+        assert [r.ok for r in results] == [True, True]
+        assert batch.summary.succeeded == 2
+
+    def test_post_events_many(self):
+        server = StandInServer()
+        client = aio.Client(self.client.api_key, server.url)
+        events = [('c', 'k%d' % (i % 2), 'log', {'n': i}, 1000) for i in range(20)]
+        try:
+            results = self.run_async(
+                client.post_events_many(events, concurrency=4).results())
+        finally:
+            self.run_async(client.close())
+            server.close()
+        assert all(result.ok for result in results)
+        for key in ['k0', 'k1']:
+            ordinals = [int(r.response.ordinal) for r in results if r.item[1] == key]
+            assert ordinals == sorted(ordinals)
+
+    def test_coalesce(self):
+        server = LocalServer()
+        client = aio.Client(self.client.api_key, server.url, coalesce=True)
+
+        async def gets():
+            return await asyncio.gather(*[
+                client.get(self.collections[0], self.keys[0]) for i in range(3)])
+        try:
+            responses = self.run_async(gets())
+            stats = client.transport.stats()
+        finally:
+            self.run_async(client.close())
+            server.close()
+        assert len(set(id(response) for response in responses)) == 3
+        assert stats['requests'] == 1
+        assert stats['collapsed'] == 2
+
+    def test_deadline(self):
+        from .deadline import ListingHandler, ThrottledHandler
+        server = LocalServer(ListingHandler)
+        server.items = ['%03d' % i for i in range(50)]
+        throttled = LocalServer(ThrottledHandler)
+        throttled.count = 0
+        client = aio.Client(self.client.api_key, server.url)
+        retrying = aio.Client(self.client.api_key, throttled.url,
+                              retry=porc.Retry(max_retries=3))
+        try:
+            try:
+                self.run_async(client.within(0.5).list('coll').all())
+            except porc.DeadlineExceeded as e:
+                # the pages listed before the slow one timed out
+                assert [item['path']['key'] for item in e.results] == server.items[:20]
+            else:
+                self.fail('the deadline passed')
+            self.assertRaises(porc.DeadlineExceeded, self.run_async,
+                              retrying.within(0.5).get('coll', 'key'))
+            assert throttled.count == 1
+        finally:
+            self.run_async(client.close())
+            self.run_async(retrying.close())
+            server.close()
+            throttled.close()
+
+    def test_retry(self):
+        server = LocalServer(ThrottlingHandler)
+        server.lock = threading.Lock()
+        server.count = 0
+        server.throttle = 2
+        client = aio.Client(self.client.api_key, server.url,
+                            limiter=porc.AdaptiveLimiter(initial=1),
+                            retry=porc.Retry(base=0.01))
+
+        async def gets():
+            return await asyncio.gather(*[
+                client.get(self.collections[0], key) for key in self.keys])
+        try:
+            responses = self.run_async(gets())
+            stats = client.transport.limiter.stats()
+        finally:
+            self.run_async(client.close())
+            server.close()
+        assert [response.status_code for response in responses] == [200, 200]
+        assert server.count == 4
+        assert stats['throttled'] == 2 and stats['in_flight'] == 0
@@ -0,0 +1,104 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import porc
+from porc import backup
+from benchmarks.server import StandInServer
+from .client import unpatched
+
+
+class BackupTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StandInServer()
+        for n in range(250):
+            self.server.store.put('people', 'key%03d' % n, {'n': n})
+        self.client = porc.Client('key', self.server.url, max_workers=4)
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'people.ndjson.gz')
+
+    def tearDown(self):
+        self.client.close()
+        self.server.close()
+        shutil.rmtree(self.directory)
+
+    def exported(self):
+        with gzip.open(self.path, 'rb') as f:
+            return [json.loads(line.decode('utf-8')) for line in f]
+
+    @unpatched
+    def test_round_trip(self):
+        count = self.client.export_collection('people', self.path, limit=40,
+                                              checkpoint_every=50)
+        assert count == 250
+        assert not os.path.exists(backup.checkpoint_path(self.path))
+        records = self.exported()
+        assert [r['key'] for r in records] == ['key%03d' % n for n in range(250)]
+        assert records[7]['value'] == {'n': 7}
+        assert records[7]['ref'] == self.server.store.current('people', 'key007')[0]
+        assert self.client.import_collection(self.path, 'copy', concurrency=4) == 250
+        assert [value for key, ref, value in self.server.store.items('copy')] == [
+            {'n': n} for n in range(250)]
+
+    @unpatched
+    def test_resume_export(self):
+        codec = self.client.transport.codec
+        encode = codec.encode
+        written = []
+
+        def failing(obj, handler=None):
+            if len(written) == 130:
+                raise IOError('disk full')
+            written.append(obj)
+            return encode(obj, handler)
+        codec.encode = failing
+        try:
+            self.assertRaises(IOError, self.client.export_collection,
+                              'people', self.path, limit=40, checkpoint_every=50)
+        finally:
+            del codec.encode
+        # checkpoints fall at the first page end after every 50 items
+        checkpoint = backup.read_checkpoint(self.path)
+        assert checkpoint['items'] == 80
+        assert checkpoint['after_key'] == 'key079'
+        assert os.path.getsize(self.path) >= checkpoint['offset']
+        assert self.client.export_collection('people', self.path, limit=40) == 250
+        # five pages until it failed, one of them prefetched, then five more
+        assert self.server.requests['GET'] == 10
+        assert [r['key'] for r in self.exported()] == ['key%03d' % n for n in range(250)]
+
+    @unpatched
+    def test_resume_import(self):
+        self.client.export_collection('people', self.path)
+        backup.write_checkpoint(self.path, dict(kind='import', items=100))
+        assert self.client.import_collection(self.path, 'copy') == 250
+        assert self.server.requests['PUT'] == 150
+        assert [key for key, ref, value in self.server.store.items('copy')] == [
+            'key%03d' % n for n in range(100, 250)]
+        assert not os.path.exists(backup.checkpoint_path(self.path))
+
+    @unpatched
+    def test_checkpoint_kinds(self):
+        self.client.export_collection('people', self.path)
+        # an export that died partway, leaving its checkpoint
+        backup.write_checkpoint(self.path, dict(
+            kind='export', after_key='key029', items=30, offset=0))
+        self.assertRaises(ValueError, self.client.import_collection, self.path, 'copy')
+        assert list(self.server.store.items('copy')) == []
+        backup.write_checkpoint(self.path, dict(kind='import', items=30))
+        self.assertRaises(ValueError, self.client.export_collection, 'people', self.path)
+        # saved before checkpoints had kinds
+        backup.write_checkpoint(self.path, dict(items=30))
+        assert backup.read_checkpoint(self.path, 'import') == dict(items=30)
+
+    @unpatched
+    def test_command(self):
+        from porc.__main__ import main
+        args = ['--api-key', 'key', '--url', self.server.url]
+        assert main(args + ['export', 'people', self.path]) == 250
+        assert main(args + ['--workers', '2', 'import', self.path,
+                            '--collection', 'copy']) == 250
+        assert len(list(self.server.store.items('copy'))) == 250
@@ -0,0 +1,66 @@
+import unittest
+import porc
+from benchmarks import suite
+from benchmarks.server import StandInServer
+from .client import unpatched
+
+
+class StandInServerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StandInServer()
+        self.client = porc.Client('key', self.server.url)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.close()
+
+    @unpatched
+    def test_items(self):
+        response = self.client.put('c', 'k', {'a': 1})
+        assert response.status_code == 201
+        ref = response.ref
+        assert self.client.get('c', 'k').json == {'a': 1}
+        assert self.client.put('c', 'k', {'a': 2}, ref='nope').status_code == 412
+        self.client.put('c', 'k', {'a': 2}, ref=ref).raise_for_status()
+        assert self.client.get('c', 'k', ref).json == {'a': 1}
+        assert self.client.refs('c', 'k')['count'] == 2
+        self.client.delete('c', 'k').raise_for_status()
+        assert self.client.get('c', 'k').status_code == 404
+
+    @unpatched
+    def test_pages(self):
+        for i in range(25):
+            self.client.put('c', 'k%02d' % i, {'i': i, 'even': i % 2 == 0})
+        assert len(self.client.list('c', limit=10).all()) == 25
+        pages = self.client.search('c', '*', limit=10)
+        assert pages.next()['total_count'] == 25
+        assert pages.next().links['prev']
+        assert len(self.client.search('c', 'even:True').all()) == 13
+
+    @unpatched
+    def test_events_and_relations(self):
+        for i in range(5):
+            self.client.post_event('c', 'k', 'log', {'i': i}, timestamp=1000 + i)
+        events = self.client.list_events('c', 'k', 'log', startEvent=1001, endEvent=1003, limit=2).all()
+        assert [e['timestamp'] for e in events] == [1003, 1002, 1001]
+        self.client.put('c', 'j', {'name': 'j'})
+        self.client.put_relation('c', 'k', 'friend', 'c', 'j').raise_for_status()
+        assert self.client.get_relations('c', 'k', 'friend')['results'][0]['value'] == {'name': 'j'}
+
+    @unpatched
+    def test_errors(self):
+        self.server.error_rate = 1.0
+        assert self.client.get('c', 'k').status_code in [429, 503]
+
+
+class SuiteTest(unittest.TestCase):
+
+    @unpatched
+    def test_run(self):
+        report = suite.run(['get', 'put_many', 'iter_items'], [2], [100], 20)
+        assert [r['scenario'] for r in report['results']] == ['get', 'put_many', 'iter_items']
+        for result in report['results']:
+            assert result['items_per_second'] > 0
+            assert result['p50'] <= result['p99']
+            assert result['errors'] == 0
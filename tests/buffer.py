@@ -0,0 +1,70 @@
+import unittest
+import porc
+from requests.exceptions import HTTPError
+from benchmarks.server import StandInServer
+from .client import unpatched
+
+
+class WriteBufferTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StandInServer()
+        self.client = porc.Client('key', self.server.url, max_workers=4)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.close()
+
+    def value(self, collection, key):
+        return self.server.store.current(collection, key)[1]
+
+    @unpatched
+    def test_coalesce(self):
+        with self.client.write_buffer(interval=10) as buffer:
+            futures = [buffer.put('c', 'hot', {'n': n}) for n in range(50)]
+            futures += [buffer.put('c', 'key%d' % n, {'n': n}) for n in range(5)]
+            buffer.flush()
+            assert all(future.done() for future in futures)
+            stats = buffer.stats()
+        assert self.server.requests['PUT'] == 6
+        assert self.value('c', 'hot') == {'n': 49}
+        assert self.value('c', 'key4') == {'n': 4}
+        # every put folded in gets the response of the one sent
+        assert all(future.result() is futures[0].result() for future in futures[:50])
+        assert stats == dict(writes=55, coalesced=49, sent=6, failed=0, pending=0)
+
+    @unpatched
+    def test_order(self):
+        with self.client.write_buffer(interval=0.01) as buffer:
+            for n in range(30):
+                buffer.post_event('c', 'k', 'log', {'n': n}, 1000)
+                if n == 10:
+                    # a put between events doesn't reorder them
+                    buffer.put('c', 'k', {'n': n})
+        events = self.server.store.events[('c', 'k', 'log')]
+        assert [value['n'] for event, (ref, value) in sorted(events.items())] == list(range(30))
+        assert self.value('c', 'k') == {'n': 10}
+
+    @unpatched
+    def test_errors(self):
+        failed = []
+        buffer = self.client.write_buffer(
+            interval=10, callback=lambda *args: failed.append(args))
+        self.client.put('c', 'k', {'n': 0})
+        bad = buffer.put('c', 'k', {'n': 1}, ref='not-the-ref')
+        good = buffer.put('c', 'other', {'n': 2})
+        buffer.close()
+        assert isinstance(bad.exception(), HTTPError)
+        assert good.result().status_code == 201
+        assert [(method, args[1]) for method, args, error in failed] == [('put', 'k')]
+        self.assertRaises(ValueError, buffer.put, 'c', 'k', {})
+
+    @unpatched
+    def test_max_pending(self):
+        buffer = self.client.write_buffer(max_pending=3, interval=60)
+        try:
+            futures = [buffer.put('c', 'key%d' % n, {'n': n}) for n in range(3)]
+            # sent without waiting out the interval
+            assert [f.result(timeout=5).status_code for f in futures] == [201] * 3
+        finally:
+            buffer.close()
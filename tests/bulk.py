@@ -0,0 +1,158 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+import unittest
+import porc
+from porc.bulk import Batch, item_submitter
+from benchmarks.server import StandInServer
+from .client import unpatched
+
+
+class FakeResponse(object):
+
+    def __init__(self, value):
+        self.value = value
+
+    def raise_for_status(self):
+        if self.value < 0:
+            raise ValueError(self.value)
+
+
+class BatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.executor = ThreadPoolExecutor(8)
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def tearDown(self):
+        self.executor.shutdown()
+
+    def submit(self, value, delay=0):
+        def work():
+            with self.lock:
+                self.in_flight += 1
+                self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            time.sleep(delay)
+            with self.lock:
+                self.in_flight -= 1
+            return FakeResponse(value)
+        return self.executor.submit(work)
+
+    def test_ordered(self):
+        items = [(i, 0.01 * (i % 3)) for i in range(20)]
+        batch = Batch(self.submit, items, concurrency=4)
+        results = list(batch)
+        assert [r.index for r in results] == list(range(20))
+        assert [r.response.value for r in results] == list(range(20))
+        assert self.max_in_flight <= 4
+        assert batch.summary.total == 20
+        assert batch.summary.succeeded == 20
+
+    def test_unordered(self):
+        items = [(i, 0.02 if i == 0 else 0) for i in range(10)]
+        results = list(Batch(self.submit, items, concurrency=3, ordered=False))
+        assert sorted(r.index for r in results) == list(range(10))
+        assert results[0].index != 0
+        assert self.max_in_flight <= 3
+
+    def test_errors(self):
+        def submit(value):
+            if value == 2:
+                raise RuntimeError('boom')
+            return self.submit(value)
+        batch = Batch(submit, [(1,), (-1,), (2,), (3,)], concurrency=2)
+        results = batch.results()
+        assert [r.ok for r in results] == [True, False, False, True]
+        assert isinstance(results[1].error, ValueError)
+        assert isinstance(results[2].error, RuntimeError)
+        assert batch.summary.failed == 2
+        assert batch.summary.succeeded == 2
+
+
+class ClientBatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.client = porc.Client('API_KEY', max_workers=4)
+
+    def test_concurrency_cap(self):
+        self.assertRaises(
+            ValueError, self.client.get_many, [], concurrency=5)
+        assert self.client.get_many([]).concurrency == 4
+
+    def test_delete_requires_key(self):
+        sent = []
+
+        def delete(*args):
+            sent.append(args)
+        self.client.delete = delete
+        submit = item_submitter(self.client, 'delete')
+        results = Batch(submit, [('coll',), ('coll', None), ('coll', '')]).results()
+        assert sent == []
+        assert all(isinstance(r.error, ValueError) for r in results)
+
+
+class UpdateManyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StandInServer()
+        self.client = porc.Client('key', self.server.url, max_workers=4)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.close()
+
+    def value(self, key):
+        return self.server.store.current('c', key)[1]
+
+    @unpatched
+    def test_update(self):
+        for n in range(3):
+            self.server.store.put('c', 'k%d' % n, {'count': n})
+
+        def increment(item):
+            item['count'] += 1
+        results = self.client.update_many('c', ['k0', 'k1', 'k2', 'missing'],
+                                          increment).results()
+        assert [result.item for result in results] == [
+            ('c', 'k0'), ('c', 'k1'), ('c', 'k2'), ('c', 'missing')]
+        assert [result.ok for result in results] == [True, True, True, False]
+        assert results[3].response.status_code == 404
+        assert [self.value('k%d' % n) for n in range(3)] == [
+            {'count': 1}, {'count': 2}, {'count': 3}]
+        assert results[0].response.ref == self.server.store.current('c', 'k0')[0]
+
+    @unpatched
+    def test_async(self):
+        self.server.store.put('c', 'k', {'count': 0})
+        with self.client.async_() as c:
+            results = c.update_many('c', ['k'], lambda item: {'count': 1}).results()
+        assert [result.ok for result in results] == [True]
+        assert self.value('k') == {'count': 1}
+
+    @unpatched
+    def test_conflicts(self):
+        self.server.store.put('c', 'k', {'count': 0})
+        # every update races the others for the same item
+        results = self.client.update_many(
+            'c', ['k'] * 12, lambda item: {'count': item['count'] + 1},
+            max_attempts=50).results()
+        assert all(result.ok for result in results)
+        assert self.value('k') == {'count': 12}
+        assert self.server.requests['PUT'] > 12
+
+    @unpatched
+    def test_max_attempts(self):
+        self.server.store.put('c', 'k', {'count': 0})
+
+        def meddle(item):
+            # someone else writes the item after every read
+            self.server.store.put('c', 'k', {'count': -1})
+            return {'count': 1}
+        results = self.client.update_many('c', ['k'], meddle, max_attempts=3).results()
+        assert results[0].response.status_code == 412
+        assert self.server.requests['GET'] == 3
+        assert self.value('k') == {'count': -1}
+        self.assertRaises(ValueError, self.client.update_many, 'c', ['k'], meddle,
+                          max_attempts=0)
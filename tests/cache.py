@@ -0,0 +1,257 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import porc
+from porc.cache import ItemCache, MappedStore, VersionCache, item_key
+from .client import LocalServer, unpatched
+try:
+    # python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler
+except ImportError:
+    # python 3
+    from http.server import BaseHTTPRequestHandler
+
+
+class ItemHandler(BaseHTTPRequestHandler):
+
+    """
+    Serves items from `server.items`, a dict of path to
+    `(ref, body)`, honouring `If-None-Match`.
+    """
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.requests.append(('GET', self.path, self.headers.get('If-None-Match')))
+        ref, body = self.server.items.get(self.path, (None, None))
+        if ref is None:
+            return self.reply(404, b'{}')
+        etag = '"%s"' % ref
+        if self.headers.get('If-None-Match') == etag:
+            return self.reply(304, b'', etag)
+        return self.reply(200, json.dumps(body).encode('utf-8'), etag)
+
+    def do_PUT(self):
+        self.server.requests.append(('PUT', self.path, None))
+        length = int(self.headers.get('Content-Length', 0))
+        body = json.loads(self.rfile.read(length).decode('utf-8'))
+        ref = str(len(self.server.requests))
+        self.server.items[self.path] = (ref, body)
+        self.reply(201, b'', '"%s"' % ref)
+
+    def reply(self, status, body, etag=None):
+        self.send_response(status)
+        if etag:
+            self.send_header('ETag', etag)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class ItemKeyTest(unittest.TestCase):
+
+    def test_item_key(self):
+        assert item_key('http://x/v0/c/k') == ('c', 'k')
+        assert item_key('http://x/v0/c/k%2F1?purge=true') == ('c', 'k/1')
+        assert item_key('http://x/v0/c') is None
+        assert item_key('http://x/v0/c/k/refs') is None
+        assert item_key('http://x/v0/c/k/events/e') is None
+
+
+class ItemCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = LocalServer(ItemHandler)
+        self.server.items = {'/v0/c/k': ('1', {'a': 1}), '/v0/c/j': ('1', {'b': 2})}
+        self.server.requests = []
+        self.cache = ItemCache(ttl=60)
+        self.client = porc.Client('key', self.server.url, cache=self.cache)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.close()
+
+    @unpatched
+    def test_fresh_hit(self):
+        first = self.client.get('c', 'k')
+        second = self.client.get('c', 'k')
+        assert first.json == second.json == {'a': 1}
+        assert second.ref == '1'
+        assert len(self.server.requests) == 1
+        # each caller gets its own decoded copy
+        second['a'] = 2
+        assert self.client.get('c', 'k')['a'] == 1
+        stats = self.cache.stats()
+        assert stats['hits'] == 2 and stats['misses'] == 1
+        assert stats['items'] == 1 and stats['bytes'] > 0
+
+    @unpatched
+    def test_keep_body(self):
+        client = porc.Client('key', self.server.url, cache=self.cache, keep_body=False)
+        try:
+            # decoding releases the returned response's body, not the cached one
+            assert client.get('c', 'k').json == {'a': 1}
+            assert client.get('c', 'k').json == {'a': 1}
+            assert len(self.server.requests) == 1
+            self.cache.invalidate('c', 'k')
+            assert self.cache.stats()['bytes'] == 0
+        finally:
+            client.close()
+
+    @unpatched
+    def test_revalidation(self):
+        self.cache.ttl = 0
+        self.client.get('c', 'k').raise_for_status()
+        response = self.client.get('c', 'k')
+        assert response.status_code == 200
+        assert response.json == {'a': 1}
+        assert self.server.requests[-1] == ('GET', '/v0/c/k', '"1"')
+        assert self.cache.stats()['revalidations'] == 1
+
+    @unpatched
+    def test_invalidation(self):
+        self.client.get('c', 'k')
+        self.client.get('c', 'j')
+        self.client.put('c', 'k', {'a': 3}).raise_for_status()
+        assert len(self.cache) == 1
+        assert self.client.get('c', 'k').json == {'a': 3}
+        assert self.cache.stats()['invalidations'] == 1
+
+    @unpatched
+    def test_async(self):
+        self.client.get('c', 'k')
+        future = self.client.async_().get('c', 'k')
+        assert future.result().json == {'a': 1}
+        assert len(self.server.requests) == 1
+
+    @unpatched
+    def test_eviction(self):
+        self.cache.max_items = 1
+        self.client.get('c', 'k')
+        self.client.get('c', 'j')
+        assert len(self.cache) == 1
+        self.client.get('c', 'k')
+        assert len(self.server.requests) == 3
+        assert self.cache.stats()['evictions'] == 2
+
+    @unpatched
+    def test_max_bytes(self):
+        self.cache.max_bytes = 4
+        self.client.get('c', 'k')
+        assert len(self.cache) == 0
+        # 404s aren't cached either
+        assert self.client.get('c', 'missing').status_code == 404
+        assert len(self.cache) == 0
+
+
+class VersionHandler(ItemHandler):
+
+    """
+    Serves item versions from `server.versions`,
+    a dict of `(collection, key, ref)` to value.
+    """
+
+    def do_GET(self):
+        self.server.requests.append(('GET', self.path, None))
+        path, _, query = self.path.partition('?')
+        segments = path.split('/')[2:]
+        if segments[2:3] != ['refs']:
+            return self.reply(404, b'{}')
+        if len(segments) == 4:
+            value = self.server.versions.get(tuple(segments[:2] + segments[3:]))
+            if value is None:
+                return self.reply(404, b'{}')
+            return self.reply(200, json.dumps(value).encode('utf-8'), '"%s"' % segments[3])
+        results = []
+        for (collection, key, ref), value in sorted(self.server.versions.items()):
+            result = dict(path=dict(collection=collection, key=key, ref=ref))
+            if 'values=true' in query:
+                result['value'] = value
+            results.append(result)
+        self.reply(200, json.dumps(dict(results=results, count=len(results))).encode('utf-8'))
+
+
+class VersionCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = LocalServer(VersionHandler)
+        self.server.versions = {('c', 'k', '1'): {'a': 1}, ('c', 'k', '2'): {'a': 2}}
+        self.server.requests = []
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'versions.db')
+
+    def tearDown(self):
+        self.server.close()
+        shutil.rmtree(self.dir)
+
+    def client(self, versions):
+        return porc.Client('key', self.server.url, versions=versions)
+
+    @unpatched
+    def test_get(self):
+        versions = VersionCache()
+        client = self.client(versions)
+        assert client.get('c', 'k', '1').json == {'a': 1}
+        response = client.get('c', 'k', '1')
+        assert response.json == {'a': 1}
+        assert (response.collection, response.key, response.ref) == ('c', 'k', '1')
+        assert len(self.server.requests) == 1
+        stats = versions.stats()
+        assert stats['hits'] == 1 and stats['misses'] == 1
+        # missing versions aren't cached
+        assert client.get('c', 'k', '3').status_code == 404
+        assert len(versions) == 1
+
+    @unpatched
+    def test_refs(self):
+        versions = VersionCache()
+        client = self.client(versions)
+        client.refs('c', 'k').raise_for_status()
+        assert len(versions) == 0
+        client.refs('c', 'k', values=True).raise_for_status()
+        assert len(versions) == 2
+        assert client.get('c', 'k', '2').json == {'a': 2}
+        assert len(self.server.requests) == 2
+
+    @unpatched
+    def test_budget(self):
+        versions = VersionCache(max_bytes=len(b'{"a": 1}'))
+        client = self.client(versions)
+        client.get('c', 'k', '1')
+        client.get('c', 'k', '2')
+        assert len(versions) == 1
+        assert versions.stats()['evictions'] == 1
+
+    @unpatched
+    def test_mapped_store(self):
+        versions = VersionCache(max_bytes=0, path=self.path)
+        self.client(versions).get('c', 'k', '1')
+        assert len(versions) == 0
+        assert self.client(versions).get('c', 'k', '1').json == {'a': 1}
+        versions.close()
+        # a later cache picks up where the last one left off
+        versions = VersionCache(path=self.path)
+        assert self.client(versions).get('c', 'k', '1').json == {'a': 1}
+        assert len(self.server.requests) == 1
+        assert versions.stats()['disk_hits'] == 1
+        versions.close()
+
+    def test_truncated_store(self):
+        store = MappedStore(self.path)
+        store.put(('c', 'k', '1'), b'{"a": 1}')
+        store.close()
+        with open(self.path, 'ab') as f:
+            f.write(b'\x00\x00\x00\x10')
+        store = MappedStore(self.path)
+        store.put(('c', 'k', '2'), b'{"a": 2}')
+        store.close()
+        store = MappedStore(self.path)
+        assert store.get(('c', 'k', '1')) == b'{"a": 1}'
+        assert store.get(('c', 'k', '2')) == b'{"a": 2}'
+        store.close()
@@ -1,9 +1,68 @@
 from datetime import datetime
+import gzip
+import io
 import time
 import vcr
+from vcr.patch import force_reset
+import functools
 import porc
 import unittest
 from .credentials import API_KEY
+import threading
+try:
+    # python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+except ImportError:
+    # python 3
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = b'{}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def unpatched(test):
+    """
+    Runs a test with vcr's patches removed. When several threads open
+    replayed connections at once (as in test_async), vcr can leave its
+    patches installed after the cassette closes; tests against a
+    LocalServer shouldn't depend on what ran before them.
+    """
+    @functools.wraps(test)
+    def wrapper(*args, **kwargs):
+        with force_reset():
+            return test(*args, **kwargs)
+    return wrapper
+
+
+class LocalServer(ThreadingMixIn, HTTPServer):
+
+    daemon_threads = True
+
+    def __init__(self, handler=KeepAliveHandler):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), handler)
+        self.url = 'http://127.0.0.1:%d/v0' % self.server_port
+        thread = threading.Thread(target=self.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
 
 
 class ClientTest(unittest.TestCase):
@@ -220,10 +279,39 @@ class ClientTest(unittest.TestCase):
         self.client.delete_event(
             resp.collection, resp.key, resp.type, timestamp, resp.ordinal).raise_for_status()
 
+    def test_shared_transport(self):
+        transport = self.client.transport
+        pages = self.client.list(self.collections[0])
+        assert pages.resource.transport is transport
+        assert pages._root_resource.transport is transport
+        with self.client.async_() as c:
+            assert c.transport is transport
+            assert c.async_session is transport.async_session
+        assert transport.stats() == dict(requests=0, hits=0, misses=0, collapsed=0)
+
+    @unpatched
+    def test_transport_stats(self):
+        # cassettes replay without a socket, so urllib3 treats every
+        # replayed connection as dropped; use a real local server
+        server = LocalServer()
+        client = porc.Client(self.api_key, server.url)
+        try:
+            for key in self.keys:
+                client.get(self.collections[0], key).raise_for_status()
+            with client.async_() as c:
+                c.get(self.collections[0], self.keys[0]).result()
+            stats = client.transport.stats()
+        finally:
+            client.close()
+            server.close()
+        assert stats['requests'] == 3
+        assert stats['hits'] > 0
+        assert stats['hits'] + stats['misses'] == stats['requests']
+
     @vcr.use_cassette('fixtures/client/async.yaml')
     def test_async(self):
         # add three items
-        with self.client.async() as c:
+        with self.client.async_() as c:
             futures = [
                 c.post(self.collections[1], {"holy gosh": True}),
                 c.post(self.collections[1], {"holy gosh": True}),
@@ -232,7 +320,7 @@ class ClientTest(unittest.TestCase):
             responses = [future.result() for future in futures]
             [response.raise_for_status() for response in responses]
         # ensure they all exist
-        with self.client.async() as c:
+        with self.client.async_() as c:
             futures = [
                 c.get(self.collections[1], responses[0].key),
                 c.get(self.collections[1], responses[1].key),
@@ -241,7 +329,7 @@ class ClientTest(unittest.TestCase):
             responses = [future.result() for future in futures]
             [response.raise_for_status() for response in responses]
         # delete all three
-        with self.client.async() as c:
+        with self.client.async_() as c:
             futures = [
                 c.delete(self.collections[1], responses[0].key),
                 c.delete(self.collections[1], responses[1].key),
@@ -249,3 +337,108 @@ class ClientTest(unittest.TestCase):
             ]
             responses = [future.result() for future in futures]
             [response.raise_for_status() for response in responses]
+
+
+class SlowHandler(KeepAliveHandler):
+
+    def do_GET(self):
+        self.server.paths.append(self.path)
+        time.sleep(0.2)
+        KeepAliveHandler.do_GET(self)
+
+
+class CoalesceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = LocalServer(SlowHandler)
+        self.server.paths = []
+        self.client = porc.Client(
+            API_KEY, self.server.url, coalesce=True, max_workers=4)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.close()
+
+    @unpatched
+    def test_threads(self):
+        responses = []
+
+        def get():
+            responses.append(self.client.get('c', 'k'))
+        threads = [threading.Thread(target=get) for i in range(5)]
+        [thread.start() for thread in threads]
+        [thread.join() for thread in threads]
+        assert self.server.paths == ['/v0/c/k']
+        assert len(set(id(response) for response in responses)) == 5
+        [response.raise_for_status() for response in responses]
+        assert self.client.transport.stats()['collapsed'] == 4
+
+    @unpatched
+    def test_async(self):
+        with self.client.async_() as c:
+            futures = [c.get('c', 'k') for i in range(3)]
+            futures.append(c.get('c', 'j'))
+            [future.result().raise_for_status() for future in futures]
+        assert sorted(self.server.paths) == ['/v0/c/j', '/v0/c/k']
+        assert self.client.transport.stats()['collapsed'] == 2
+        # once landed, the next request is sent afresh
+        self.client.get('c', 'k').raise_for_status()
+        assert len(self.server.paths) == 3
+
+
+class GzipHandler(KeepAliveHandler):
+
+    """
+    Echoes the last body PUT, gzipped if the client accepts it.
+    """
+
+    def do_PUT(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.server.encodings.append(self.headers.get('Content-Encoding'))
+        if self.headers.get('Content-Encoding') == 'gzip':
+            body = gzip.GzipFile(fileobj=io.BytesIO(body)).read()
+        self.server.body = body
+        self.send_response(201)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_GET(self):
+        body = self.server.body
+        self.send_response(200)
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            buffer = io.BytesIO()
+            with gzip.GzipFile(fileobj=buffer, mode='wb') as f:
+                f.write(body)
+            body = buffer.getvalue()
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class CompressionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = LocalServer(GzipHandler)
+        self.server.encodings = []
+        self.client = porc.Client(API_KEY, self.server.url, compress=1024)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.close()
+
+    @unpatched
+    def test_compression(self):
+        item = dict(('field%d' % i, 'value' * 10) for i in range(100))
+        self.client.put('c', 'small', {'a': 1}).raise_for_status()
+        self.client.put('c', 'big', item).raise_for_status()
+        assert self.server.encodings == [None, 'gzip']
+        assert self.client.get('c', 'big').json == item
+        stats = self.client.transport.compression.stats()
+        assert stats['requests_compressed'] == 1
+        assert stats['request_bytes_sent'] < stats['request_bytes']
+        assert stats['responses_compressed'] == 1
+        assert stats['response_bytes_received'] < stats['response_bytes']
+        assert stats['bytes_saved'] > 0
+        assert stats['compress_seconds'] >= 0
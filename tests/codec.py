@@ -0,0 +1,52 @@
+from collections import OrderedDict
+from datetime import datetime
+import unittest
+import porc
+from porc import codec
+
+
+def handler(obj):
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    raise TypeError(obj)
+
+
+class CodecTest(unittest.TestCase):
+
+    def test_round_trip(self):
+        item = {'name': u'caf\xe9', 'tags': ['a', 'b'], 'n': 1.5, 'ok': True, 'none': None}
+        for c in codec.available():
+            encoded = c.encode(item)
+            assert isinstance(encoded, bytes), c
+            assert c.decode(encoded) == item, c
+            assert codec.JSONCodec().decode(encoded) == item, c
+
+    def test_handler(self):
+        item = {'when': datetime(2014, 7, 10, 8, 30)}
+        for c in codec.available():
+            assert c.decode(c.encode(item, handler)) == {'when': '2014-07-10T08:30:00'}, c
+            self.assertRaises(TypeError, c.encode, {'what': object()}, handler)
+
+    def test_like_json(self):
+        # every codec encodes what the standard library does, and refuses the rest
+        item = {'o': OrderedDict(a=1)}
+        for c in codec.available():
+            assert c.decode(c.encode(item, str)) == {'o': {'a': 1}}, c
+            self.assertRaises(TypeError, c.encode, {'when': datetime(2014, 7, 10)})
+
+    def test_best(self):
+        assert type(codec.best()) is type(codec.available()[0])
+        assert isinstance(codec.available()[-1], codec.JSONCodec)
+
+    @unittest.skipIf(codec.orjson is None, 'requires orjson')
+    def test_orjson_fallback(self):
+        c = codec.OrjsonCodec()
+        assert c.decode(c.encode({'big': 2 ** 70})) == {'big': 2 ** 70}
+        assert c.decode(b'[NaN]')[0] != c.decode(b'[NaN]')[0]
+
+    def test_client(self):
+        json_codec = codec.JSONCodec()
+        client = porc.Client('key', codec=json_codec)
+        assert client.transport.codec is json_codec
+        assert client.list('c').resource.transport.codec is json_codec
+        assert porc.Client('key').transport.codec.name == codec.best().name
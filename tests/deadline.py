@@ -0,0 +1,181 @@
+from concurrent.futures import CancelledError
+import json
+import threading
+import time
+import unittest
+import porc
+from porc import Deadline, DeadlineExceeded
+from requests.exceptions import Timeout
+from .client import KeepAliveHandler, LocalServer, unpatched
+try:
+    # python 2
+    from urlparse import urlparse, parse_qs
+except ImportError:
+    # python 3
+    from urllib.parse import urlparse, parse_qs
+
+
+class SleepyHandler(KeepAliveHandler):
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.count += 1
+        time.sleep(self.server.sleep)
+        KeepAliveHandler.do_GET(self)
+
+
+class ListingHandler(KeepAliveHandler):
+
+    """
+    Lists ten of `server.items` a page, linking to the next, and
+    taking a second over pages past the second.
+    """
+
+    def do_GET(self):
+        offset = int(parse_qs(urlparse(self.path).query).get('offset', ['0'])[0])
+        if offset >= 20:
+            time.sleep(1.0)
+        items = self.server.items[offset:offset + 10]
+        body = json.dumps(dict(count=len(items), results=[
+            dict(path=dict(collection='coll', key=key), value={}) for key in items]))
+        self.send_response(200)
+        if offset + 10 < len(self.server.items):
+            self.send_header('Link', '</v0/coll?offset=%d>; rel="next"' % (offset + 10))
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body.encode('utf-8'))
+
+
+class ThrottledHandler(KeepAliveHandler):
+
+    """
+    Answers every request with a 503, asking to be retried in a second.
+    """
+
+    def do_GET(self):
+        self.server.count += 1
+        body = b'{}'
+        self.send_response(503)
+        self.send_header('Retry-After', '1')
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class DeadlineTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = LocalServer(SleepyHandler)
+        self.server.lock = threading.Lock()
+        self.server.count = 0
+        self.server.sleep = 1.0
+        self.client = porc.Client('key', self.server.url, max_workers=1)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.close()
+
+    def test_budget(self):
+        clock = [100.0]
+        deadline = Deadline(2, clock=lambda: clock[0])
+        assert deadline.timeout() == 2
+        clock[0] += 1.5
+        assert deadline.remaining() == 0.5
+        clock[0] += 1
+        assert deadline.expired()
+        self.assertRaises(DeadlineExceeded, deadline.timeout)
+
+    @unpatched
+    def test_timeout(self):
+        started = time.time()
+        client = self.client.within(0.3)
+        self.assertRaises(DeadlineExceeded, client.get, 'coll', 'key')
+        assert time.time() - started < 0.8
+        # spent, so nothing more is sent
+        self.assertRaises(DeadlineExceeded, client.get, 'coll', 'key')
+        assert self.server.count == 1
+        # the client it came from has no deadline
+        assert self.client.deadline is None
+
+    @unpatched
+    def test_cancel(self):
+        with self.client.within(0.3).async_() as c:
+            futures = [c.get('coll', key) for key in ['a', 'b', 'c']]
+        time.sleep(0.5)
+        # one worker, so the last two were still queued
+        assert [future.cancelled() for future in futures] == [False, True, True]
+        assert futures[0].exception() is not None
+
+    @unpatched
+    def test_batch(self):
+        self.server.sleep = 0.25
+        batch = self.client.within(0.4).get_many(
+            [('coll', 'a'), ('coll', 'b'), ('coll', 'c')], concurrency=1)
+        results = batch.results()
+        assert results[0].ok
+        # timed out, cancelled while queued, or never sent
+        for result in results[1:]:
+            assert isinstance(result.error, (Timeout, CancelledError))
+
+
+class DeadlineRetryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = LocalServer(ThrottledHandler)
+        self.server.count = 0
+
+    def tearDown(self):
+        self.server.close()
+
+    @unpatched
+    def test_retry(self):
+        client = porc.Client('key', self.server.url, retry=porc.Retry(max_retries=3))
+        try:
+            started = time.time()
+            self.assertRaises(DeadlineExceeded, client.within(0.5).get, 'coll', 'key')
+            # rather than waiting out three retries
+            assert time.time() - started < 0.5
+            assert self.server.count == 1
+        finally:
+            client.close()
+
+    @unpatched
+    def test_limiter(self):
+        limiter = porc.AdaptiveLimiter(initial=1)
+        client = porc.Client('key', self.server.url, limiter=limiter)
+        try:
+            # the only slot is taken
+            limiter.acquire()
+            started = time.time()
+            self.assertRaises(DeadlineExceeded, client.within(0.2).get, 'coll', 'key')
+            assert 0.15 < time.time() - started < 0.6
+            assert self.server.count == 0
+        finally:
+            client.close()
+
+
+class DeadlinePagesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = LocalServer(ListingHandler)
+        self.server.items = ['%03d' % i for i in range(50)]
+        self.client = porc.Client('key', self.server.url)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.close()
+
+    @unpatched
+    def test_partial(self):
+        pages = self.client.within(0.5).list('coll')
+        started = time.time()
+        try:
+            pages.all()
+        except DeadlineExceeded as e:
+            keys = [item['path']['key'] for item in e.results]
+        else:
+            self.fail('the deadline passed')
+        assert time.time() - started < 1.0
+        assert keys == self.server.items[:20]
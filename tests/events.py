@@ -0,0 +1,113 @@
+from datetime import datetime
+import unittest
+import porc
+from porc import util
+from benchmarks.server import StandInServer
+from .client import unpatched
+
+
+class EventReaderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StandInServer()
+        # two events a millisecond, for 500 milliseconds
+        self.events = [(1000 + i // 2, i) for i in range(1000)]
+        self.server.store.events[('c', 'k', 'log')] = dict(
+            (event, ('ref', {'n': event[1]})) for event in self.events)
+        self.client = porc.Client('key', self.server.url, max_workers=4)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.close()
+
+    def read(self, reader):
+        return [(event['timestamp'], event['ordinal']) for event in reader]
+
+    @unpatched
+    def test_order(self):
+        reader = self.client.read_events('c', 'k', 'log', 1000, 1500, windows=7, limit=20)
+        assert self.read(reader) == sorted(self.events, reverse=True)
+        assert reader.last == self.events[0]
+
+    @unpatched
+    def test_workers_free(self):
+        # the windows' fetchers don't hold the client's worker threads
+        self.server.store.put('c', 'item', {'n': 1})
+        reader = self.client.read_events('c', 'k', 'log', 1000, 1030, windows=4, limit=2)
+        for event in reader:
+            future = self.client.async_().get('c', 'item')
+            assert future.result(timeout=5).status_code == 200
+
+    @unpatched
+    def test_range(self):
+        reader = self.client.read_events('c', 'k', 'log', 1100, 1200, windows=3)
+        assert self.read(reader) == sorted(
+            [e for e in self.events if 1100 <= e[0] < 1200], reverse=True)
+
+    @unpatched
+    def test_resume(self):
+        reader = self.client.read_events('c', 'k', 'log', 1000, 1500, windows=4,
+                                         concurrency=2, limit=50)
+        first = []
+        for event in reader:
+            first.append((event['timestamp'], event['ordinal']))
+            if len(first) == 301:
+                break
+        # the last event read shares its timestamp with the next one
+        assert first[-1][0] == self.events[1000 - 302][0]
+        resumed = porc.Client('key', self.server.url).read_events(
+            'c', 'k', 'log', 1000, 1500, resume=reader.last)
+        assert first + self.read(resumed) == sorted(self.events, reverse=True)
+
+    def test_bounds(self):
+        reader = self.client.read_events('c', 'k', 'log', 0, 10, windows=4)
+        assert reader.bounds() == [
+            dict(startEvent=7, beforeEvent=10), dict(startEvent=4, beforeEvent=7),
+            dict(startEvent=1, beforeEvent=4), dict(startEvent=0, beforeEvent=1)]
+        start = datetime(2014, 7, 10)
+        reader = self.client.read_events('c', 'k', 'log', start, start, resume=(5, 1))
+        assert reader.start == util.datetime_to_timestamp(start)
+        assert reader.bounds() == []
+        self.assertRaises(ValueError, self.client.read_events,
+                          'c', 'k', 'log', 0, 10, concurrency=5)
+
+
+class PostEventsManyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StandInServer()
+        self.client = porc.Client('key', self.server.url, max_workers=4)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.close()
+
+    @unpatched
+    def test_order(self):
+        # every event at the same millisecond, so only ordinals order them
+        events = [('c', 'k%d' % (i % 3), 'log', {'n': i}, datetime(2014, 1, 1))
+                  for i in range(60)]
+        results = self.client.post_events_many(events, concurrency=4).results()
+        assert all(result.ok for result in results)
+        timestamp = util.datetime_to_timestamp(datetime(2014, 1, 1))
+        assert set(result.response.timestamp for result in results) == set([str(timestamp)])
+        for key in ['k0', 'k1', 'k2']:
+            posted = [(int(result.response.ordinal), result.item[3]['n'])
+                      for result in results if result.item[1] == key]
+            assert sorted(posted) == posted
+
+    @unpatched
+    def test_columns(self):
+        events = dict(collection=['c'] * 4, key=['a', 'b', 'a', 'b'],
+                      type=['log'] * 4, data=[{'n': i} for i in range(4)],
+                      timestamp=[1000, datetime.utcfromtimestamp(2), None, 3000])
+        results = self.client.post_events_many(events).results()
+        assert [r.item[4] for r in results] == [1000, 2000, None, 3000]
+        stored = self.server.store.events
+        assert sorted(e[0] for e in stored[('c', 'a', 'log')]) == sorted(
+            [1000, int(results[2].response.timestamp)])
+        assert sorted(e[0] for e in stored[('c', 'b', 'log')]) == [2000, 3000]
+
+    def test_requires_key(self):
+        results = self.client.post_events_many([('c', None, 'log', {})]).results()
+        assert isinstance(results[0].error, ValueError)
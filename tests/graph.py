@@ -0,0 +1,66 @@
+import unittest
+import porc
+from benchmarks.server import StandInServer
+from .client import unpatched
+
+
+class TraversalTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StandInServer()
+        store = self.server.store
+        # a binary tree of people, numbered from 1, plus a back edge
+        for n in range(1, 32):
+            store.put('people', str(n), {'n': n})
+        for n in range(1, 16):
+            for child in [2 * n, 2 * n + 1]:
+                store.relations.setdefault(('people', str(n), 'child'), set()).add(
+                    ('people', str(child)))
+        store.relations[('people', '4', 'friend')] = set([('people', '1'), ('people', '3')])
+        self.client = porc.Client('key', self.server.url, max_workers=4)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.close()
+
+    def requests(self):
+        return self.server.requests.get('GET', 0)
+
+    @unpatched
+    def test_depth(self):
+        walk = self.client.traverse([('people', '1')], 'child', depth=2)
+        nodes = list(walk)
+        assert [(node.key, node.depth) for node in nodes[:1]] == [('1', 0)]
+        assert sorted(int(node.key) for node in nodes) == list(range(1, 8))
+        assert [node.depth for node in nodes] == [0, 1, 1, 2, 2, 2, 2]
+        node = [node for node in nodes if node.key == '6'][0]
+        assert node.parent == ('people', '3')
+        assert node.item['value'] == {'n': 6}
+
+    @unpatched
+    def test_dedup(self):
+        walk = self.client.traverse(
+            [('people', '2'), ('people', '4'), ('people', '2')],
+            ['child', 'friend'], depth=3, concurrency=2, limit=1)
+        nodes = list(walk)
+        keys = [node.key for node in nodes]
+        assert len(keys) == len(set(keys))
+        # 3 is a friend of 4, one hop away, though 1 isn't walked from
+        assert dict((node.key, node.depth) for node in nodes)['3'] == 1
+        # every node is listed once per kind
+        listed = walk.stats()['listed']
+        assert listed == 2 * len(set(node[:2] for node in nodes if node.depth < 3))
+
+    @unpatched
+    def test_adjacency(self):
+        walk = self.client.traverse([('people', '1')], 'child', depth=3)
+        first = list(walk)
+        sent = self.requests()
+        # nodes of a hop come as their listings complete
+        assert sorted(list(walk)) == sorted(first)
+        assert self.requests() == sent
+        assert walk.stats()['cached'] == walk.stats()['listed']
+
+    def test_concurrency_cap(self):
+        self.assertRaises(ValueError, self.client.traverse,
+                          [('people', '1')], 'child', concurrency=5)
@@ -0,0 +1,112 @@
+import threading
+import time
+import unittest
+import porc
+from porc.hedge import Hedge
+from .client import KeepAliveHandler, LocalServer, unpatched
+try:
+    import asyncio
+    from porc import aio
+except ImportError:
+    aio = None
+
+
+class StallingHandler(KeepAliveHandler):
+
+    """
+    Stalls the first GET of each path for `server.stall` seconds.
+    """
+
+    def do_GET(self):
+        with self.server.lock:
+            first = self.path not in self.server.seen
+            self.server.seen.add(self.path)
+        if first:
+            time.sleep(self.server.stall)
+        KeepAliveHandler.do_GET(self)
+
+
+class HedgeTest(unittest.TestCase):
+
+    def test_delay(self):
+        hedge = Hedge(initial=0.05, warmup=10, min_delay=0.001)
+        assert hedge.delay('get') == 0.05
+        for i in range(100):
+            hedge.observe('get', 0.002 if i < 95 else 0.5)
+        # p95 of mostly 2ms, within its bucket
+        assert 0.002 <= hedge.delay('get') < 0.003
+        assert hedge.delay('relations') == 0.05
+        slow = Hedge(warmup=1, max_delay=1.0)
+        slow.observe('get', 100)
+        assert slow.delay('get') == 1.0
+        assert hedge.applies('GET', 'http://host/v0/coll/key') == 'get'
+        assert hedge.applies('GET', 'http://host/v0/coll?query=x') is None
+        assert hedge.applies('PUT', 'http://host/v0/coll/key') is None
+
+    def test_cap(self):
+        hedge = Hedge(max_ratio=0.1)
+        for i in range(20):
+            hedge.delay('get')
+        assert [hedge.try_hedge() for i in range(3)] == [True, True, False]
+        assert hedge.stats() == dict(requests=20, hedged=2, won=0)
+
+
+class HedgedClientTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = LocalServer(StallingHandler)
+        self.server.lock = threading.Lock()
+        self.server.seen = set()
+        self.server.stall = 1.0
+        self.hedge = Hedge(initial=0.05, max_ratio=1.0)
+        self.client = porc.Client('key', self.server.url, hedge=self.hedge)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.close()
+
+    @unpatched
+    def test_sync(self):
+        started = time.time()
+        response = self.client.get('coll', 'key')
+        assert response.status_code == 200
+        assert time.time() - started < 0.5
+        assert self.hedge.stats() == dict(requests=1, hedged=1, won=1)
+        # answered well within the delay, so not hedged
+        self.hedge.initial = 0.5
+        self.client.get('coll', 'key')
+        assert self.hedge.stats()['hedged'] == 1
+
+    @unpatched
+    def test_async(self):
+        started = time.time()
+        with self.client.async_() as c:
+            futures = [c.get('coll', key) for key in ['a', 'b']]
+            assert [f.result().status_code for f in futures] == [200, 200]
+        assert time.time() - started < 0.5
+        assert self.hedge.stats()['won'] == 2
+
+    @unpatched
+    def test_cap(self):
+        self.hedge.max_ratio = 0.5
+        started = time.time()
+        self.client.get('coll', 'a')
+        self.client.get('coll', 'b')
+        # hedging the first would have doubled the load; the second, only half
+        assert time.time() - started >= 1.0
+        assert self.hedge.stats() == dict(requests=2, hedged=1, won=1)
+
+    @unittest.skipIf(aio is None or aio.aiohttp is None, 'requires asyncio and aiohttp')
+    def test_aio(self):
+        loop = asyncio.new_event_loop()
+        client = aio.Client('key', self.server.url, hedge=self.hedge)
+        try:
+            started = time.time()
+            response = loop.run_until_complete(client.get('coll', 'key'))
+            elapsed = time.time() - started
+        finally:
+            loop.run_until_complete(client.close())
+            loop.close()
+        assert response.status_code == 200
+        assert elapsed < 0.5
+        assert self.hedge.stats()['won'] == 1
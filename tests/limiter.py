@@ -0,0 +1,138 @@
+from email.utils import formatdate
+import threading
+import time
+import unittest
+import porc
+from porc.limiter import AdaptiveLimiter, Retry, retry_after_seconds
+from .client import KeepAliveHandler, LocalServer, unpatched
+
+
+class FakeResponse(object):
+
+    def __init__(self, status_code, **headers):
+        self.status_code = status_code
+        self.headers = dict((key.replace('_', '-'), value) for key, value in headers.items())
+
+
+class ThrottlingHandler(KeepAliveHandler):
+
+    """
+    Answers 429 until `server.throttle` requests have been refused.
+    """
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.count += 1
+            throttled = self.server.count <= self.server.throttle
+        if not throttled:
+            return KeepAliveHandler.do_GET(self)
+        self.send_response(429)
+        self.send_header('Retry-After', '0')
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    do_POST = do_GET
+
+
+class AdaptiveLimiterTest(unittest.TestCase):
+
+    def test_growth(self):
+        limiter = AdaptiveLimiter(initial=2, max_limit=4)
+        for i in range(50):
+            assert limiter.try_acquire()
+            limiter.release(0.01, 200)
+        assert limiter.stats()['limit'] == 4
+
+    def test_backoff(self):
+        limiter = AdaptiveLimiter(initial=8)
+        limiter.acquire()
+        limiter.acquire()
+        limiter.release(0.01, 429)
+        # the second in the burst doesn't count again
+        limiter.release(0.01, 429)
+        stats = limiter.stats()
+        assert stats['limit'] == 4
+        assert stats['throttled'] == 2 and stats['backoffs'] == 1
+        for i in range(4):
+            assert limiter.try_acquire()
+        assert not limiter.try_acquire()
+
+    def test_latency(self):
+        limiter = AdaptiveLimiter(initial=8, smoothing=1.0)
+        limiter.acquire()
+        limiter.release(0.01, 200)
+        limiter.acquire()
+        limiter.release(0.1, 200)
+        assert limiter.stats()['limit'] == 4
+
+    def test_acquire_waits(self):
+        limiter = AdaptiveLimiter(initial=1)
+        limiter.acquire()
+        acquired = []
+        thread = threading.Thread(target=lambda: acquired.append(limiter.acquire()))
+        thread.start()
+        time.sleep(0.05)
+        assert not acquired
+        limiter.release(0.01, 200)
+        thread.join(1)
+        assert acquired
+
+
+class RetryTest(unittest.TestCase):
+
+    def test_delay(self):
+        retry = Retry(max_retries=2, base=0.1)
+        assert retry.delay('POST', 0, FakeResponse(503)) is None
+        assert retry.delay('GET', 0, FakeResponse(404)) is None
+        assert 0 <= retry.delay('GET', 1, FakeResponse(503)) <= 0.2
+        assert 0 <= retry.delay('PUT', 0) <= 0.1
+        assert retry.delay('GET', 2, FakeResponse(503)) is None
+        assert retry.retries == 2
+
+    def test_retry_after(self):
+        retry = Retry()
+        assert retry.delay('GET', 0, FakeResponse(429, retry_after='7')) == 7
+        later = FakeResponse(503, retry_after=formatdate(time.time() + 60))
+        assert 55 < retry_after_seconds(later) <= 60
+        assert retry_after_seconds(FakeResponse(503, retry_after='soon')) is None
+        # too long to hold a worker for, so not retried at all
+        assert retry.delay('GET', 0, FakeResponse(503, retry_after='3600')) is None
+        assert Retry(max_retry_after=5).delay('GET', 0, FakeResponse(429, retry_after='7')) is None
+        assert retry.retries == 1
+
+
+class ThrottlingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = LocalServer(ThrottlingHandler)
+        self.server.lock = threading.Lock()
+        self.server.count = 0
+        self.server.throttle = 2
+        self.limiter = AdaptiveLimiter()
+        self.client = porc.Client('key', self.server.url, limiter=self.limiter,
+                                  retry=Retry(base=0.01))
+
+    def tearDown(self):
+        self.client.close()
+        self.server.close()
+
+    @unpatched
+    def test_retries(self):
+        self.client.get('c', 'k').raise_for_status()
+        assert self.server.count == 3
+        assert self.client.transport.retry.retries == 2
+        stats = self.limiter.stats()
+        assert stats['throttled'] == 2 and stats['in_flight'] == 0
+
+    @unpatched
+    def test_not_idempotent(self):
+        assert self.client.post('c', {}).status_code == 429
+        assert self.server.count == 1
+
+    @unpatched
+    def test_async(self):
+        with self.client.async_() as c:
+            futures = [c.get('c', key) for key in 'abcd']
+            [future.result().raise_for_status() for future in futures]
+        assert self.server.count == 6
+        assert self.limiter.stats()['in_flight'] == 0
@@ -0,0 +1,116 @@
+import logging
+import time
+import unittest
+import porc
+from porc.metrics import Histogram, Metrics, operation
+from .client import KeepAliveHandler, LocalServer, unpatched
+
+
+class RequestIdHandler(KeepAliveHandler):
+
+    def do_GET(self):
+        if 'slow' in self.path:
+            time.sleep(0.1)
+        body = b'{"results": []}'
+        self.send_response(200)
+        self.send_header('X-ORCHESTRATE-REQ-ID', 'req-%d' % len(self.path))
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_PUT(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.send_response(201)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+
+class OperationTest(unittest.TestCase):
+
+    def test_operation(self):
+        url = 'http://x/v0/users'
+        assert operation('GET', url + '/k') == 'get'
+        assert operation('PUT', url + '/k') == 'put'
+        assert operation('DELETE', url) == 'delete'
+        assert operation('GET', url) == 'list'
+        assert operation('GET', url, dict(query='*')) == 'search'
+        assert operation('GET', url + '?query=%2A') == 'search'
+        assert operation('GET', url + '/k/refs') == 'refs'
+        assert operation('GET', url + '/k/refs/abc') == 'refs'
+        assert operation('POST', url + '/k/events/log') == 'events'
+        assert operation('GET', url + '/k/relations/friends') == 'relations'
+        assert operation('PUT', url + '/k/relation/friend/users/j') == 'relations'
+        assert operation('HEAD', 'http://x/v0') == 'ping'
+        # collections named like sections are just collections
+        assert operation('GET', 'http://x/v0/eventstore/k1') == 'get'
+        assert operation('GET', 'http://x/v0/events/k1') == 'get'
+        assert operation('GET', 'http://x/v0/refs') == 'list'
+        assert operation('GET', url + '/k/events') == 'events'
+
+
+class HistogramTest(unittest.TestCase):
+
+    def test_percentiles(self):
+        histogram = Histogram()
+        assert histogram.percentile(50) is None
+        for i in range(1, 101):
+            histogram.add(i / 1000.0)
+        exported = histogram.export()
+        assert exported['count'] == 100
+        assert abs(exported['mean'] - 0.0505) < 1e-9
+        assert 0.05 <= exported['p50'] <= 0.05 * 2 ** 0.5
+        assert 0.099 <= exported['p99'] <= 0.1
+        assert exported['max'] == 0.1
+        assert sum(count for bound, count in exported['buckets']) == 100
+
+
+class MetricsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = LocalServer(RequestIdHandler)
+        self.samples = []
+        self.metrics = Metrics(callback=self.samples.append, slow=0.1)
+        self.client = porc.Client('key', self.server.url, metrics=self.metrics)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.close()
+
+    @unpatched
+    def test_record(self):
+        self.client.get('users', 'k').raise_for_status()
+        self.client.put('users', 'k', {'a': 1}).raise_for_status()
+        self.client.search('users', '*').next().raise_for_status()
+        with self.client.async_() as c:
+            c.get('users', 'j').result().raise_for_status()
+        assert [s.operation for s in self.samples] == ['get', 'put', 'search', 'get']
+        get = self.samples[0]
+        assert get.collection == 'users' and get.status == 200
+        assert get.request_id == 'req-%d' % len('/v0/users/k')
+        assert get.response_bytes == len(b'{"results": []}')
+        assert self.samples[1].request_bytes == len(
+            self.client.transport.codec.encode({'a': 1}))
+        exported = dict((e['operation'], e) for e in self.metrics.export())
+        assert exported['get']['latency']['count'] == 2
+        assert exported['get']['statuses'] == {200: 2}
+        assert exported['put']['statuses'] == {201: 1}
+        assert exported['search']['throughput'] > 0
+        self.metrics.reset()
+        assert self.metrics.export() == []
+
+    @unpatched
+    def test_slow(self):
+        records = []
+        handler = logging.Handler()
+        handler.emit = records.append
+        logger = logging.getLogger('porc.metrics')
+        logger.addHandler(handler)
+        try:
+            self.client.get('users', 'fast')
+            self.client.get('users', 'slow')
+        finally:
+            logger.removeHandler(handler)
+        assert [s.url for s in self.metrics.slow_requests] == [
+            self.server.url + '/users/slow']
+        assert len(records) == 1
+        assert 'req-%d' % len('/v0/users/slow') in records[0].getMessage()
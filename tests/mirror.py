@@ -0,0 +1,125 @@
+import os
+import shutil
+import tempfile
+import unittest
+import porc
+from porc.mirror import SQLiteStore, field_values
+from benchmarks.server import StandInServer
+from .client import unpatched
+
+
+class MirrorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StandInServer()
+        versions = self.server.store.versions
+        for n in range(25):
+            ref = self.server.store.put('people', 'key%02d' % n, {
+                'n': n, 'city': ['Paris', 'Oslo'][n % 2], 'tags': ['t%d' % (n % 3)]})
+            # a second apart, so later changes come after all of them
+            reftime, value, tombstone = versions[('people', 'key%02d' % n, ref)]
+            versions[('people', 'key%02d' % n, ref)] = (
+                reftime - (25 - n) * 1000, value, tombstone)
+        self.client = porc.Client('key', self.server.url, max_workers=4)
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        self.client.close()
+        self.server.close()
+        shutil.rmtree(self.directory)
+
+    def gets(self):
+        return self.server.requests['GET']
+
+    @unpatched
+    def test_sync(self):
+        mirror = self.client.mirror('people', limit=10)
+        assert mirror.sync() == 25
+        assert len(mirror) == 25
+        assert mirror.get('key07')['n'] == 7
+        assert mirror.ref('key07') == self.server.store.current('people', 'key07')[0]
+        assert 'key24' in mirror and 'key25' not in mirror
+        assert mirror.get('key25', 'missing') == 'missing'
+        assert sorted(mirror) == ['key%02d' % n for n in range(25)]
+        # nothing changed: one search, and no listing
+        requests = self.gets()
+        assert mirror.sync() == 0
+        assert self.gets() == requests + 1
+        assert mirror.stats() == dict(syncs=2, updated=25, deleted=0, items=25)
+
+    @unpatched
+    def test_incremental(self):
+        mirror = self.client.mirror('people', limit=10)
+        mirror.sync()
+        self.client.put('people', 'key03', {'n': -3})
+        self.client.put('people', 'key04', {'n': -4})
+        self.client.put('people', 'key99', {'n': 99})
+        requests = self.gets()
+        assert mirror.sync() == 3
+        assert self.gets() == requests + 1
+        assert [mirror.get(key)['n'] for key in ['key03', 'key04', 'key99']] == [-3, -4, 99]
+        assert len(mirror) == 26
+
+    @unpatched
+    def test_same_reftime(self):
+        mirror = self.client.mirror('people', limit=10)
+        mirror.sync()
+        for n in range(25):
+            self.client.put('people', 'key%02d' % n, {'n': -n})
+        # every change in the same millisecond: more than a page of ties
+        versions = self.server.store.versions
+        for version, (reftime, value, tombstone) in list(versions.items()):
+            versions[version] = (2 ** 42, value, tombstone)
+        assert mirror.sync() == 25
+        assert all(mirror.get('key%02d' % n)['n'] == -n for n in range(25))
+        assert mirror.sync() == 0
+
+    @unpatched
+    def test_deletes(self):
+        mirror = self.client.mirror('people', limit=10)
+        mirror.sync()
+        self.client.delete('people', 'key05')
+        mirror.sync()
+        assert 'key05' in mirror
+        assert mirror.sync(full=True) == 1
+        assert 'key05' not in mirror
+        assert mirror.stats()['deleted'] == 1
+
+    @unpatched
+    def test_indexes(self):
+        mirror = self.client.mirror('people', indexes=['city', 'tags'], limit=10)
+        mirror.sync()
+        assert [key for key, value in mirror.find('city', 'Oslo')] == [
+            'key%02d' % n for n in range(1, 25, 2)]
+        assert len(mirror.find('tags', 't0')) == 9
+        self.client.put('people', 'key01', {'n': 1, 'city': 'Rome', 'tags': []})
+        mirror.sync()
+        assert 'key01' not in dict(mirror.find('city', 'Oslo'))
+        assert mirror.find('city', 'Rome') == [('key01', {'n': 1, 'city': 'Rome', 'tags': []})]
+        assert len(mirror.find('tags', 't1')) == 7
+        assert mirror.find('city', 'Lima') == []
+        self.assertRaises(ValueError, mirror.find, 'n', 1)
+
+    @unpatched
+    def test_sqlite(self):
+        path = os.path.join(self.directory, 'people.db')
+        with self.client.mirror('people', SQLiteStore(path), limit=10) as mirror:
+            mirror.sync()
+        self.client.put('people', 'key00', {'n': 100, 'city': 'Rome'})
+        requests = self.gets()
+        # picks up where the last mirror left off, with its indexes rebuilt
+        with self.client.mirror('people', SQLiteStore(path), ['city'], limit=10) as mirror:
+            assert len(mirror) == 25
+            assert mirror.find('city', 'Rome') == []
+            assert mirror.sync() == 1
+            assert self.gets() == requests + 1
+            assert [key for key, value in mirror.find('city', 'Rome')] == ['key00']
+            assert mirror.get('key00')['n'] == 100
+
+    def test_field_values(self):
+        value = {'a': {'b': 1}, 'tags': ['x', 'y', {'z': 1}], 'c': {}}
+        assert field_values(value, 'a.b') == [1]
+        assert field_values(value, 'tags') == ['x', 'y']
+        assert field_values(value, 'c') == []
+        assert field_values(value, 'a.missing') == []
+        assert field_values(value, 'a.b.c') == []
@@ -3,6 +3,171 @@ import vcr
 import porc
 import unittest
 from .credentials import API_KEY
+from .client import KeepAliveHandler, LocalServer, unpatched
+import json
+try:
+    # python 2
+    from urlparse import urlparse, parse_qs
+except ImportError:
+    # python 3
+    from urllib.parse import urlparse, parse_qs
+
+
+class SearchHandler(KeepAliveHandler):
+
+    """
+    Searches `server.items`, calling `server.on_search` first.
+    """
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        offset = int(query.get('offset', ['0'])[0])
+        limit = int(query.get('limit', ['10'])[0])
+        self.server.on_search(offset)
+        items = self.server.items
+        results = [dict(path=dict(collection='coll', key=key), value={})
+                   for key in items[offset:offset + limit]]
+        body = json.dumps(dict(
+            count=len(results), total_count=len(items), results=results))
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body.encode('utf-8'))
+
+
+class FakePages(porc.Pages):
+
+    """
+    Serves `count` pages of one item each, `delay` seconds apart.
+    """
+
+    def __init__(self, count, delay):
+        porc.Pages.__init__(self, {}, 'http://localhost/v0', 'fake', {})
+        self.count = count
+        self.delay = delay
+        self.fetched = 0
+
+    def next(self, querydict={}, **headers):
+        if self.fetched == self.count:
+            raise StopIteration
+        time.sleep(self.delay)
+        self.fetched += 1
+        return FakePage(self.fetched)
+
+
+class FakePage(dict):
+
+    def __init__(self, number):
+        dict.__init__(self, results=[number])
+
+    def raise_for_status(self):
+        pass
+
+
+class PrefetchTest(unittest.TestCase):
+
+    def test_prefetch_overlaps_consumption(self):
+        pages = FakePages(5, 0.1)
+        start = time.time()
+        items = []
+        for item in pages.iter_items(prefetch=1):
+            time.sleep(0.1)
+            items.append(item)
+        elapsed = time.time() - start
+        assert items == [1, 2, 3, 4, 5]
+        # sequential would take 1.0s; overlapped, about 0.6s
+        assert elapsed < 0.85
+
+    def test_prefetch_bounds_pages_ahead(self):
+        pages = FakePages(10, 0)
+        items = pages.iter_items(prefetch=2)
+        next(items)
+        time.sleep(0.1)
+        # the page being consumed, plus two ahead
+        assert pages.fetched == 3
+        items.close()
+
+    def test_prefetch_validation(self):
+        pages = FakePages(1, 0)
+        self.assertRaises(ValueError, list, pages.iter_items(prefetch=0))
+
+
+class IterItemsTest(unittest.TestCase):
+
+    def setUp(self):
+        from benchmarks.server import StandInServer
+        self.server = StandInServer()
+        for n in range(6):
+            self.server.store.put('coll', 'key%d' % n, {'n': n})
+        self.client = porc.Client(API_KEY, self.server.url, max_workers=1)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.close()
+
+    @unpatched
+    def test_nested(self):
+        # neither listing holds the client's only worker thread
+        pairs = []
+        for outer in self.client.list('coll', limit=2).iter_items():
+            for inner in self.client.list('coll', limit=2).iter_items():
+                future = self.client.async_().get('coll', inner['path']['key'])
+                assert future.result(timeout=5).status_code == 200
+                pairs.append((outer['path']['key'], inner['path']['key']))
+        assert len(pairs) == 36
+
+
+class ParallelAllTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = LocalServer(SearchHandler)
+        self.server.items = ['%03d' % i for i in range(45)]
+        self.server.on_search = lambda offset: None
+        self.client = porc.Client(API_KEY, self.server.url, max_workers=4)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.close()
+
+    def keys(self, items):
+        return [item['path']['key'] for item in items]
+
+    @unpatched
+    def test_parallel_all(self):
+        items = self.client.search('coll', '*', limit=10).parallel_all()
+        assert self.keys(items) == self.server.items
+
+    @unpatched
+    def test_workers_cap(self):
+        pages = self.client.search('coll', '*', limit=10)
+        self.assertRaises(ValueError, pages.parallel_all, workers=5)
+
+    @unpatched
+    def test_result_set_changes(self):
+        original = list(self.server.items)
+
+        def on_search(offset):
+            # an item sorting first appears once the scan starts
+            if offset == 20 and '000a' not in self.server.items:
+                self.server.items.insert(1, '000a')
+        self.server.on_search = on_search
+        items = self.client.search('coll', '*', limit=10).parallel_all()
+        keys = self.keys(items)
+        assert len(keys) == len(set(keys))
+        assert set(keys) == set(original + ['000a'])
+
+    def test_unique_events(self):
+        from porc.pages import _unique
+
+        def event(ordinal):
+            return dict(path=dict(collection='coll', key='k', kind='event', type='log',
+                                  timestamp=1000, ordinal=ordinal))
+        item = dict(path=dict(collection='coll', key='k', kind='item', ref='a'))
+        updated = dict(path=dict(collection='coll', key='k', kind='item', ref='b'))
+        # many events on one item are all kept; an item is kept once
+        results = _unique([event(1), event(2), item, event(1), updated])
+        assert results == [event(1), event(2), item]
 
 
 class PagesTest(unittest.TestCase):
@@ -16,7 +181,7 @@ class PagesTest(unittest.TestCase):
         self.keys = ['KEY_1', 'KEY_2']
         self.pages = self.client.search(self.collections[0], '*', limit=1)
         # add items
-        with self.client.async() as c:
+        with self.client.async_() as c:
             futures = [
                 c.post(self.collections[0], {'lol': True}),
                 c.post(self.collections[0], {'lol': True}),
@@ -58,7 +223,64 @@ class PagesTest(unittest.TestCase):
         all_items = self.pages.all()
         assert len(all_items) > 0
 
+    @vcr.use_cassette('fixtures/pages/all.yaml')
+    def test_iter_items(self):
+        items = list(self.pages.iter_items())
+        assert len(items) > 0
+
     @vcr.use_cassette('fixtures/pages/iter.yaml')
     def test_iter(self):
         pages = [page for page in self.pages]
         [page.raise_for_status() for page in pages]
+
+
+class CursorTest(unittest.TestCase):
+
+    def setUp(self):
+        from benchmarks.server import StandInServer
+        self.server = StandInServer()
+        for n in range(25):
+            self.server.store.put('coll', 'key%02d' % n, {'n': n})
+        self.client = porc.Client(API_KEY, self.server.url)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.close()
+
+    def keys(self, page):
+        return [item['path']['key'] for item in page['results']]
+
+    @unpatched
+    def test_canonical_urls(self):
+        pages = self.client.search('coll', '*', limit=5)
+        urls = [page.url for page in pages]
+        assert len(urls) == 5
+        for url in urls:
+            assert '//v0' not in url
+            query = parse_qs(urlparse(url).query)
+            assert [len(values) for values in query.values()] == [1] * len(query)
+
+    @unpatched
+    def test_resume(self):
+        pages = self.client.list('coll', limit=10)
+        assert pages.cursor() == '/v0/coll?limit=10'
+        first = self.keys(pages.next())
+        cursor = pages.cursor()
+        assert cursor == '/v0/coll?afterKey=key09&limit=10'
+        # carry on elsewhere, as from another process
+        other = porc.Client(API_KEY, self.server.url)
+        try:
+            resumed = other.list('coll', cursor=cursor)
+            rest = [key for page in resumed for key in self.keys(page)]
+        finally:
+            other.close()
+        assert first + rest == ['key%02d' % n for n in range(25)]
+        assert resumed.cursor() is None
+
+    @unpatched
+    def test_search_cursor(self):
+        pages = self.client.search('coll', '*', limit=10, sort='value.n:asc')
+        assert pages.cursor() == '/v0/coll?limit=10&query=%2A&sort=value.n%3Aasc'
+        pages.next()
+        resumed = self.client.search('coll', '*', cursor=pages.cursor())
+        assert self.keys(resumed.next())[0] == 'key10'
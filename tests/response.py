@@ -1,21 +1,69 @@
-# import vcr
-# import porc
-# import unittest
-# from .credentials import API_KEY
+import unittest
+from requests.models import Response as Requests_Response
+from requests.structures import CaseInsensitiveDict
+from porc import Response, router
 
-# class ResponseTest(unittest.TestCase):
 
-#     def setUp(self):
-#         pass
+def make_response(url, body=b'', **headers):
+    resp = Requests_Response()
+    resp.status_code = 200
+    resp.url = url
+    resp.headers = CaseInsensitiveDict(headers)
+    resp._content = body
+    return resp
 
-#     def test_path(self):
-# 		pass
 
-#     def test_getattr(self):
-# 		pass
+class ResponseTest(unittest.TestCase):
 
-#     def test_getitem(self):
-# 		pass
+    def test_path(self):
+        resp = Response(make_response(
+            'https://api.orchestrate.io/v0/coll', b'{}',
+            location='/v0/coll/a_key/refs/a_ref', etag='"a_ref"'))
+        assert resp._path is None
+        assert resp.collection == 'coll'
+        assert resp.key == 'a_key'
+        assert resp.ref == 'a_ref'
+        assert resp.path == router.EMPTY._replace(
+            collection='coll', key='a_key', ref='a_ref')
+        self.assertRaises(AttributeError, getattr, resp, 'ordinal')
 
-#     def test_setitem(self):
-# 		pass
+    def test_events_path(self):
+        resp = Response(make_response(
+            'https://api.orchestrate.io/v0/coll/a_key/events/log/1404973704558/4'))
+        assert resp.type == 'log'
+        assert resp.timestamp == '1404973704558'
+        assert resp.ordinal == '4'
+
+    def test_lazy_json(self):
+        resp = Response(make_response('https://api.orchestrate.io/v0', b'not json'))
+        # undecodable bodies only fail once read
+        assert resp.status_code == 200
+        assert resp._json is None
+
+    def test_getattr(self):
+        resp = Response(make_response('https://api.orchestrate.io/v0', b''))
+        assert resp.status_code == 200
+        assert resp.json == {}
+
+    def test_getitem(self):
+        resp = Response(make_response('https://api.orchestrate.io/v0', b'{"a": 1}'))
+        assert resp['a'] == 1
+        assert resp['b'] is None
+        assert list(resp) == ['a']
+
+    def test_setitem(self):
+        resp = Response(make_response('https://api.orchestrate.io/v0', b'{"a": 1}'))
+        resp['b'] = 2
+        del resp['a']
+        assert resp.json == dict(b=2)
+
+    def test_keep_body(self):
+        resp = Response(
+            make_response('https://api.orchestrate.io/v0', b'{"a": 1}'), False)
+        assert resp['a'] == 1
+        assert not resp.content
+        assert resp['a'] == 1
+
+    def test_slots(self):
+        resp = Response(make_response('https://api.orchestrate.io/v0'))
+        self.assertRaises(AttributeError, setattr, resp, 'derp', True)
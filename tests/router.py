@@ -0,0 +1,45 @@
+import unittest
+from porc import router
+
+
+class RouterTest(unittest.TestCase):
+
+    def assert_parses(self, url, **fields):
+        assert router.parse(url) == router.EMPTY._replace(**fields)
+
+    def test_parse(self):
+        self.assert_parses('/v0/coll', collection='coll')
+        self.assert_parses(
+            'https://api.orchestrate.io/v0/coll/key?limit=1',
+            collection='coll', key='key')
+        self.assert_parses('/v0/coll/key/refs', collection='coll', key='key')
+        self.assert_parses(
+            '/v0/coll/key/refs/abc', collection='coll', key='key', ref='abc')
+        self.assert_parses(
+            '/v0/coll/key/events/log/1404973704558/4',
+            collection='coll', key='key', type='log',
+            timestamp='1404973704558', ordinal='4')
+        self.assert_parses(
+            '/v0/coll/key/relations/friends/family',
+            collection='coll', key='key', kinds=('friends', 'family'))
+        self.assert_parses(
+            '/v0/coll/key/relation/friends/coll2/key2',
+            collection='coll', key='key', kind='friends',
+            to_collection='coll2', to_key='key2')
+        assert router.parse('https://api.orchestrate.io/') is None
+
+    def test_escaped_keys(self):
+        # keys containing reserved words or slashes stay in one segment
+        key = 'a/events/b/refs/c'
+        location = router.parse('/v0/coll/' + router.build([key]) + '/refs/abc')
+        assert location.key == key
+        assert location.ref == 'abc'
+        assert location.type is None
+
+    def test_round_trip(self):
+        for path in ['coll', 'coll/key', 'coll/key/refs/abc',
+                     'coll/key/events/log/1404973704558/4',
+                     'coll/key/relations/friends/family',
+                     'coll/key/relation/friends/coll2/key2',
+                     'movies/007%3A%20Tomorrow%20Never%20Dies%20%2F%20007']:
+            assert router.parse('/v0/' + path).path() == path
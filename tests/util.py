@@ -1,15 +1,29 @@
-# import vcr
-# import porc
-# import unittest
-# from .credentials import API_KEY
+from datetime import datetime
+import time
+import unittest
+from porc import util
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
-# class UtilTest(unittest.TestCase):
 
-#     def setUp(self):
-#         pass
+class UtilTest(unittest.TestCase):
 
-#     def test_datetime_to_timestamp(self):
-#         pass
+    def test_datetime_to_timestamp(self):
+        assert util.datetime_to_timestamp(datetime(1970, 1, 1, 0, 0, 1, 999999)) == 1999
+        assert util.datetime_to_timestamp(datetime(2014, 1, 1, 0, 0, 0, 9000)) == 1388534400009
+        # the default is now, not when porc was imported
+        before = util.datetime_to_timestamp()
+        time.sleep(0.01)
+        assert util.datetime_to_timestamp() > before
 
-#     def test_timestamp_to_datetime(self):
-#         pass
+    def test_datetimes_to_timestamps(self):
+        values = [datetime(2014, 1, 1), 5, None, datetime(1970, 1, 1, 0, 0, 2)]
+        assert util.datetimes_to_timestamps(values) == [1388534400000, 5, None, 2000]
+
+    @unittest.skipIf(numpy is None, 'needs numpy')
+    def test_datetime64(self):
+        values = numpy.array(['2014-01-01T00:00:00.009', 'NaT'], dtype='datetime64[us]')
+        assert util.datetimes_to_timestamps(values) == [1388534400009, None]
+        assert util.datetimes_to_timestamps(numpy.arange(3)) == [0, 1, 2]